@@ -0,0 +1,211 @@
+"""Conformance checks that every storage backend behaves the same behind CafeBillingSystem.
+
+Runs one scenario against each named backend: menu loading, order writes and reads,
+idempotency keys and resends (including an async retry after a timeout), the
+stale-menu guard, rollbacks, customer history pages, the daily report, every
+analytics grouping, the daily_sales check and rebuild, and the customers' running
+totals, summary and merged spellings. MySQL runs against a scratch database
+(DB_CONFIG's database name with a "_conformance" suffix); SQLite against a
+temporary file. Fails if any check fails on any backend.
+
+Usage: python benchmarks/backend_conformance.py [sqlite] [mysql]
+"""
+import asyncio
+import datetime
+import os
+import sys
+import tempfile
+from decimal import Decimal
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import cafe  # noqa: E402
+from cafe import CafeBillingSystem, Order, OrderItem  # noqa: E402
+
+CUSTOMER = "conformance-regular"
+
+
+def open_backend(name: str, scratch_dir: str) -> cafe.StorageBackend:
+    if name == "mysql":
+        config = {**cafe.DB_CONFIG, 'database': cafe.DB_CONFIG['database'] + "_conformance"}
+        return cafe.MySQLConnector(config, **cafe.POOL_CONFIG)
+    return cafe.SQLiteConnector(**{**cafe.SQLITE_CONFIG, 'path': os.path.join(scratch_dir, "conformance.db")})
+
+
+class Checks:
+    def __init__(self, backend: str):
+        self.backend = backend
+        self.failures = 0
+
+    def check(self, label: str, ok: bool, detail="") -> None:
+        print(f"{'ok  ' if ok else 'FAIL'} [{self.backend}] {label}{'' if ok else f': {detail}'}")
+        self.failures += not ok
+
+
+def place(system: CafeBillingSystem, menu, customer: str, n: int, **fields) -> Order:
+    order = Order(
+        customer_name=customer,
+        table_number=1 + n % 4,
+        items=[OrderItem(item_id=menu[i % len(menu)].id, quantity=1 + i, price=0) for i in range(1 + n % 3)],
+        payment_method=("cash", "card")[n % 2],
+        **fields
+    )
+    return system.create_order(order, verify=True)
+
+
+def run(name: str, scratch_dir: str) -> int:
+    checks = Checks(name)
+    db = open_backend(name, scratch_dir)
+    if not db.is_connected():
+        checks.check("backend opens", False, "database unreachable")
+        return checks.failures
+    db.execute_query("DELETE FROM orders")
+    db.execute_query("DELETE FROM daily_sales")
+    system = CafeBillingSystem(db)
+    today = datetime.date.today()
+
+    try:
+        menu = system.get_menu_items()
+        checks.check("initial menu", [item.name for item in menu][:2] == ["Tea", "Coffee"] and len(menu) == 10,
+                     [item.name for item in menu])
+        checks.check("menu prices are Decimal rupees", all(isinstance(item.price, Decimal) for item in menu))
+
+        saved = [place(system, menu, CUSTOMER, n) for n in range(7)]
+        checks.check("create_order returns ids", all(order is not None and order.id for order in saved))
+        stored = system.get_order(saved[0].id)
+        checks.check("get_order round trip",
+                     stored is not None and stored.order_time == saved[0].order_time
+                     and [(item.item_id, item.quantity, item.price) for item in stored.items]
+                     == [(item.item_id, item.quantity, item.price) for item in saved[0].items],
+                     stored)
+        checks.check("order_time is a datetime", isinstance(stored.order_time, datetime.datetime), type(stored.order_time))
+
+        duplicate = place(system, menu, CUSTOMER, 0, idempotency_key=saved[0].idempotency_key)
+        copies = db.fetch_one("SELECT COUNT(*) AS count FROM orders WHERE idempotency_key = %s", (saved[0].idempotency_key,))
+        checks.check("idempotency key is written once", int(copies['count']) == 1, copies)
+        checks.check("a resent key returns the saved order", duplicate is not None and duplicate.id == saved[0].id, duplicate)
+        resent = system.create_orders([Order(CUSTOMER, 1, saved[1].items, "cash", idempotency_key=saved[1].idempotency_key)])
+        checks.check("a resent key in a batch returns the saved order",
+                     resent[0] is not None and resent[0].id == saved[1].id and order_total(resent[0]) == order_total(saved[1]), resent)
+        retried = asyncio.run(timed_out_then_retried(system, Order(CUSTOMER, 1, saved[2].items, "cash",
+                                                                   idempotency_key="conformance-async-retry")))
+        retried_copies = db.fetch_one("SELECT COUNT(*) AS count FROM orders WHERE idempotency_key = %s", ("conformance-async-retry",))
+        checks.check("an async retry after a timeout returns the order, written once",
+                     retried is not None and retried.id is not None and int(retried_copies['count']) == 1
+                     and retried.id == system.create_order(retried).id, (retried, retried_copies))
+        saved.append(retried)
+
+        try:
+            with db.transaction() as cursor:
+                cursor.execute("DELETE FROM orders WHERE id = %s", (saved[1].id,))
+                raise RuntimeError("abort")
+        except RuntimeError:
+            pass
+        checks.check("transaction rolls back", system.get_order(saved[1].id) is not None)
+
+        tea = menu[0]
+        db.execute_query("UPDATE menu_items SET price = %s WHERE id = %s", (tea.price + 5, tea.id))
+        repriced = system.create_order(Order("conformance-reprice", 1, [OrderItem(item_id=tea.id, quantity=1, price=0)], "cash"))
+        checks.check("stale menu is repriced", repriced is not None and repriced.items[0].price == tea.price + 5,
+                     repriced and repriced.items)
+        db.execute_query("UPDATE menu_items SET price = %s WHERE id = %s", (tea.price, tea.id))
+        system.invalidate_menu_cache()
+
+        first_page = system.get_customer_orders(CUSTOMER, limit=3)
+        pages = [first_page]
+        while len(pages[-1]) == 3:
+            last = pages[-1][-1]
+            pages.append(system.get_customer_orders(CUSTOMER, limit=3, before=(last['order_time'], last['order_id'])))
+        paged_ids = [order['order_id'] for page in pages for order in page]
+        checks.check("history pages cover every order once",
+                     paged_ids == [order.id for order in reversed(saved)], paged_ids)
+        checks.check("history items", len(first_page[0]['items']) == len(saved[-1].items), first_page[0])
+        takeaway = system.create_order(Order("conformance-takeaway", None, [OrderItem(item_id=menu[0].id, quantity=1, price=0)], "cash"))
+        takeaway_history = system.get_customer_orders("conformance-takeaway")
+        checks.check("history of an order without a table",
+                     takeaway is not None and [order['table'] for order in takeaway_history] == [None], takeaway_history)
+
+        report = system.get_daily_sales_report(today)
+        net_sales = sum(order_total(order) for order in saved) + order_total(repriced) + order_total(takeaway)
+        checks.check("daily report", report['order_count'] == len(saved) + 2 and report['net_sales'] == net_sales, report)
+
+        for group_by in system.ANALYTICS_DIMENSIONS:
+            columns, rows = system.get_sales_analytics(today, today, group_by)
+            rows = list(rows)
+            ok = bool(rows) and all(len(row) == len(columns) for row in rows)
+            if group_by == "day":
+                ok = ok and rows[0][0] == today
+            if group_by == "hour":
+                ok = ok and all(isinstance(row[0], int) and 0 <= row[0] < 24 for row in rows)
+            checks.check(f"analytics by {group_by}", ok, rows)
+
+        checks.check("stream abandoned early", next(iter(db.stream("SELECT id FROM orders")), None) is not None
+                     and db.fetch_one("SELECT COUNT(*) AS count FROM orders") is not None)
+
+        summary = system.get_customer_summary(CUSTOMER)
+        quantities = {}
+        for order in saved:
+            for item in order.items:
+                quantities[item.item_id] = quantities.get(item.item_id, 0) + item.quantity
+        favourite_id = min(quantities, key=lambda item_id: (-quantities[item_id], item_id))
+        checks.check("customer summary",
+                     summary is not None and summary['visits'] == len(saved)
+                     and summary['lifetime_spend'] == sum(order_total(order) for order in saved)
+                     and summary['last_visit'] == max(order.order_time for order in saved)
+                     and summary['favourite_item'] == next(item.name for item in menu if item.id == favourite_id)
+                     and summary['favourite_item_quantity'] == quantities[favourite_id],
+                     summary)
+        merged = system.create_orders([Order(" Conformance  REGULAR! ", 1, [OrderItem(item_id=tea.id, quantity=1, price=0)], "cash"),
+                                       Order("conformance-newcomer", 1, [OrderItem(item_id=tea.id, quantity=1, price=0)], "cash")])
+        checks.check("spellings of a name are one customer",
+                     all(merged) and system.get_customer_summary("CONFORMANCE REGULAR")['visits'] == len(saved) + 1
+                     and len(system.get_customer_orders("Conformance Regular")) == len(saved) + 1,
+                     system.get_customer_summary("CONFORMANCE REGULAR"))
+        customer_query = ("SELECT id, name_key, name, visit_count, lifetime_spend, first_visit, last_visit, "
+                          "favourite_item_id, favourite_quantity FROM customers ORDER BY id")
+        running = [{**row, 'lifetime_spend': cafe.to_money(row['lifetime_spend'])} for row in db.fetch_all(customer_query)]
+        system.rebuild_customers()
+        rebuilt = [{**row, 'lifetime_spend': cafe.to_money(row['lifetime_spend'])} for row in db.fetch_all(customer_query)]
+        checks.check("running customer totals match a rebuild", running == rebuilt, (running, rebuilt))
+
+        checks.check("daily_sales matches orders", system.check_daily_sales() == [], system.check_daily_sales())
+        db.execute_query("UPDATE daily_sales SET total = total + 1 WHERE sale_date = %s", (today,))
+        checks.check("check finds a drifted rollup", len(system.check_daily_sales(today, today)) >= 1)
+        system.rebuild_daily_sales(today, today)
+        checks.check("rebuild repairs the rollup", system.check_daily_sales() == [])
+    finally:
+        db.execute_query("DELETE FROM orders")
+        system.rebuild_daily_sales()
+        system.rebuild_customers()
+        system.close()
+    return checks.failures
+
+
+async def timed_out_then_retried(system: CafeBillingSystem, order: Order) -> Order:
+    """Places order through AsyncCafeBillingSystem with a timeout too short to hear back, then retries it."""
+    cafe_async = cafe.AsyncCafeBillingSystem(system)
+    try:
+        await cafe_async.create_order(order, timeout=0.000001)
+    except asyncio.TimeoutError:
+        pass
+    retried = await cafe_async.create_order(order)
+    await cafe_async.close()
+    return retried
+
+
+def order_total(order: Order) -> Decimal:
+    money = CafeBillingSystem.money
+    return money.bill_totals(money.line_total(item.price, item.quantity) for item in order.items).total
+
+
+def main():
+    backends = sys.argv[1:] or ["sqlite", "mysql"]
+    scratch_dir = tempfile.mkdtemp(prefix="cafe-conformance-")
+    cafe.OFFLINE_QUEUE_CONFIG['path'] = os.path.join(scratch_dir, "offline_orders.db")
+    failures = sum(run(name, scratch_dir) for name in backends)
+    print(f"{failures} failed check(s) across {', '.join(backends)}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
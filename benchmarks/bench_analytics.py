@@ -0,0 +1,86 @@
+"""Benchmark: sales analytics query time as the number of orders in the range grows.
+
+Seeds a scratch database with a year of orders and items, then times
+get_sales_analytics for every dimension over 7-, 30-, 90- and 365-day spans. Runs
+against a temporary SQLite database, or against a scratch MySQL database
+(DB_CONFIG's name with a "_bench" suffix) whose orders are removed and rollups
+rebuilt afterwards.
+
+Usage: python benchmarks/bench_analytics.py [orders_per_day] [sqlite|mysql]
+"""
+import datetime
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import cafe  # noqa: E402
+
+SPANS = (7, 30, 90, 365)
+
+
+def open_backend(name: str, scratch_dir: str) -> cafe.StorageBackend:
+    if name == "mysql":
+        config = {**cafe.DB_CONFIG, 'database': cafe.DB_CONFIG['database'] + "_bench"}
+        return cafe.MySQLConnector(config, **cafe.POOL_CONFIG)
+    return cafe.SQLiteConnector(**{**cafe.SQLITE_CONFIG, 'path': os.path.join(scratch_dir, "bench.db")})
+
+
+def seed_year(system: cafe.CafeBillingSystem, last_day: datetime.date, orders_per_day: int) -> None:
+    system.db.execute_query("DELETE FROM orders")
+    first_day = last_day - datetime.timedelta(days=364)
+    for day in range(365):
+        day_start = datetime.datetime.combine(first_day + datetime.timedelta(days=day), datetime.time(8))
+        rows = [
+            (f"customer-{n % 500}", 1 + n % 12, day_start + datetime.timedelta(seconds=n * 50000 // orders_per_day),
+             'completed', ('cash', 'card')[n % 2], 100, 9, 9, 118)
+            for n in range(orders_per_day)
+        ]
+        with system.db.transaction() as cursor:
+            cursor.executemany(
+                "INSERT INTO orders (customer_name, table_number, order_time, status, payment_method, subtotal, cgst, sgst, total) "
+                "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)",
+                rows
+            )
+    # Two items per order, picked from the menu by order id
+    system.db.execute_query("""
+        INSERT INTO order_items (order_id, item_id, item_name, quantity, unit_price, total_price)
+        SELECT o.id, m.id, m.name, 1, m.price, m.price
+        FROM orders o
+        JOIN menu_items m ON m.id IN (1 + o.id % 10, 1 + (o.id + 3) % 10)
+    """)
+    system.rebuild_daily_sales()
+
+
+def main():
+    orders_per_day = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    backend = sys.argv[2] if len(sys.argv) > 2 else "sqlite"
+
+    scratch_dir = tempfile.mkdtemp(prefix="cafe-bench-")
+    cafe.OFFLINE_QUEUE_CONFIG['path'] = os.path.join(scratch_dir, "offline_orders.db")
+    system = cafe.CafeBillingSystem(open_backend(backend, scratch_dir))
+    today = datetime.date.today()
+
+    try:
+        seed_year(system, today, orders_per_day)
+        print(f"{'group by':<16}" + "".join(f"{f'{span}d ({span * orders_per_day:,} orders)':>26}" for span in SPANS))
+        for dimension in system.ANALYTICS_DIMENSIONS:
+            timings = []
+            for span in SPANS:
+                start = time.perf_counter()
+                _, rows = system.get_sales_analytics(today - datetime.timedelta(days=span - 1), today, dimension)
+                for _ in rows:
+                    pass
+                timings.append((time.perf_counter() - start) * 1000)
+            print(f"{dimension:<16}" + "".join(f"{ms:>23.1f} ms" for ms in timings))
+    finally:
+        system.db.execute_query("DELETE FROM orders")
+        system.rebuild_daily_sales()
+        system.rebuild_customers()
+        system.close()
+
+
+if __name__ == "__main__":
+    main()
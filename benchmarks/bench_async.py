@@ -0,0 +1,142 @@
+"""Benchmark: 200 concurrent simulated requests through AsyncCafeBillingSystem versus the blocking API.
+
+Each simulated client makes a seeded run of requests one after another, every one
+of them either
+  - a sale: create_order, then get_order for the receipt, or
+  - a history screen: get_customer_orders and get_daily_sales_report, which the
+    async path awaits together with asyncio.gather.
+The async path runs every client as a coroutine on one event loop over
+ASYNC_CONFIG's worker threads; the sync path gives every client its own thread,
+as a blocking service needs one thread per in-flight request. Prints requests per
+second, p50/p95/p99 request latency and the threads each path used. Runs against a
+temporary SQLite database, or against a scratch MySQL database (DB_CONFIG's name
+with an "_async" suffix).
+
+Usage: python benchmarks/bench_async.py [clients] [requests_per_client] [sqlite|mysql]
+"""
+import asyncio
+import datetime
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import cafe  # noqa: E402
+from cafe import AsyncCafeBillingSystem, CafeBillingSystem, Order, OrderItem  # noqa: E402
+
+
+def open_backend(name: str, scratch_dir: str) -> cafe.StorageBackend:
+    if name == "mysql":
+        config = {**cafe.DB_CONFIG, 'database': cafe.DB_CONFIG['database'] + "_async"}
+        return cafe.MySQLConnector(config, **cafe.POOL_CONFIG)
+    return cafe.SQLiteConnector(**{**cafe.SQLITE_CONFIG, 'path': os.path.join(scratch_dir, "async.db")})
+
+
+def client_requests(client: int, requests: int, menu) -> list:
+    """A client's requests: an Order to place, or a customer name whose history screen to load."""
+    rng = random.Random(client)
+    return [
+        Order(customer_name=f"async-{rng.randrange(300)}", table_number=1 + n % 12,
+              items=[OrderItem(item.id, rng.randint(1, 3), item.price) for item in rng.sample(menu, rng.randint(1, 4))],
+              payment_method=rng.choice(("cash", "card", "upi")))
+        if rng.random() < 0.5 else f"async-{rng.randrange(300)}"
+        for n in range(requests)
+    ]
+
+
+def run_sync(system: CafeBillingSystem, work: list) -> tuple:
+    today = datetime.date.today()
+    latencies = [[] for _ in work]
+    peak_threads = threading.active_count() + len(work)
+    barrier = threading.Barrier(len(work) + 1)
+
+    def serve(client: int) -> None:
+        barrier.wait()
+        for request in work[client]:
+            start = time.perf_counter()
+            if isinstance(request, Order):
+                order = system.create_order(request)
+                if order is not None:
+                    system.get_order(order.id)
+            else:
+                system.get_customer_orders(request, limit=20)
+                system.get_daily_sales_report(today)
+            latencies[client].append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=serve, args=(client,)) for client in range(len(work))]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start, latencies, peak_threads
+
+
+def run_async(system: CafeBillingSystem, work: list) -> tuple:
+    today = datetime.date.today()
+    latencies = [[] for _ in work]
+
+    async def serve(cafe_async: AsyncCafeBillingSystem, client: int) -> None:
+        for request in work[client]:
+            start = time.perf_counter()
+            if isinstance(request, Order):
+                order = await cafe_async.create_order(request)
+                if order is not None:
+                    await cafe_async.get_order(order.id)
+            else:
+                await asyncio.gather(cafe_async.get_customer_orders(request, limit=20),
+                                     cafe_async.get_daily_sales_report(today))
+            latencies[client].append(time.perf_counter() - start)
+
+    async def run() -> tuple:
+        cafe_async = AsyncCafeBillingSystem(system)
+        start = time.perf_counter()
+        await asyncio.gather(*(serve(cafe_async, client) for client in range(len(work))))
+        elapsed = time.perf_counter() - start
+        peak_threads = threading.active_count()
+        await cafe_async.close()
+        return elapsed, peak_threads
+
+    elapsed, peak_threads = asyncio.run(run())
+    return elapsed, latencies, peak_threads
+
+
+def report(label: str, elapsed: float, latencies: list, threads: int) -> None:
+    all_latencies = [latency * 1000 for client_latencies in latencies for latency in client_latencies]
+    p50, p95, p99 = (statistics.quantiles(all_latencies, n=100)[p - 1] for p in (50, 95, 99))
+    print(f"{label:<6} {len(all_latencies) / elapsed:8,.0f} requests/s   p50 {p50:7.1f} ms  p95 {p95:7.1f} ms  "
+          f"p99 {p99:7.1f} ms   {threads} threads")
+
+
+def main():
+    clients = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    requests = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    backend = sys.argv[3] if len(sys.argv) > 3 else "sqlite"
+
+    scratch_dir = tempfile.mkdtemp(prefix="cafe-async-")
+    cafe.OFFLINE_QUEUE_CONFIG['path'] = os.path.join(scratch_dir, "offline_orders.db")
+    db = open_backend(backend, scratch_dir)
+    db.execute_query("DELETE FROM orders")
+    db.execute_query("DELETE FROM daily_sales")
+    system = CafeBillingSystem(db)
+    work = [client_requests(client, requests, system.get_menu_items()) for client in range(clients)]
+    print(f"{clients} concurrent clients x {requests} requests on {backend}, "
+          f"{cafe.ASYNC_CONFIG['workers']} async workers")
+
+    try:
+        report("async", *run_async(system, work))
+        report("sync", *run_sync(system, work))
+    finally:
+        db.execute_query("DELETE FROM orders")
+        system.rebuild_daily_sales()
+        system.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Benchmark: order-insert throughput and report latency on each storage backend.
+
+For every named backend, places orders through create_order, first from one
+till and then from several threads at once, and times the daily report, the
+item analytics and a customer history page over the orders just written.
+MySQL uses a scratch database (DB_CONFIG's database name with a "_bench" suffix);
+SQLite a temporary file with SQLITE_CONFIG's pragmas.
+
+Usage: python benchmarks/bench_backends.py [orders] [threads] [sqlite] [mysql]
+"""
+import datetime
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import cafe  # noqa: E402
+from cafe import CafeBillingSystem, Order, OrderItem  # noqa: E402
+
+
+def open_backend(name: str, scratch_dir: str) -> cafe.StorageBackend:
+    if name == "mysql":
+        config = {**cafe.DB_CONFIG, 'database': cafe.DB_CONFIG['database'] + "_bench"}
+        return cafe.MySQLConnector(config, **cafe.POOL_CONFIG)
+    return cafe.SQLiteConnector(**{**cafe.SQLITE_CONFIG, 'path': os.path.join(scratch_dir, "bench.db")})
+
+
+def place_orders(system: CafeBillingSystem, menu, first: int, count: int, latencies: list) -> None:
+    for n in range(first, first + count):
+        order = Order(
+            customer_name=f"bench-{n % 200}",
+            table_number=1 + n % 12,
+            items=[OrderItem(item_id=menu[i % len(menu)].id, quantity=1 + i % 3, price=0) for i in range(1 + n % 6)],
+            payment_method=("cash", "card")[n % 2]
+        )
+        start = time.perf_counter()
+        if system.create_order(order) is None:
+            raise RuntimeError(f"order {n} was not saved")
+        latencies.append((time.perf_counter() - start) * 1000)
+
+
+def insert_throughput(system: CafeBillingSystem, orders: int, threads: int) -> tuple:
+    menu = system.get_menu_items()
+    latencies = []
+    per_thread = orders // threads
+    workers = [
+        threading.Thread(target=place_orders, args=(system, menu, t * per_thread, per_thread, latencies))
+        for t in range(threads)
+    ]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return len(latencies) / elapsed, statistics.median(latencies), latencies[int(len(latencies) * 0.95)]
+
+
+def median_ms(func, repeat: int = 20) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def run(name: str, scratch_dir: str, orders: int, threads: int) -> None:
+    db = open_backend(name, scratch_dir)
+    if not db.is_connected():
+        print(f"{name}: database unreachable, skipped")
+        return
+    db.execute_query("DELETE FROM orders")
+    db.execute_query("DELETE FROM daily_sales")
+    system = CafeBillingSystem(db)
+    today = datetime.date.today()
+    try:
+        for writers in (1, threads):
+            rate, p50, p95 = insert_throughput(system, orders, writers)
+            print(f"{name:<7} inserts, {writers} writer(s): {rate:8.0f} orders/s   p50 {p50:6.2f} ms   p95 {p95:6.2f} ms")
+        reports = {
+            "daily report": lambda: system.get_daily_sales_report(today),
+            "analytics by item": lambda: list(system.get_sales_analytics(today, today, "item")[1]),
+            "history page (20)": lambda: system.get_customer_orders("bench-7", limit=20),
+        }
+        for label, report in reports.items():
+            print(f"{name:<7} {label:<27} {median_ms(report):8.2f} ms")
+    finally:
+        db.execute_query("DELETE FROM orders")
+        db.execute_query("DELETE FROM daily_sales")
+        system.close()
+
+
+def main():
+    orders = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    backends = sys.argv[3:] or ["sqlite", "mysql"]
+    scratch_dir = tempfile.mkdtemp(prefix="cafe-bench-")
+    cafe.OFFLINE_QUEUE_CONFIG['path'] = os.path.join(scratch_dir, "offline_orders.db")
+    print(f"{orders} orders per run, up to {threads} writer threads")
+    for name in backends:
+        run(name, scratch_dir, orders, threads)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Benchmark: round trips and latency per order for the old and the batched create_order paths.
+
+Runs against a scratch MySQL database (DB_CONFIG's database name with a "_bench_orders"
+suffix) that is dropped afterwards. Round trips are taken from the server's per-session
+'Questions' counter, so they include COMMIT statements.
+
+Usage: python benchmarks/bench_create_order.py [orders] [items_per_order]
+"""
+import datetime
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import cafe  # noqa: E402
+from cafe import CafeBillingSystem, Order, OrderItem  # noqa: E402
+
+
+def session_questions(system: CafeBillingSystem) -> int:
+    """Number of statements the server has received on this session so far."""
+    row = system.db.fetch_one("SHOW SESSION STATUS LIKE 'Questions'")
+    return int(row['Value'])
+
+
+def legacy_create_order(system: CafeBillingSystem, order: Order) -> int:
+    """The per-item, commit-per-statement create_order path this benchmark compares against."""
+    subtotal = 0.0
+    rows = []
+    for item in order.items:
+        data = system.db.fetch_one("SELECT id, name, price FROM menu_items WHERE id = %s", (item.item_id,))
+        price = float(data['price'])
+        subtotal += price * item.quantity
+        rows.append((item.item_id, data['name'], item.quantity, price, price * item.quantity))
+    cgst = subtotal * (system.CGST_RATE / 100)
+    sgst = subtotal * (system.SGST_RATE / 100)
+    order_id = system.db.execute_query(
+        "INSERT INTO orders (customer_name, table_number, order_time, status, payment_method, subtotal, cgst, sgst, total) "
+        "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)",
+        (order.customer_name, order.table_number, datetime.datetime.now(), order.status,
+         order.payment_method, subtotal, cgst, sgst, subtotal + cgst + sgst)
+    )
+    for row in rows:
+        system.db.execute_query(
+            "INSERT INTO order_items (order_id, item_id, item_name, quantity, unit_price, total_price) "
+            "VALUES (%s, %s, %s, %s, %s, %s)",
+            (order_id, *row)
+        )
+    return order_id
+
+
+def run(label: str, system: CafeBillingSystem, place, orders: int, items_per_order: int) -> None:
+    menu = system.get_menu_items()
+    latencies = []
+    round_trips = []
+    for n in range(orders):
+        order = Order(
+            customer_name=f"bench-{n}",
+            table_number=1 + n % 12,
+            items=[OrderItem(item_id=menu[i % len(menu)].id, quantity=1 + i % 3, price=0) for i in range(items_per_order)],
+            payment_method="cash"
+        )
+        before = session_questions(system)
+        start = time.perf_counter()
+        place(order)
+        latencies.append((time.perf_counter() - start) * 1000)
+        # Subtract the SHOW STATUS statement that reads the counter itself
+        round_trips.append(session_questions(system) - before - 1)
+
+    print(f"{label:<10} round trips/order: {statistics.mean(round_trips):6.1f}   "
+          f"latency/order: p50 {statistics.median(latencies):7.2f} ms   "
+          f"mean {statistics.mean(latencies):7.2f} ms")
+
+
+def main():
+    orders = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    items_per_order = int(sys.argv[2]) if len(sys.argv) > 2 else 12
+
+    cafe.OFFLINE_QUEUE_CONFIG['path'] = os.path.join(tempfile.mkdtemp(prefix="cafe-bench-"), "offline_orders.db")
+    config = {**cafe.DB_CONFIG, 'database': cafe.DB_CONFIG['database'] + "_bench_orders"}
+    system = CafeBillingSystem(cafe.MySQLConnector(config, **cafe.POOL_CONFIG))
+    try:
+        print(f"{orders} orders x {items_per_order} items")
+        run("before", system, lambda order: legacy_create_order(system, order), orders, items_per_order)
+        run("after", system, system.create_order, orders, items_per_order)
+        print(f"menu cache: {system.menu_cache_stats()}")
+    finally:
+        system.db.execute_query(f"DROP DATABASE IF EXISTS {config['database']}")
+        system.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""Benchmark: customer history for a regular with thousands of orders.
+
+Seeds one customer's history directly into a scratch database, then
+compares the old one-query-per-order history with the single-query API
+(first page and full history), and the customer's visits and spend summed
+over their orders with get_customer_summary, which reads the running totals
+kept on the customer. Runs against a temporary SQLite database, or against a
+scratch MySQL database (DB_CONFIG's name with a "_history" suffix) whose orders
+are removed and rollups rebuilt afterwards.
+
+Usage: python benchmarks/bench_customer_history.py [orders] [items_per_order] [sqlite|mysql]
+"""
+import datetime
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import cafe  # noqa: E402
+from cafe import CafeBillingSystem  # noqa: E402
+
+CUSTOMER = "bench-history-regular"
+
+
+def open_backend(name: str, scratch_dir: str) -> cafe.StorageBackend:
+    if name == "mysql":
+        config = {**cafe.DB_CONFIG, 'database': cafe.DB_CONFIG['database'] + "_history"}
+        return cafe.MySQLConnector(config, **cafe.POOL_CONFIG)
+    return cafe.SQLiteConnector(**{**cafe.SQLITE_CONFIG, 'path': os.path.join(scratch_dir, "history.db")})
+
+
+def seed(system: CafeBillingSystem, orders: int, items_per_order: int) -> None:
+    menu = system.get_menu_items()
+    start = datetime.datetime.now() - datetime.timedelta(days=orders)
+    with system.db.transaction() as cursor:
+        for n in range(orders):
+            cursor.execute(
+                "INSERT INTO orders (customer_name, table_number, order_time, status, payment_method, subtotal, cgst, sgst, total) "
+                "VALUES (%s, %s, %s, 'completed', 'cash', 100, 9, 9, 118)",
+                (CUSTOMER, 1 + n % 12, start + datetime.timedelta(days=n))
+            )
+            order_id = cursor.lastrowid
+            cursor.executemany(
+                "INSERT INTO order_items (order_id, item_id, item_name, quantity, unit_price, total_price) "
+                "VALUES (%s, %s, %s, %s, %s, %s)",
+                [(order_id, item.id, item.name, 1, item.price, item.price)
+                 for item in (menu[i % len(menu)] for i in range(items_per_order))]
+            )
+
+
+def legacy_customer_orders(system: CafeBillingSystem, customer_name: str) -> list:
+    """The one-query-per-order history this benchmark compares against."""
+    orders = system.db.fetch_all(
+        "SELECT id, table_number, order_time, subtotal, cgst, sgst, total FROM orders "
+        "WHERE customer_name = %s ORDER BY order_time DESC", (customer_name,)
+    )
+    for order in orders:
+        order['items'] = system.db.fetch_all(
+            "SELECT item_name, quantity, unit_price, total_price FROM order_items WHERE order_id = %s", (order['id'],)
+        )
+    return orders
+
+
+def legacy_customer_totals(system: CafeBillingSystem, customer_name: str) -> dict:
+    """Visits, spend and last visit as they had to be found before customers kept running totals."""
+    return system.db.fetch_one(
+        "SELECT COUNT(*) AS visits, SUM(total) AS lifetime_spend, MAX(order_time) AS last_visit FROM orders "
+        "WHERE customer_name = %s", (customer_name,)
+    )
+
+
+def timed(label: str, func) -> None:
+    start = time.perf_counter()
+    result = func()
+    elapsed = (time.perf_counter() - start) * 1000
+    print(f"{label:<28} {elapsed:9.1f} ms   ({len(result)} orders)")
+
+
+def timed_summary(label: str, func) -> None:
+    start = time.perf_counter()
+    result = func()
+    elapsed = (time.perf_counter() - start) * 1000
+    print(f"{label:<28} {elapsed:9.1f} ms   ({result['visits']} visits)")
+
+
+def main():
+    orders = int(sys.argv[1]) if len(sys.argv) > 1 else 3000
+    items_per_order = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    backend = sys.argv[3] if len(sys.argv) > 3 else "sqlite"
+
+    scratch_dir = tempfile.mkdtemp(prefix="cafe-history-")
+    cafe.OFFLINE_QUEUE_CONFIG['path'] = os.path.join(scratch_dir, "offline_orders.db")
+    db = open_backend(backend, scratch_dir)
+    db.execute_query("DELETE FROM orders")
+    system = CafeBillingSystem(db)
+    try:
+        seed(system, orders, items_per_order)
+        system.rebuild_customers()  # The seeded orders bypass create_order, so link them to the customer here
+        print(f"customer with {orders} orders x {items_per_order} items on {backend}")
+        timed("before: N+1 full history", lambda: legacy_customer_orders(system, CUSTOMER))
+        timed("after: full history", lambda: system.get_customer_orders(CUSTOMER))
+        timed("after: first page (20)", lambda: system.get_customer_orders(CUSTOMER, limit=20))
+        last = system.get_customer_orders(CUSTOMER, limit=20)[-1]
+        timed("after: second page (20)",
+              lambda: system.get_customer_orders(CUSTOMER, limit=20, before=(last['order_time'], last['order_id'])))
+        timed_summary("before: totals from orders", lambda: legacy_customer_totals(system, CUSTOMER))
+        timed_summary("after: customer summary", lambda: system.get_customer_summary(CUSTOMER))
+    finally:
+        db.execute_query("DELETE FROM orders")
+        system.rebuild_daily_sales()
+        system.rebuild_customers()
+        system.close()
+
+
+if __name__ == "__main__":
+    main()
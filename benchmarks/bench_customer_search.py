@@ -0,0 +1,136 @@
+"""Benchmark: Customer History type-ahead on a database with many distinct customers.
+
+Seeds one order each for `customers` distinct, randomly made-up customer names,
+then times:
+  - the first search_customers call, which loads the search index from the orders,
+  - every keystroke of typing 300 of the names, once as written and once with a typo
+    (a dropped letter), reporting p50/p95/p99/max milliseconds per keystroke,
+  - how soon a new customer's order is found,
+  - the same keystrokes answered the old way, with a LIKE '%text%' scan of orders
+    (on 20 names only, as each one reads the whole table).
+Runs against a temporary SQLite database, or against a scratch MySQL database
+(DB_CONFIG's name with a "_search" suffix).
+
+Usage: python benchmarks/bench_customer_search.py [customers] [sqlite|mysql]
+"""
+import datetime
+import os
+import random
+import statistics
+import string
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import cafe  # noqa: E402
+from cafe import CafeBillingSystem, Order, OrderItem  # noqa: E402
+
+FIRST_NAMES = ("Rahul", "Priya", "Amit", "Sneha", "Vikram", "Ananya", "Arjun", "Kavya", "Rohan", "Isha",
+               "Karan", "Meera", "Aditya", "Pooja", "Siddharth", "Neha", "Varun", "Divya", "Nikhil", "Riya")
+SEED_BATCH = 5000
+
+
+def open_backend(name: str, scratch_dir: str) -> cafe.StorageBackend:
+    if name == "mysql":
+        config = {**cafe.DB_CONFIG, 'database': cafe.DB_CONFIG['database'] + "_search"}
+        return cafe.MySQLConnector(config, **cafe.POOL_CONFIG)
+    return cafe.SQLiteConnector(**{**cafe.SQLITE_CONFIG, 'path': os.path.join(scratch_dir, "search.db")})
+
+
+def made_up_names(customers: int, rng: random.Random) -> list:
+    """Distinct names: a common first name or a random one, a random surname, sometimes an initial."""
+    names = set()
+    while len(names) < customers:
+        first = rng.choice(FIRST_NAMES) if rng.random() < 0.3 else \
+            "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(3, 8))).title()
+        surname = "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(3, 9))).title()
+        names.add(f"{first} {surname}" + (f" {rng.choice(string.ascii_uppercase)}." if rng.random() < 0.2 else ""))
+    return sorted(names)
+
+
+def seed(db: cafe.StorageBackend, names: list) -> None:
+    order_time = datetime.datetime.now().replace(microsecond=0)
+    for start in range(0, len(names), SEED_BATCH):
+        with db.transaction() as cursor:
+            cursor.executemany(
+                "INSERT INTO orders (customer_name, table_number, order_time, status, payment_method, subtotal, cgst, sgst, total) "
+                "VALUES (%s, 1, %s, 'completed', 'cash', 100, 9, 9, 118)",
+                [(name, order_time) for name in names[start:start + SEED_BATCH]]
+            )
+
+
+def keystrokes(names: list, typo: bool) -> list:
+    """Every prefix typed on the way to each name, with its second letter dropped if typo."""
+    typed = []
+    for name in names:
+        if typo:
+            name = name[0] + name[2:]
+        typed.extend(name[:length] for length in range(1, len(name) + 1))
+    return typed
+
+
+def timed_searches(search, texts: list) -> list:
+    latencies = []
+    for text in texts:
+        start = time.perf_counter()
+        search(text)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def report(label: str, latencies: list) -> None:
+    p50, p95, p99 = (statistics.quantiles(latencies, n=100)[p - 1] for p in (50, 95, 99))
+    print(f"{label:<24} {len(latencies):>6} keystrokes   p50 {p50:7.3f} ms  p95 {p95:7.3f} ms  "
+          f"p99 {p99:7.3f} ms  max {max(latencies):8.3f} ms")
+
+
+def main():
+    customers = int(sys.argv[1]) if len(sys.argv) > 1 else 500000
+    backend = sys.argv[2] if len(sys.argv) > 2 else "sqlite"
+
+    scratch_dir = tempfile.mkdtemp(prefix="cafe-search-")
+    cafe.OFFLINE_QUEUE_CONFIG['path'] = os.path.join(scratch_dir, "offline_orders.db")
+    db = open_backend(backend, scratch_dir)
+    db.execute_query("DELETE FROM orders")
+    db.execute_query("DELETE FROM daily_sales")
+    system = CafeBillingSystem(db)
+    rng = random.Random(24)
+    names = made_up_names(customers, rng)
+    start = time.perf_counter()
+    seed(db, names)
+    system.rebuild_customers()  # Links the raw orders to customers, whose names the index is loaded from
+    print(f"{customers:,} distinct customers on {backend} (seeded in {time.perf_counter() - start:.1f} s)")
+
+    try:
+        start = time.perf_counter()
+        system.search_customers("")
+        print(f"first search (loads the index): {time.perf_counter() - start:.2f} s")
+
+        typed_names = rng.sample(names, 300)
+        search = system.search_customers
+        report("typed as written", timed_searches(search, keystrokes(typed_names, typo=False)))
+        report("typed with a typo", timed_searches(search, keystrokes(typed_names, typo=True)))
+        missed = sum(name not in search(name[0] + name[2:]) for name in typed_names)
+        print(f"names not suggested for their typo: {missed} of {len(typed_names)}")
+
+        menu = system.get_menu_items()
+        start = time.perf_counter()
+        system.create_order(Order("Zubin Newcustomer", 1, [OrderItem(menu[0].id, 1, menu[0].price)], "cash"))
+        found = search("zubin newc")
+        print(f"new customer suggested {(time.perf_counter() - start) * 1000:.1f} ms after placing the order: {found}")
+
+        def like_scan(text: str) -> list:
+            return db.fetch_all("SELECT DISTINCT customer_name FROM orders WHERE customer_name LIKE %s LIMIT 10",
+                                (f"%{text}%",))
+        report("old: LIKE scan", timed_searches(like_scan, keystrokes(typed_names[:20], typo=False)))
+    finally:
+        db.execute_query("DELETE FROM orders")
+        system.rebuild_daily_sales()
+        system.rebuild_customers()
+        system.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Benchmark: daily report latency from the daily_sales rollup versus scanning raw orders.
+
+Seeds a scratch database with a growing number of days of orders, rebuilds the
+rollup, and times one day's report both ways. The rollup time should stay flat as
+history grows. Runs against a temporary SQLite database, or against a scratch MySQL
+database (DB_CONFIG's name with a "_bench" suffix) whose orders are removed and
+rollups rebuilt afterwards.
+
+Usage: python benchmarks/bench_daily_report.py [orders_per_day] [sqlite|mysql]
+"""
+import datetime
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import cafe  # noqa: E402
+
+RAW_REPORT_QUERY = """
+    SELECT COUNT(id), SUM(subtotal), SUM(cgst), SUM(sgst), SUM(total)
+    FROM orders
+    WHERE order_time >= %s AND order_time < %s
+"""
+
+
+def open_backend(name: str, scratch_dir: str) -> cafe.StorageBackend:
+    if name == "mysql":
+        config = {**cafe.DB_CONFIG, 'database': cafe.DB_CONFIG['database'] + "_bench"}
+        return cafe.MySQLConnector(config, **cafe.POOL_CONFIG)
+    return cafe.SQLiteConnector(**{**cafe.SQLITE_CONFIG, 'path': os.path.join(scratch_dir, "bench.db")})
+
+
+def seed_days(system: cafe.CafeBillingSystem, first_day: datetime.date, days: int, orders_per_day: int) -> None:
+    for day in range(days):
+        day_start = datetime.datetime.combine(first_day + datetime.timedelta(days=day), datetime.time(8))
+        rows = [
+            (f"customer-{n % 500}", 1 + n % 12, day_start + datetime.timedelta(seconds=n * 40000 // orders_per_day),
+             'completed', ('cash', 'card')[n % 2], 100, 9, 9, 118)
+            for n in range(orders_per_day)
+        ]
+        with system.db.transaction() as cursor:
+            cursor.executemany(
+                "INSERT INTO orders (customer_name, table_number, order_time, status, payment_method, subtotal, cgst, sgst, total) "
+                "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)",
+                rows
+            )
+
+
+def median_ms(func, repeat: int = 20) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    orders_per_day = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+    backend = sys.argv[2] if len(sys.argv) > 2 else "sqlite"
+
+    scratch_dir = tempfile.mkdtemp(prefix="cafe-bench-")
+    cafe.OFFLINE_QUEUE_CONFIG['path'] = os.path.join(scratch_dir, "offline_orders.db")
+    db = open_backend(backend, scratch_dir)
+    db.execute_query("DELETE FROM orders")
+    db.execute_query("DELETE FROM daily_sales")
+    system = cafe.CafeBillingSystem(db)
+
+    try:
+        first_day = datetime.date(2020, 1, 1)
+        seeded_days = 0
+        print(f"{'days of history':>16} {'orders':>10} {'raw scan ms':>12} {'rollup ms':>10}")
+        for total_days in (30, 365, 3 * 365):
+            seed_days(system, first_day + datetime.timedelta(days=seeded_days), total_days - seeded_days, orders_per_day)
+            seeded_days = total_days
+            system.rebuild_daily_sales()
+
+            report_day = first_day + datetime.timedelta(days=total_days // 2)
+            day_start = datetime.datetime.combine(report_day, datetime.time.min)
+            day_range = (day_start, day_start + datetime.timedelta(days=1))
+            raw_ms = median_ms(lambda: system.db.fetch_one(RAW_REPORT_QUERY, day_range))
+            rollup_ms = median_ms(lambda: system.get_daily_sales_report(report_day))
+            print(f"{total_days:>16} {total_days * orders_per_day:>10,} {raw_ms:>12.2f} {rollup_ms:>10.2f}")
+    finally:
+        db.execute_query("DELETE FROM orders")
+        system.rebuild_daily_sales()
+        system.rebuild_customers()
+        system.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Benchmark: order throughput and latency with group commit off, and at several windows and batch sizes.
+
+Runs the same load once per setting: N threads sharing one CafeBillingSystem, each
+placing its seeded run of orders one after another. Without group commit every
+order is its own transaction; with it, orders from different threads share commits
+(see GROUP_COMMIT_CONFIG). Prints orders per second, p50/p95/p99 latency and the
+average orders per commit for each setting, which is the throughput/latency curve
+to pick a window from. Runs against a temporary SQLite database, or against a
+scratch MySQL database (DB_CONFIG's name with a "_group" suffix).
+
+Usage: python benchmarks/bench_group_commit.py [threads] [orders_per_thread] [sqlite|mysql]
+"""
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import cafe  # noqa: E402
+from cafe import CafeBillingSystem, Order, OrderItem  # noqa: E402
+
+# (window in seconds, max_batch_size); None is group commit off
+SETTINGS = (None, (0.0, 64), (0.001, 16), (0.001, 64), (0.002, 64), (0.005, 64), (0.010, 64), (0.010, 256))
+
+
+def open_backend(name: str, scratch_dir: str) -> cafe.StorageBackend:
+    if name == "mysql":
+        config = {**cafe.DB_CONFIG, 'database': cafe.DB_CONFIG['database'] + "_group"}
+        return cafe.MySQLConnector(config, **cafe.POOL_CONFIG)
+    return cafe.SQLiteConnector(**{**cafe.SQLITE_CONFIG, 'path': os.path.join(scratch_dir, "group.db")})
+
+
+def thread_orders(thread: int, orders: int, menu) -> list:
+    rng = random.Random(thread)
+    return [
+        Order(customer_name=f"group-{thread}-{rng.randrange(100)}", table_number=1 + n % 12,
+              items=[OrderItem(item.id, rng.randint(1, 3), item.price) for item in rng.sample(menu, rng.randint(1, 4))],
+              payment_method=rng.choice(("cash", "card", "upi")))
+        for n in range(orders)
+    ]
+
+
+def run(setting, threads: int, orders: int, backend: str, scratch_dir: str) -> None:
+    if setting is None:
+        cafe.GROUP_COMMIT_CONFIG['enabled'] = False
+    else:
+        cafe.GROUP_COMMIT_CONFIG.update(enabled=True, window=setting[0], max_batch_size=setting[1])
+    system = CafeBillingSystem(open_backend(backend, scratch_dir))
+    menu = system.get_menu_items()
+    work = [thread_orders(thread, orders, menu) for thread in range(threads)]
+    latencies = [[] for _ in range(threads)]
+    failures = [0] * threads
+    barrier = threading.Barrier(threads + 1)
+
+    def place(thread: int) -> None:
+        barrier.wait()
+        for order in work[thread]:
+            start = time.perf_counter()
+            if system.create_order(order) is None:
+                failures[thread] += 1
+            latencies[thread].append(time.perf_counter() - start)
+
+    workers = [threading.Thread(target=place, args=(thread,)) for thread in range(threads)]
+    for worker in workers:
+        worker.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+
+    all_latencies = [latency * 1000 for thread_latencies in latencies for latency in thread_latencies]
+    p50, p95, p99 = (statistics.quantiles(all_latencies, n=100)[p - 1] for p in (50, 95, 99))
+    if setting is None:
+        label, per_commit = "off", 1.0
+    else:
+        label, per_commit = f"{setting[0] * 1000:g} ms / {setting[1]}", system.group_commit.stats()["average_batch_size"]
+    print(f"{label:<14} {len(all_latencies) / elapsed:8,.0f} orders/s   p50 {p50:6.1f} ms  p95 {p95:6.1f} ms  "
+          f"p99 {p99:6.1f} ms   {per_commit:5.1f} orders/commit   {sum(failures)} failed")
+    system.close()
+
+
+def main():
+    threads = int(sys.argv[1]) if len(sys.argv) > 1 else 32
+    orders = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    backend = sys.argv[3] if len(sys.argv) > 3 else "sqlite"
+
+    scratch_dir = tempfile.mkdtemp(prefix="cafe-group-")
+    cafe.OFFLINE_QUEUE_CONFIG['path'] = os.path.join(scratch_dir, "offline_orders.db")
+    db = open_backend(backend, scratch_dir)
+    db.execute_query("DELETE FROM orders")
+    db.execute_query("DELETE FROM daily_sales")
+    db.close_connection()
+    print(f"{threads} threads x {orders} orders on {backend}; window / max batch size")
+
+    try:
+        for setting in SETTINGS:
+            run(setting, threads, orders, backend, scratch_dir)
+    finally:
+        cafe.GROUP_COMMIT_CONFIG['enabled'] = False
+        system = CafeBillingSystem(open_backend(backend, scratch_dir))
+        system.db.execute_query("DELETE FROM orders")
+        system.rebuild_daily_sales()
+        system.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Benchmark: bulk order import and export throughput, and the export's memory ceiling.
+
+Writes a JSON Lines file of synthetic orders, imports it into a scratch database
+with import_orders, exports everything back out as CSV and as JSON Lines with
+export_orders, and reports orders per second for each step. Every step streams,
+so the process's peak RSS must stay under the ceiling however many rows there are;
+the run fails if it does not. Runs against a temporary SQLite database, or against
+a scratch MySQL database (DB_CONFIG's name with a "_transfer" suffix).
+
+Usage: python benchmarks/bench_import_export.py [item_rows] [items_per_order] [ceiling_mb] [sqlite|mysql]
+"""
+import datetime
+import json
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import cafe  # noqa: E402
+
+
+def open_backend(name: str, scratch_dir: str) -> cafe.StorageBackend:
+    if name == "mysql":
+        config = {**cafe.DB_CONFIG, 'database': cafe.DB_CONFIG['database'] + "_transfer"}
+        return cafe.MySQLConnector(config, **cafe.POOL_CONFIG)
+    # Pages SQLite memory-maps count towards RSS, so map none: the ceiling is for the pipeline's own memory
+    return cafe.SQLiteConnector(**{**cafe.SQLITE_CONFIG, 'path': os.path.join(scratch_dir, "transfer.db"), 'mmap_size': 0})
+
+
+def peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # ru_maxrss is in KiB on Linux
+
+
+def write_source_file(path: str, orders: int, items_per_order: int, menu) -> None:
+    rng = random.Random(3)
+    start = datetime.datetime(2021, 1, 1, 8)
+    money = cafe.CafeBillingSystem.money
+    with open(path, "w", encoding="utf-8") as source_file:
+        for n in range(orders):
+            items = [(item, rng.randint(1, 3)) for item in rng.sample(menu, items_per_order)]
+            line_totals = [money.line_total(item.price, quantity) for item, quantity in items]
+            totals = money.bill_totals(line_totals)
+            source_file.write(json.dumps({
+                'order_id': n + 1,
+                'customer_name': f"customer-{rng.randrange(5000)}",
+                'table_number': 1 + n % 12,
+                'order_time': str(start + datetime.timedelta(seconds=n * 37)),
+                'status': "completed",
+                'payment_method': ("cash", "card", "upi")[n % 3],
+                'subtotal': str(totals.subtotal), 'cgst': str(totals.cgst), 'sgst': str(totals.sgst), 'total': str(totals.total),
+                'items': [
+                    {'item_id': item.id, 'item_name': item.name, 'quantity': quantity,
+                     'unit_price': str(item.price), 'total_price': str(line_total)}
+                    for (item, quantity), line_total in zip(items, line_totals)
+                ]
+            }) + "\n")
+
+
+def timed(label: str, orders: int, func) -> None:
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<18} {orders:>10,} orders in {elapsed:7.1f} s = {orders / elapsed:9,.0f} orders/s   "
+          f"peak RSS {peak_rss_mb():7.1f} MB")
+
+
+def main():
+    item_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 5000000
+    items_per_order = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    ceiling_mb = float(sys.argv[3]) if len(sys.argv) > 3 else 200.0
+    backend = sys.argv[4] if len(sys.argv) > 4 else "sqlite"
+    orders = item_rows // items_per_order
+
+    scratch_dir = tempfile.mkdtemp(prefix="cafe-transfer-")
+    cafe.OFFLINE_QUEUE_CONFIG['path'] = os.path.join(scratch_dir, "offline_orders.db")
+    db = open_backend(backend, scratch_dir)
+    db.execute_query("DELETE FROM orders")
+    db.execute_query("DELETE FROM daily_sales")
+    system = cafe.CafeBillingSystem(db)
+
+    source_path = os.path.join(scratch_dir, "source.jsonl")
+    write_source_file(source_path, orders, items_per_order, system.get_menu_items())
+    print(f"{orders:,} orders x {items_per_order} items = {orders * items_per_order:,} item rows on {backend}; "
+          f"start RSS {peak_rss_mb():.1f} MB")
+
+    try:
+        timed("import (jsonl)", orders, lambda: system.import_orders(source_path, progress=False))
+        timed("export (csv)", orders, lambda: system.export_orders(os.path.join(scratch_dir, "export.csv"), progress=False))
+        timed("export (jsonl)", orders, lambda: system.export_orders(os.path.join(scratch_dir, "export.jsonl"), progress=False))
+    finally:
+        db.execute_query("DELETE FROM orders")
+        system.rebuild_daily_sales()
+        system.close()
+
+    peak = peak_rss_mb()
+    print(f"peak RSS {peak:.1f} MB (ceiling {ceiling_mb:.0f} MB)")
+    sys.exit(0 if peak <= ceiling_mb else 1)
+
+
+if __name__ == "__main__":
+    main()
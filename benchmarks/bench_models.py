@@ -0,0 +1,117 @@
+"""Benchmark: memory and build time of order models when loading many orders at once.
+
+Builds the same orders, from rows shaped like the orders/order_items join, three ways:
+  - dict-backed dataclasses, as the models were before they were slotted,
+  - the slotted Order and OrderItem models,
+  - one columnar OrderBatch.
+Reports the memory each result keeps alive (tracemalloc) and the time taken to build it.
+Needs no database.
+
+Usage: python benchmarks/bench_models.py [orders] [items_per_order]
+"""
+import datetime
+import gc
+import os
+import random
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import List, Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from cafe import Order, OrderBatch, OrderItem  # noqa: E402
+
+MENU = [("Tea", Decimal("10.00")), ("Coffee", Decimal("20.00")), ("Latte", Decimal("90.00")),
+        ("Mocha", Decimal("80.00")), ("Cappuccino", Decimal("120.00")), ("Americano", Decimal("150.00"))]
+
+
+@dataclass
+class DictOrderItem:
+    item_id: int
+    quantity: int
+    price: Decimal
+    name: str = ""
+
+
+@dataclass
+class DictOrder:
+    customer_name: str
+    table_number: int
+    items: List[DictOrderItem]
+    payment_method: str
+    status: str = "completed"
+    order_time: Optional[datetime.datetime] = None
+    id: Optional[int] = None
+    idempotency_key: Optional[str] = None
+    provisional_id: Optional[str] = None
+
+
+def join_rows(orders: int, items_per_order: int):
+    """Yields fresh rows as a driver would: order columns repeated on each item row."""
+    rng = random.Random(15)
+    start = datetime.datetime(2023, 1, 1, 8)
+    for order_id in range(1, orders + 1):
+        order_time = start + datetime.timedelta(seconds=order_id * 41)
+        for _ in range(items_per_order):
+            item_id = rng.randrange(len(MENU))
+            name, price = MENU[item_id]
+            quantity = rng.randint(1, 3)
+            yield (order_id, f"customer-{order_id % 3000}", 1 + order_id % 12, order_time, "completed", "cash",
+                   Decimal("200.00"), Decimal("18.00"), Decimal("18.00"), Decimal("236.00"),
+                   item_id + 1, f"{name}", quantity, price + 0, price * quantity)
+
+
+def build_models(rows, order_type, item_type) -> list:
+    orders = []
+    for row in rows:
+        if not orders or orders[-1].id != row[0]:
+            orders.append(order_type(customer_name=row[1], table_number=row[2], items=[], payment_method=row[5],
+                                     status=row[4], order_time=row[3], id=row[0]))
+        orders[-1].items.append(item_type(item_id=row[10], quantity=row[12], price=row[13], name=row[11]))
+    return orders
+
+
+def build_batch(rows) -> OrderBatch:
+    batch = OrderBatch()
+    last_order_id = None
+    for row in rows:
+        if row[0] != last_order_id:
+            batch.append_order(*row[:10])
+            last_order_id = row[0]
+        batch.append_item(*row[10:])
+    return batch
+
+
+def measure(label: str, build, orders: int, items_per_order: int) -> None:
+    # Timed from rows made beforehand, and traced in a separate build as tracing slows every allocation down
+    rows = list(join_rows(orders, items_per_order))
+    gc.collect()
+    start = time.perf_counter()
+    result = build(rows)
+    elapsed = time.perf_counter() - start
+    del result, rows
+
+    gc.collect()
+    tracemalloc.start()
+    result = build(join_rows(orders, items_per_order))
+    gc.collect()
+    kept, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    print(f"{label:<26} {kept / 2**20:8.1f} MB kept   {elapsed:6.2f} s to build")
+
+
+def main():
+    orders = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    items_per_order = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    print(f"{orders:,} orders x {items_per_order} items")
+    measure("dict-backed dataclasses", lambda rows: build_models(rows, DictOrder, DictOrderItem), orders, items_per_order)
+    measure("slotted Order/OrderItem", lambda rows: build_models(rows, Order, OrderItem), orders, items_per_order)
+    measure("OrderBatch", build_batch, orders, items_per_order)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Micro-benchmark: float bill arithmetic versus the Decimal MoneyEngine, per order and in batch.
+
+Per order: pricing a bill's lines and formatting them with its totals, the work
+create_order, generate_bill and the GUI summary repeat for every order. In batch:
+taxes for many stored subtotals, as check-order-totals computes them. Needs no database.
+
+Usage: python benchmarks/bench_money.py [orders] [items_per_order]
+"""
+import os
+import random
+import sys
+import timeit
+from decimal import Decimal
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from cafe import CafeBillingSystem, to_paise  # noqa: E402
+
+CGST_RATE = CafeBillingSystem.CGST_RATE
+SGST_RATE = CafeBillingSystem.SGST_RATE
+
+
+def float_bill(lines) -> list:
+    """The float arithmetic create_order and generate_bill used before MoneyEngine."""
+    bill = []
+    subtotal = 0.0
+    for price, quantity in lines:
+        bill.append(f"x{quantity} @ {price:.2f} = {price * quantity:.2f}")
+        subtotal += price * quantity
+    cgst = subtotal * (CGST_RATE / 100)
+    sgst = subtotal * (SGST_RATE / 100)
+    bill.append(f"{subtotal:.2f} {cgst:.2f} {sgst:.2f} {subtotal + cgst + sgst:.2f}")
+    return bill
+
+
+def engine_bill(lines) -> list:
+    money = CafeBillingSystem.money
+    bill = []
+    line_totals = []
+    for price, quantity in lines:
+        line_total = money.line_total(price, quantity)
+        bill.append(f"x{quantity} @ {price:.2f} = {line_total:.2f}")
+        line_totals.append(line_total)
+    totals = money.bill_totals(line_totals)
+    bill.append(f"{totals.subtotal:.2f} {totals.cgst:.2f} {totals.sgst:.2f} {totals.total:.2f}")
+    return bill
+
+
+def float_batch(subtotals) -> tuple:
+    """Per-order taxes and totals rounded to the paisa with floats."""
+    cgst_rate, sgst_rate = CGST_RATE / 100, SGST_RATE / 100
+    cgst = [round(subtotal * cgst_rate, 2) for subtotal in subtotals]
+    sgst = [round(subtotal * sgst_rate, 2) for subtotal in subtotals]
+    return cgst, sgst, [subtotal + c + s for subtotal, c, s in zip(subtotals, cgst, sgst)]
+
+
+def engine_batch(subtotals_paise) -> tuple:
+    return CafeBillingSystem.money.batch_taxes(subtotals_paise)
+
+
+def per_call_us(func, repeat: int = 5) -> float:
+    timer = timeit.Timer(func)
+    loops, _ = timer.autorange()
+    return min(timer.repeat(repeat, loops)) / loops * 1e6
+
+
+def main():
+    orders = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    items_per_order = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    rng = random.Random(7)
+
+    decimal_lines = [(Decimal(rng.randint(1, 99999)).scaleb(-2), rng.randint(1, 4)) for _ in range(items_per_order)]
+    float_lines = [(float(price), quantity) for price, quantity in decimal_lines]
+    float_us = per_call_us(lambda: float_bill(float_lines))
+    engine_us = per_call_us(lambda: engine_bill(decimal_lines))
+    print(f"per order ({items_per_order} lines)   float {float_us:7.2f} us   MoneyEngine {engine_us:7.2f} us")
+
+    subtotals = [Decimal(rng.randint(100, 500000)).scaleb(-2) for _ in range(orders)]
+    float_subtotals = [float(subtotal) for subtotal in subtotals]
+    subtotals_paise = [to_paise(subtotal) for subtotal in subtotals]
+    float_ms = per_call_us(lambda: float_batch(float_subtotals)) / 1000
+    engine_ms = per_call_us(lambda: engine_batch(subtotals_paise)) / 1000
+    convert_ms = per_call_us(lambda: [to_paise(subtotal) for subtotal in subtotals]) / 1000
+    print(f"batch ({orders:,} orders)       float {float_ms:7.2f} ms   batch_taxes {engine_ms:7.2f} ms"
+          f"   (+{convert_ms:.2f} ms converting Decimal subtotals to paise)")
+
+
+if __name__ == "__main__":
+    main()
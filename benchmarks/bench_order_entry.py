@@ -0,0 +1,150 @@
+"""Benchmark: Place New Order screen latency for adding, re-adding and removing lines on a large order.
+
+Drives a real CafeBillingGUI on a temporary SQLite database whose menu is padded
+to at least `lines` items. It adds `lines` distinct items one at a time, adds each
+one again (raising its quantity), then removes every line, letting Tk redraw after
+each step. It then repeats the same steps with the old handlers: a linear scan of
+the menu and of the order, and a Treeview cleared and refilled on every change.
+Prints p50/p95/max milliseconds per step for both.
+
+Needs a display. Without DISPLAY it starts Xvfb (which must be installed) on a free
+display number and stops it at the end.
+
+Usage: python benchmarks/bench_order_entry.py [lines]
+"""
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import cafe  # noqa: E402
+
+
+def start_xvfb():
+    """Starts Xvfb on the first free display and points DISPLAY at it; returns the process."""
+    if shutil.which("Xvfb") is None:
+        print("No DISPLAY is set and Xvfb is not installed.")
+        sys.exit(1)
+    for number in range(99, 120):
+        if os.path.exists(f"/tmp/.X11-unix/X{number}") or os.path.exists(f"/tmp/.X{number}-lock"):
+            continue
+        process = subprocess.Popen(["Xvfb", f":{number}", "-screen", "0", "1280x900x24", "-nolisten", "tcp"],
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        for _ in range(50):
+            if os.path.exists(f"/tmp/.X11-unix/X{number}"):
+                os.environ["DISPLAY"] = f":{number}"
+                return process
+            time.sleep(0.1)
+        process.terminate()
+    print("Could not start Xvfb.")
+    sys.exit(1)
+
+
+def legacy_add(app, items: list, menu_item_str: str, quantity: int) -> None:
+    """The old add_item_to_order: parses the id, scans the menu and the order, then refills the tree."""
+    item_id = int(menu_item_str.split(" - ")[0])
+    menu_item = next((i for i in app.menu_items if i.id == item_id), None)
+    for order_item in items:
+        if order_item.item_id == item_id:
+            order_item.quantity += quantity
+            break
+    else:
+        items.append(cafe.OrderItem(item_id=item_id, quantity=quantity, price=menu_item.price, name=menu_item.name))
+    legacy_refresh(app, items)
+
+
+def legacy_remove(app, items: list, index: int) -> None:
+    del items[index]
+    legacy_refresh(app, items)
+
+
+def legacy_refresh(app, items: list) -> None:
+    """The old refresh_order_tree plus update_order_summary_labels: every row and the totals redone."""
+    money = app.system.money
+    for row in app.order_tree.get_children():
+        app.order_tree.delete(row)
+    for index, item in enumerate(items):
+        total_price = money.line_total(item.price, item.quantity)
+        app.order_tree.insert("", "end", iid=str(index),
+                              values=(item.name, item.quantity, f"₹{item.price:.2f}", f"₹{total_price:.2f}"))
+    totals = money.bill_totals(money.line_total(item.price, item.quantity) for item in items)
+    app.total_label.config(text=f"Total Amount: ₹{totals.total:.2f}")
+
+
+def timed_steps(root, steps) -> list:
+    latencies = []
+    for step in steps:
+        start = time.perf_counter()
+        step()
+        root.update()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def report(label: str, latencies: list) -> None:
+    p50 = statistics.median(latencies)
+    p95 = statistics.quantiles(latencies, n=20)[-1]
+    print(f"{label:<22} p50 {p50:7.2f} ms  p95 {p95:7.2f} ms  max {max(latencies):7.2f} ms")
+
+
+def main():
+    lines = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    xvfb = start_xvfb() if not os.environ.get("DISPLAY") else None
+
+    scratch_dir = tempfile.mkdtemp(prefix="cafe-entry-")
+    cafe.OFFLINE_QUEUE_CONFIG['path'] = os.path.join(scratch_dir, "offline_orders.db")
+    cafe.DB_BACKEND = 'sqlite'
+    cafe.SQLITE_CONFIG['path'] = os.path.join(scratch_dir, "entry.db")
+    cafe.SERVER_CONFIG['use_server'] = False
+    import tkinter as tk
+    import cafe_GUI
+
+    root = tk.Tk()
+    app = None
+    try:
+        app = cafe_GUI.CafeBillingGUI(root)
+        menu_size = len(app.system.get_menu_items())
+        for n in range(menu_size, lines):
+            app.system.db.execute_query("INSERT INTO menu_items (name, price, category, available) VALUES (%s, %s, %s, %s)",
+                                        (f"Catering item {n}", 25 + n % 50, "Catering", True))
+        app.system.invalidate_menu_cache()
+        app.on_menu_loaded(app.system.get_menu_items())
+        root.update()
+        print(f"{lines} order lines, menu of {len(app.menu_items)} items")
+
+        def add(index: int):
+            def step():
+                app.selected_item_combo.current(index)
+                app.add_item_to_order()
+            return step
+
+        def remove(item_id: int):
+            def step():
+                app.order_tree.selection_set(str(item_id))
+                app.remove_selected_order_item()
+            return step
+
+        report("add line", timed_steps(root, [add(index) for index in range(lines)]))
+        report("add to existing line", timed_steps(root, [add(index) for index in range(lines)]))
+        report("remove line", timed_steps(root, [remove(item.id) for item in reversed(app.menu_items[:lines])]))
+
+        app.reset_new_order_form()
+        items = []
+        strs = app.menu_item_strs
+        report("old: add line", timed_steps(root, [lambda i=i: legacy_add(app, items, strs[i], 1) for i in range(lines)]))
+        report("old: add to existing", timed_steps(root, [lambda i=i: legacy_add(app, items, strs[i], 1) for i in range(lines)]))
+        report("old: remove line", timed_steps(root, [lambda: legacy_remove(app, items, len(items) - 1) for _ in range(lines)]))
+        app.reset_new_order_form()
+    finally:
+        cafe_GUI.on_closing(root, app)
+        if xvfb is not None:
+            xvfb.terminate()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Benchmark: overhead of QueryStats instrumentation on the cheapest and the busiest statements.
+
+Times a primary-key fetch_one, the least work a statement can be and so the worst case
+for relative overhead, and create_order, with statement timing switched on and off.
+Also times QueryStats.record() on its own. Runs against a temporary SQLite database,
+or against a scratch MySQL database (DB_CONFIG's name with a "_stats" suffix).
+
+Usage: python benchmarks/bench_query_stats.py [calls] [sqlite|mysql]
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import cafe  # noqa: E402
+from cafe import CafeBillingSystem, Order, OrderItem, QueryStats  # noqa: E402
+
+
+def open_backend(name: str, scratch_dir: str) -> cafe.StorageBackend:
+    if name == "mysql":
+        config = {**cafe.DB_CONFIG, 'database': cafe.DB_CONFIG['database'] + "_stats"}
+        return cafe.MySQLConnector(config, **cafe.POOL_CONFIG)
+    # Without fsync on commit, whose jitter would swamp the few microseconds measured here
+    return cafe.SQLiteConnector(**{**cafe.SQLITE_CONFIG, 'path': os.path.join(scratch_dir, "stats.db"), 'synchronous': 'OFF'})
+
+
+def per_call_us(func, calls: int) -> float:
+    """Best of five runs of calls calls, in microseconds per call."""
+    best = float("inf")
+    for _ in range(5):
+        start = time.perf_counter()
+        for _ in range(calls):
+            func()
+        best = min(best, time.perf_counter() - start)
+    return best / calls * 1e6
+
+
+def compare(label: str, db: cafe.StorageBackend, func, calls: int) -> None:
+    timings = {}
+    for enabled in (False, True, False, True): # Alternated, so warm-up favours neither side
+        db.query_stats.enabled = enabled
+        timings[enabled] = min(timings.get(enabled, float("inf")), per_call_us(func, calls))
+    overhead = timings[True] - timings[False]
+    print(f"{label:<22} off {timings[False]:8.1f} us   on {timings[True]:8.1f} us   "
+          f"overhead {overhead:+6.1f} us ({overhead / timings[False]:+.1%})")
+
+
+def main():
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    backend = sys.argv[2] if len(sys.argv) > 2 else "sqlite"
+    scratch_dir = tempfile.mkdtemp(prefix="cafe-stats-")
+    cafe.OFFLINE_QUEUE_CONFIG['path'] = os.path.join(scratch_dir, "offline_orders.db")
+    cafe.QUERY_STATS_CONFIG['slow_query_log'] = os.path.join(scratch_dir, "slow_queries.log")
+
+    db = open_backend(backend, scratch_dir)
+    if not db.is_connected():
+        print(f"{backend}: database unreachable")
+        sys.exit(1)
+    db.execute_query("DELETE FROM orders")
+    db.execute_query("DELETE FROM daily_sales")
+    system = CafeBillingSystem(db)
+    menu = system.get_menu_items()
+    order_id = system.create_order(Order("stats", 1, [OrderItem(menu[0].id, 1, 0)], "cash")).id
+
+    def place_order():
+        system.create_order(Order("stats", 2, [OrderItem(menu[i].id, 1 + i, 0) for i in range(3)], "card"))
+
+    try:
+        compare("fetch_one by id", db, lambda: db.fetch_one("SELECT * FROM orders WHERE id = %s", (order_id,)), calls)
+        compare("create_order (3 items)", db, place_order, max(calls // 10, 1))
+    finally:
+        db.execute_query("DELETE FROM orders")
+        db.execute_query("DELETE FROM daily_sales")
+        system.close()
+
+    stats = QueryStats()
+    sql = "SELECT * FROM orders WHERE id = %s"
+    print(f"QueryStats.record()     {per_call_us(lambda: stats.record(sql, 0.0001, 1), calls * 10):8.2f} us per call")
+
+
+if __name__ == "__main__":
+    main()
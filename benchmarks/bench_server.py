@@ -0,0 +1,145 @@
+"""Benchmark: many counters placing orders through one cafe_server.py versus each opening the database itself.
+
+Starts a CafeServer in its own process, then N terminal processes that each place
+the same seeded run of orders, one after another, as fast as the server answers
+them. The same run is then repeated with N processes that each hold their own
+CafeBillingSystem on the same database. Reports orders per second over all
+terminals and the p50/p95/p99 time to place an order, and how many commits the
+server used. Runs against a temporary SQLite database, or against a scratch
+MySQL database (DB_CONFIG's name with a "_server" suffix).
+
+Usage: python benchmarks/bench_server.py [terminals] [orders_per_terminal] [sqlite|mysql]
+"""
+import asyncio
+import multiprocessing
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import cafe  # noqa: E402
+from cafe import CafeBillingSystem, Order, OrderItem  # noqa: E402
+from cafe_server import CafeClient, CafeServer  # noqa: E402
+
+
+def open_backend(name: str, scratch_dir: str) -> cafe.StorageBackend:
+    if name == "mysql":
+        config = {**cafe.DB_CONFIG, 'database': cafe.DB_CONFIG['database'] + "_server"}
+        return cafe.MySQLConnector(config, **cafe.POOL_CONFIG)
+    return cafe.SQLiteConnector(**{**cafe.SQLITE_CONFIG, 'path': os.path.join(scratch_dir, "server.db")})
+
+
+def terminal_orders(terminal: int, orders: int, menu) -> list:
+    rng = random.Random(terminal)
+    return [
+        Order(customer_name=f"terminal-{terminal}-{rng.randrange(200)}", table_number=1 + n % 12,
+              items=[OrderItem(item.id, rng.randint(1, 3), item.price) for item in rng.sample(menu, rng.randint(1, 4))],
+              payment_method=rng.choice(("cash", "card", "upi")))
+        for n in range(orders)
+    ]
+
+
+def serve(backend: str, scratch_dir: str, port, ready, stop) -> None:
+    """Server process: serves until stop is set, then reports its batch count through port."""
+    cafe.OFFLINE_QUEUE_CONFIG['path'] = os.path.join(scratch_dir, "offline_server.db")
+    system = CafeBillingSystem(open_backend(backend, scratch_dir))
+    server = CafeServer(system, port=0, batch_window=cafe.SERVER_CONFIG['batch_window'],
+                        max_batch_size=cafe.SERVER_CONFIG['max_batch_size'], workers=cafe.SERVER_CONFIG['workers'])
+
+    async def run():
+        await server.start()
+        port.value = server.port
+        ready.set()
+        while not stop.is_set():
+            await asyncio.sleep(0.05)
+        await server.stop()
+
+    asyncio.run(run())
+    port.value = server.batches
+    system.close()
+
+
+def place_orders(mode: str, terminal: int, orders: int, backend: str, scratch_dir: str, port: int,
+                 barrier, results) -> None:
+    """Terminal process: places its orders once every terminal is ready and reports their latencies."""
+    cafe.OFFLINE_QUEUE_CONFIG['path'] = os.path.join(scratch_dir, f"offline_{mode}_{terminal}.db")
+    if mode == "server":
+        system = CafeClient(port=port)
+    else:
+        system = CafeBillingSystem(open_backend(backend, scratch_dir))
+    batch = terminal_orders(terminal, orders, system.get_menu_items())
+    latencies = []
+    failed = 0
+    barrier.wait()
+    for order in batch:
+        start = time.perf_counter()
+        if system.create_order(order) is None:
+            failed += 1
+        latencies.append(time.perf_counter() - start)
+    results.put((latencies, failed, time.perf_counter()))
+    system.close()
+
+
+def run_terminals(mode: str, terminals: int, orders: int, backend: str, scratch_dir: str, port: int = 0) -> int:
+    barrier = multiprocessing.Barrier(terminals + 1)
+    results = multiprocessing.Queue()
+    processes = [
+        multiprocessing.Process(target=place_orders,
+                                args=(mode, terminal, orders, backend, scratch_dir, port, barrier, results))
+        for terminal in range(terminals)
+    ]
+    for process in processes:
+        process.start()
+    barrier.wait()
+    start = time.perf_counter()
+    reports = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+
+    elapsed = max(finished for _, _, finished in reports) - start
+    latencies = sorted(latency * 1000 for terminal_latencies, _, _ in reports for latency in terminal_latencies)
+    failed = sum(terminal_failed for _, terminal_failed, _ in reports)
+    p50, p95, p99 = (statistics.quantiles(latencies, n=100)[p - 1] for p in (50, 95, 99))
+    print(f"{mode:<8} {len(latencies):>7,} orders in {elapsed:6.2f} s = {len(latencies) / elapsed:7,.0f} orders/s   "
+          f"p50 {p50:6.1f} ms  p95 {p95:6.1f} ms  p99 {p99:6.1f} ms   {failed} failed")
+    return len(latencies) - failed
+
+
+def main():
+    terminals = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    orders = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    backend = sys.argv[3] if len(sys.argv) > 3 else "sqlite"
+
+    scratch_dir = tempfile.mkdtemp(prefix="cafe-server-")
+    cafe.OFFLINE_QUEUE_CONFIG['path'] = os.path.join(scratch_dir, "offline_orders.db")
+    db = open_backend(backend, scratch_dir)
+    db.execute_query("DELETE FROM orders")
+    db.execute_query("DELETE FROM daily_sales")
+    system = CafeBillingSystem(db)
+    print(f"{terminals} terminals x {orders} orders on {backend}")
+
+    port = multiprocessing.Value("i", 0)
+    ready, stop = multiprocessing.Event(), multiprocessing.Event()
+    server = multiprocessing.Process(target=serve, args=(backend, scratch_dir, port, ready, stop))
+    server.start()
+    try:
+        ready.wait()
+        placed = run_terminals("server", terminals, orders, backend, scratch_dir, port.value)
+        stop.set()
+        server.join()
+        print(f"{'':<8} {placed:>7,} orders written in {port.value:,} commits")
+        run_terminals("direct", terminals, orders, backend, scratch_dir)
+    finally:
+        stop.set()
+        server.join()
+        db.execute_query("DELETE FROM orders")
+        system.rebuild_daily_sales()
+        system.close()
+
+
+if __name__ == "__main__":
+    main()
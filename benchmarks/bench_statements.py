@@ -0,0 +1,96 @@
+"""Benchmark: per-call overhead of registered, reused statements versus the fresh-cursor query helpers.
+
+Makes the same calls through both paths against a scratch database holding a few
+orders, and prints microseconds per call and the speed-up:
+  - one orders row by id: fetch_one (new dictionary cursor per call) vs fetch_statement (reused cursor, tuple rows),
+  - get_order as it was (fetch_one plus a streamed items query) vs get_order on the registered statements,
+  - a one-row UPDATE: execute_query vs execute_statement.
+Runs against a temporary SQLite database, or against a scratch MySQL database (DB_CONFIG's
+name with a "_statements" suffix), where fetch_statement uses server-side prepared statements.
+
+Usage: python benchmarks/bench_statements.py [calls] [sqlite|mysql]
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import cafe  # noqa: E402
+from cafe import CafeBillingSystem, Order, OrderItem, to_money  # noqa: E402
+
+ORDER_BY_ID = "SELECT id, customer_name, table_number, order_time, status, payment_method FROM orders WHERE id = %s"
+TOUCH_ITEM = "UPDATE order_items SET quantity = %s WHERE id = %s"
+
+
+def open_backend(name: str, scratch_dir: str) -> cafe.StorageBackend:
+    if name == "mysql":
+        config = {**cafe.DB_CONFIG, 'database': cafe.DB_CONFIG['database'] + "_statements"}
+        return cafe.MySQLConnector(config, **cafe.POOL_CONFIG)
+    return cafe.SQLiteConnector(**{**cafe.SQLITE_CONFIG, 'path': os.path.join(scratch_dir, "statements.db")})
+
+
+def legacy_get_order(system: CafeBillingSystem, order_id: int) -> Order:
+    """get_order before the statement registry: a dictionary row, then the items through stream()."""
+    order_data = system.db.fetch_one("SELECT * FROM orders WHERE id = %s", (order_id,))
+    items = [
+        OrderItem(item_id=item.item_id, quantity=item.quantity, price=to_money(item.unit_price), name=item.item_name)
+        for item in system.db.stream("SELECT item_id, quantity, unit_price, item_name FROM order_items WHERE order_id = %s",
+                                     (order_id,), row_mode="namedtuple")
+    ]
+    return Order(id=order_data['id'], customer_name=order_data['customer_name'], table_number=order_data['table_number'],
+                 order_time=order_data['order_time'], status=order_data['status'],
+                 payment_method=order_data['payment_method'], items=items)
+
+
+def per_call_us(calls: int, func) -> float:
+    start = time.perf_counter()
+    for n in range(calls):
+        func(n)
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def compare(label: str, calls: int, before, after) -> None:
+    before_us = per_call_us(calls, before)
+    after_us = per_call_us(calls, after)
+    print(f"{label:<14} before {before_us:8.1f} us/call   after {after_us:8.1f} us/call   {before_us / after_us:5.2f}x")
+
+
+def main():
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    backend = sys.argv[2] if len(sys.argv) > 2 else "sqlite"
+
+    scratch_dir = tempfile.mkdtemp(prefix="cafe-statements-")
+    cafe.OFFLINE_QUEUE_CONFIG['path'] = os.path.join(scratch_dir, "offline_orders.db")
+    db = open_backend(backend, scratch_dir)
+    db.execute_query("DELETE FROM orders")
+    db.execute_query("DELETE FROM daily_sales")
+    system = CafeBillingSystem(db)
+    db.register_statements({"touch_item": TOUCH_ITEM})
+    menu = system.get_menu_items()
+    order_ids = [
+        system.create_order(Order(f"statements-{n}", 1 + n % 12, [OrderItem(item.id, 1, item.price) for item in menu[n % 5:n % 5 + 3]], "cash")).id
+        for n in range(100)
+    ]
+    item_ids = [row['id'] for row in db.fetch_all("SELECT id FROM order_items")]
+    print(f"{calls:,} calls per path on {backend}")
+
+    try:
+        compare("order row", calls,
+                lambda n: db.fetch_one(ORDER_BY_ID, (order_ids[n % 100],)),
+                lambda n: db.fetch_statement("order_by_id", (order_ids[n % 100],)))
+        compare("get_order", calls,
+                lambda n: legacy_get_order(system, order_ids[n % 100]),
+                lambda n: system.get_order(order_ids[n % 100]))
+        compare("update", calls,
+                lambda n: db.execute_query(TOUCH_ITEM, (1 + n % 3, item_ids[n % len(item_ids)])),
+                lambda n: db.execute_statement("touch_item", (1 + n % 3, item_ids[n % len(item_ids)])))
+    finally:
+        db.execute_query("DELETE FROM orders")
+        system.rebuild_daily_sales()
+        system.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Benchmark: peak memory reading a large order_items table through fetch_all versus stream().
+
+Fills a scratch database with item_rows order_items rows, then reads them all
+back once per read path, each in a fresh process so peak RSS is measured per
+path: fetch_all (one list of dicts), and stream() in tuple, namedtuple and dict
+row modes. Runs against a temporary SQLite database, or against a scratch MySQL
+database (DB_CONFIG's name with a "_stream" suffix).
+
+Usage: python benchmarks/bench_stream_memory.py [item_rows] [sqlite|mysql]
+"""
+import datetime
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import cafe  # noqa: E402
+
+ITEMS_PER_ORDER = 10
+INSERT_CHUNK = 50000
+READ_QUERY = "SELECT id, order_id, item_id, item_name, quantity, unit_price, total_price FROM order_items"
+READ_PATHS = ("fetch_all", "stream:tuple", "stream:namedtuple", "stream:dict")
+
+
+def open_backend(name: str, db_path: str) -> cafe.StorageBackend:
+    if name == "mysql":
+        config = {**cafe.DB_CONFIG, 'database': cafe.DB_CONFIG['database'] + "_stream"}
+        return cafe.MySQLConnector(config, **cafe.POOL_CONFIG)
+    # Pages SQLite memory-maps count towards RSS, so map none: only the rows read should
+    return cafe.SQLiteConnector(**{**cafe.SQLITE_CONFIG, 'path': db_path, 'mmap_size': 0})
+
+
+def peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # ru_maxrss is in KiB on Linux
+
+
+def fill(db: cafe.StorageBackend, item_rows: int) -> None:
+    db.execute_query("DELETE FROM orders")
+    order_time = datetime.datetime(2022, 1, 1, 9)
+    orders = (item_rows + ITEMS_PER_ORDER - 1) // ITEMS_PER_ORDER
+    for first in range(1, orders + 1, INSERT_CHUNK):
+        order_ids = range(first, min(first + INSERT_CHUNK, orders + 1))
+        with db.transaction() as cursor:
+            cursor.executemany(
+                "INSERT INTO orders (id, customer_name, table_number, order_time, status, payment_method, "
+                "subtotal, cgst, sgst, total) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)",
+                [(order_id, f"stream-{order_id % 500}", 1 + order_id % 12, order_time, "completed", "cash",
+                  200, 5, 5, 210) for order_id in order_ids]
+            )
+            cursor.executemany(
+                "INSERT INTO order_items (order_id, item_id, item_name, quantity, unit_price, total_price) "
+                "VALUES (%s, %s, %s, %s, %s, %s)",
+                [(order_id, None, "Coffee", 1, 20, 20)
+                 for order_id in order_ids for _ in range(ITEMS_PER_ORDER)
+                 if (order_id - 1) * ITEMS_PER_ORDER < item_rows]
+            )
+
+
+def read(backend: str, db_path: str, path: str) -> None:
+    """Child process: reads every row through one path and prints rows, seconds, and peak RSS before and after."""
+    db = open_backend(backend, db_path)
+    db.ensure_connected()
+    baseline = peak_rss_mb()
+    start = time.perf_counter()
+    if path == "fetch_all":
+        rows = db.fetch_all(READ_QUERY)
+        count = len(rows)
+    else:
+        count = sum(1 for _ in db.stream(READ_QUERY, row_mode=path.split(":")[1], batch_size=1000))
+    elapsed = time.perf_counter() - start
+    print(f"{count} {elapsed} {baseline} {peak_rss_mb()}")
+
+
+def main():
+    if sys.argv[1:2] == ["--read"]:
+        read(*sys.argv[2:5])
+        return
+
+    item_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    backend = sys.argv[2] if len(sys.argv) > 2 else "sqlite"
+    scratch_dir = tempfile.mkdtemp(prefix="cafe-stream-")
+    db_path = os.path.join(scratch_dir, "stream.db")
+    db = open_backend(backend, db_path)
+    if not db.is_connected():
+        print(f"{backend}: database unreachable")
+        sys.exit(1)
+    fill(db, item_rows)
+    print(f"{item_rows:,} order_items rows on {backend}")
+
+    try:
+        for path in READ_PATHS:
+            result = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--read", backend, db_path, path],
+                capture_output=True, text=True, check=True
+            )
+            count, elapsed, baseline, peak = (float(value) for value in result.stdout.split()[-4:])
+            print(f"{path:<18} {int(count):>10,} rows in {elapsed:6.2f} s   "
+                  f"peak RSS {peak:7.1f} MB (+{peak - baseline:.1f} MB reading)")
+    finally:
+        db.execute_query("DELETE FROM orders")
+        db.close_connection()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Property checks for MoneyEngine: a printed bill always equals the stored order.
+
+Adds randomly priced menu items to a scratch database, places random orders through
+create_order, and checks for every order that:
+  - the bill's subtotal, CGST, SGST and total equal the stored orders row,
+  - the stored total is exactly subtotal + CGST + SGST,
+  - a bill reprinted from get_order is identical to the one printed at the till,
+  - batch_taxes gives the same taxes as bill_totals.
+Finally the daily report must equal the sum of the stored totals and
+check_order_totals must find nothing. Runs against a temporary SQLite database,
+or against a scratch MySQL database (DB_CONFIG's name with a "_money" suffix).
+
+Usage: python benchmarks/check_money_properties.py [orders] [sqlite|mysql]
+"""
+import datetime
+import os
+import random
+import re
+import sys
+import tempfile
+from decimal import Decimal
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import cafe  # noqa: E402
+from cafe import CafeBillingSystem, Order, OrderItem, to_money, to_paise  # noqa: E402
+
+BILL_AMOUNT = re.compile(r"^(Subtotal \(before GST\)|CGST @ [\d.]+%|SGST @ [\d.]+%|Total Amount \(including GST\)): ₹([\d.]+)$", re.M)
+
+
+def open_backend(name: str, scratch_dir: str) -> cafe.StorageBackend:
+    if name == "mysql":
+        config = {**cafe.DB_CONFIG, 'database': cafe.DB_CONFIG['database'] + "_money"}
+        return cafe.MySQLConnector(config, **cafe.POOL_CONFIG)
+    return cafe.SQLiteConnector(**{**cafe.SQLITE_CONFIG, 'path': os.path.join(scratch_dir, "money.db")})
+
+
+def bill_amounts(bill: str) -> tuple:
+    return tuple(Decimal(amount) for _, amount in BILL_AMOUNT.findall(bill))
+
+
+def main():
+    orders = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    backend = sys.argv[2] if len(sys.argv) > 2 else "sqlite"
+    scratch_dir = tempfile.mkdtemp(prefix="cafe-money-")
+    cafe.OFFLINE_QUEUE_CONFIG['path'] = os.path.join(scratch_dir, "offline_orders.db")
+    rng = random.Random(12)
+
+    db = open_backend(backend, scratch_dir)
+    db.execute_query("DELETE FROM orders")
+    db.execute_query("DELETE FROM daily_sales")
+    db.execute_query("DELETE FROM menu_items WHERE name LIKE 'money-%'")
+    for n in range(40):
+        # Prices down to the paisa, including the awkward ones floats cannot represent
+        price = Decimal(rng.choice([rng.randint(1, 99999), rng.randint(1, 99) * 100 + rng.choice([5, 15, 35, 45, 95])])).scaleb(-2)
+        db.execute_query("INSERT INTO menu_items (name, price, category, available) VALUES (%s, %s, %s, %s)",
+                         (f"money-{n}", price, "Property checks", True))
+    system = CafeBillingSystem(db)
+    menu = [item for item in system.get_menu_items() if item.name.startswith("money-")]
+
+    failures = []
+    stored_sum = Decimal("0.00")
+    for n in range(orders):
+        order = Order(
+            customer_name=f"money-{n}",
+            table_number=1 + n % 12,
+            items=[OrderItem(item_id=rng.choice(menu).id, quantity=rng.randint(1, 9), price=0)
+                   for _ in range(rng.randint(1, 15))],
+            payment_method=rng.choice(("cash", "card", "upi"))
+        )
+        saved = system.create_order(order, verify=True)
+        if saved is None:
+            failures.append(f"order {n} was not saved")
+            continue
+        row = db.fetch_one("SELECT subtotal, cgst, sgst, total FROM orders WHERE id = %s", (saved.id,))
+        stored = tuple(to_money(row[column]) for column in ("subtotal", "cgst", "sgst", "total"))
+        stored_sum += stored[3]
+
+        till_bill = system.generate_bill(saved)
+        if bill_amounts(till_bill) != stored:
+            failures.append(f"order {saved.id}: bill {bill_amounts(till_bill)} != stored {stored}")
+        if stored[0] + stored[1] + stored[2] != stored[3]:
+            failures.append(f"order {saved.id}: stored total does not add up: {stored}")
+        if system.generate_bill(system.get_order(saved.id)) != till_bill:
+            failures.append(f"order {saved.id}: reprinted bill differs from the till's")
+        cgst, sgst, totals = system.money.batch_taxes([to_paise(stored[0])])
+        if (cgst[0], sgst[0], totals[0]) != tuple(to_paise(amount) for amount in stored[1:]):
+            failures.append(f"order {saved.id}: batch_taxes gives {(cgst[0], sgst[0], totals[0])} for {stored}")
+
+    report = system.get_daily_sales_report(datetime.date.today())
+    if report['net_sales'] != stored_sum:
+        failures.append(f"daily report net sales {report['net_sales']} != sum of stored totals {stored_sum}")
+    drifted = system.check_order_totals()
+    if drifted:
+        failures.append(f"check_order_totals found {len(drifted)} order(s), first: {drifted[0]}")
+
+    db.execute_query("DELETE FROM orders")
+    db.execute_query("DELETE FROM menu_items WHERE name LIKE 'money-%'")
+    system.rebuild_daily_sales()
+    system.close()
+
+    for failure in failures[:20]:
+        print(f"FAIL {failure}")
+    print(f"{orders} orders checked on {backend}, {len(failures)} failure(s)")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Checks the number of statements a submitted order costs, as the GUI submits it.
+
+Counts statements per create_order(verify=True) plus generate_bill with the
+server's per-session 'Questions' and 'Com_select' counters. The cost of
+reading the counters themselves is measured first and subtracted. Fails if
+an order costs more than ORDER_STATEMENT_BUDGET statements or does any reads.
+Runs against a scratch MySQL database (DB_CONFIG's database name with a
+"_budget" suffix); its orders are removed and its rollups rebuilt afterwards.
+
+Usage: python benchmarks/check_order_query_budget.py [orders]
+"""
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import cafe  # noqa: E402
+from cafe import CafeBillingSystem, Order, OrderItem  # noqa: E402
+
+# START TRANSACTION, customers upsert, INSERT orders, INSERT order_items, customer_items upsert,
+# daily_sales upsert, COMMIT
+ORDER_STATEMENT_BUDGET = 7
+
+
+def counters(system: CafeBillingSystem) -> dict:
+    rows = system.db.fetch_all("SHOW SESSION STATUS WHERE Variable_name IN ('Questions', 'Com_select')")
+    return {row['Variable_name']: int(row['Value']) for row in rows}
+
+
+def delta(before: dict, after: dict, overhead: dict) -> dict:
+    return {name: after[name] - before[name] - overhead[name] for name in before}
+
+
+def main():
+    orders = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    cafe.OFFLINE_QUEUE_CONFIG['path'] = os.path.join(tempfile.mkdtemp(prefix="cafe-budget-"), "offline_orders.db")
+    config = {**cafe.DB_CONFIG, 'database': cafe.DB_CONFIG['database'] + "_budget"}
+    db = cafe.MySQLConnector(config, **cafe.POOL_CONFIG)
+    db.execute_query("DELETE FROM orders")
+    system = CafeBillingSystem(db)
+    try:
+        menu = system.get_menu_items() # Warm the menu cache, as the order screen does
+
+        first = counters(system)
+        overhead = delta(first, counters(system), {name: 0 for name in first})
+
+        worst = {'Questions': 0, 'Com_select': 0}
+        for n in range(orders):
+            order = Order(
+                customer_name=f"budget-{n}",
+                table_number=1,
+                items=[OrderItem(item_id=menu[i % len(menu)].id, quantity=1, price=0) for i in range(1 + n % 12)],
+                payment_method="card"
+            )
+            before = counters(system)
+            saved_order = system.create_order(order, verify=True)
+            system.generate_bill(saved_order)
+            cost = delta(before, counters(system), overhead)
+            worst = {name: max(worst[name], cost[name]) for name in worst}
+
+        print(f"worst case per order: {worst['Questions']} statements, {worst['Com_select']} reads "
+              f"(budget {ORDER_STATEMENT_BUDGET} statements, 0 reads)")
+    finally:
+        db.execute_query("DELETE FROM orders")
+        system.rebuild_daily_sales()
+        system.rebuild_customers()
+        system.close()
+    sys.exit(0 if worst['Questions'] <= ORDER_STATEMENT_BUDGET and worst['Com_select'] == 0 else 1)
+
+
+if __name__ == "__main__":
+    main()
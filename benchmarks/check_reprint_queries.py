@@ -0,0 +1,99 @@
+"""Check: reprinting recent bills is answered by the order cache without touching the database.
+
+Places `orders` orders on a scratch database, then reads back and reprints the last
+100 through get_order and generate_bill, counting the statements the backend ran
+(from its QueryStats) while doing so. Fails unless that count is zero and every
+reprinted bill matches the one printed when the order was placed. Then drops the
+cache, reprints again to show what the same bills cost from the database, and
+prints the cache's stats. Runs against a temporary SQLite database, or against a
+scratch MySQL database (DB_CONFIG's name with a "_reprint" suffix).
+
+Usage: python benchmarks/check_reprint_queries.py [orders] [sqlite|mysql]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import cafe  # noqa: E402
+from cafe import CafeBillingSystem, Order, OrderItem  # noqa: E402
+
+
+def open_backend(name: str, scratch_dir: str) -> cafe.StorageBackend:
+    if name == "mysql":
+        config = {**cafe.DB_CONFIG, 'database': cafe.DB_CONFIG['database'] + "_reprint"}
+        return cafe.MySQLConnector(config, **cafe.POOL_CONFIG)
+    return cafe.SQLiteConnector(**{**cafe.SQLITE_CONFIG, 'path': os.path.join(scratch_dir, "reprint.db")})
+
+
+def statement_calls(db: cafe.StorageBackend) -> int:
+    return sum(stats["calls"] for stats in db.query_stats.snapshot().values())
+
+
+def reprint(system: CafeBillingSystem, order_ids: list):
+    """Reprints the bills for order_ids; returns the bills, statements run and seconds taken."""
+    calls_before = statement_calls(system.db)
+    start = time.perf_counter()
+    bills = [system.generate_bill(system.get_order(order_id)) for order_id in order_ids]
+    return bills, statement_calls(system.db) - calls_before, time.perf_counter() - start
+
+
+def main():
+    orders = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    backend = sys.argv[2] if len(sys.argv) > 2 else "sqlite"
+
+    scratch_dir = tempfile.mkdtemp(prefix="cafe-reprint-")
+    cafe.OFFLINE_QUEUE_CONFIG['path'] = os.path.join(scratch_dir, "offline_orders.db")
+    db = open_backend(backend, scratch_dir)
+    db.execute_query("DELETE FROM orders")
+    db.execute_query("DELETE FROM daily_sales")
+    system = CafeBillingSystem(db)
+    rng = random.Random(22)
+    menu = system.get_menu_items()
+    failures = []
+
+    try:
+        placed = [
+            system.create_order(Order(f"reprint-{rng.randrange(100)}", 1 + n % 12,
+                                      [OrderItem(item.id, rng.randint(1, 3), item.price)
+                                       for item in rng.sample(menu, rng.randint(1, 4))],
+                                      rng.choice(("cash", "card", "upi"))))
+            for n in range(orders)
+        ]
+        recent = placed[-100:]
+        till_bills = [system.generate_bill(order) for order in recent]
+        recent_ids = [order.id for order in recent]
+
+        bills, statements, seconds = reprint(system, recent_ids)
+        print(f"cached:   {len(bills)} bills reprinted with {statements} statements in {seconds * 1000:.2f} ms")
+        if statements:
+            failures.append(f"{statements} statements run reprinting cached bills")
+        if bills != till_bills:
+            failures.append("a reprinted bill differs from the one printed at the till")
+
+        system.invalidate_order_cache()
+        bills, statements, seconds = reprint(system, recent_ids)
+        print(f"database: {len(bills)} bills reprinted with {statements} statements in {seconds * 1000:.2f} ms")
+        if bills != till_bills:
+            failures.append("a bill reprinted from the database differs from the one printed at the till")
+
+        system.invalidate_order(recent_ids[0])
+        if system.order_cache.get(recent_ids[0]) is not None:
+            failures.append("invalidate_order left the order cached")
+        print(f"order cache: {system.order_cache_stats()}")
+    finally:
+        db.execute_query("DELETE FROM orders")
+        system.rebuild_daily_sales()
+        system.close()
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    print("OK" if not failures else f"{len(failures)} check(s) failed")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Checks with EXPLAIN that the history and daily report queries use the schema's indexes.
+
+Runs the migrations against a scratch database (DB_CONFIG's database name with an
+"_explain" suffix), seeds it with orders spread over three years, and fails if MySQL
+plans a full scan for any of the checked queries.
+
+Usage: python benchmarks/explain_indexes.py [orders]
+"""
+import datetime
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from cafe import DB_CONFIG, POOL_CONFIG, MySQLConnector, rebuild_customer_totals  # noqa: E402
+
+CHUNK = 10000
+CUSTOMER_ORDERS = "customer_id = (SELECT id FROM customers WHERE name_key = %s)"  # As get_customer_orders filters
+
+
+def seed(db: MySQLConnector, orders: int) -> None:
+    existing = db.fetch_one("SELECT COUNT(*) AS count FROM orders")['count']
+    if existing >= orders:
+        return
+    rng = random.Random(42)
+    customers = [f"customer-{n}" for n in range(max(orders // 50, 1))]
+    start = datetime.datetime(2022, 1, 1)
+    span = 3 * 365 * 24 * 3600
+    for offset in range(existing, orders, CHUNK):
+        rows = [
+            (rng.choice(customers), rng.randint(1, 12), start + datetime.timedelta(seconds=rng.randrange(span)),
+             'completed', rng.choice(('cash', 'card')), 100, 9, 9, 118)
+            for _ in range(min(CHUNK, orders - offset))
+        ]
+        with db.transaction() as cursor:
+            cursor.executemany(
+                "INSERT INTO orders (customer_name, table_number, order_time, status, payment_method, subtotal, cgst, sgst, total) "
+                "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)",
+                rows
+            )
+        print(f"  seeded {offset + len(rows):,} orders", end="\r")
+    print()
+    with db.transaction() as cursor:
+        rebuild_customer_totals(db, cursor)  # Links the seeded orders to their customers
+    db.execute_query("ANALYZE TABLE orders, customers")
+
+
+def check(db: MySQLConnector, label: str, query: str, params: tuple, expected_index: str) -> bool:
+    plan = db.fetch_all("EXPLAIN " + query, params)
+    orders_step = next(row for row in plan if row['table'] == 'orders')
+    ok = orders_step['key'] == expected_index and orders_step['type'] != 'ALL'
+    print(f"{'ok  ' if ok else 'FAIL'} {label}: type={orders_step['type']} key={orders_step['key']} rows={orders_step['rows']}")
+    return ok
+
+
+def main():
+    orders = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    config = {**DB_CONFIG, 'database': DB_CONFIG['database'] + "_explain"}
+    db = MySQLConnector(config, **POOL_CONFIG)
+    seed(db, orders)
+
+    day_start = datetime.datetime(2023, 6, 1)
+    results = [
+        check(db, "daily report range",
+              "SELECT COUNT(id), SUM(total) FROM orders WHERE order_time >= %s AND order_time < %s",
+              (day_start, day_start + datetime.timedelta(days=1)), "idx_orders_order_time"),
+        check(db, "customer history page",
+              f"SELECT id, order_time FROM orders WHERE {CUSTOMER_ORDERS} ORDER BY order_time DESC, id DESC LIMIT 20",
+              ("customer-7",), "idx_orders_customer_id_time"),
+        check(db, "customer history next page",
+              f"SELECT id, order_time FROM orders WHERE {CUSTOMER_ORDERS} "
+              "AND (order_time < %s OR (order_time = %s AND id < %s)) ORDER BY order_time DESC, id DESC LIMIT 20",
+              ("customer-7", day_start, day_start, 500000), "idx_orders_customer_id_time"),
+    ]
+    db.close_connection()
+    sys.exit(0 if all(results) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,359 @@
+"""Load test: a busy shop's traffic against CafeBillingSystem, with results compared to a stored baseline.
+
+Seeds a scratch database with a synthetic menu, a customer base in which a few
+regulars order far more than the rest, and a history of orders spread over
+past days. Several simulated terminals (threads) then work the till at once,
+each running a fixed, seeded mix of operations:
+  - create_order (most operations),
+  - get_order, reprinting one of the terminal's earlier orders,
+  - get_customer_orders, the first history page of a customer,
+  - get_daily_sales_report for a day of the seeded history.
+The load is run --runs times from the same starting history; the run reports
+the median over runs of each operation's p50/p95/p99 latency and of the order
+throughput. It can write the results as JSON, save them as a baseline, and compare against a
+saved baseline, exiting non-zero if any operation is slower by more than the
+tolerance.
+
+The database is embedded SQLite by default, so no server or network is needed.
+Pass --db to keep the seeded file between runs: a later run with the same
+seeding options reuses it instead of seeding again. --backend mysql runs against
+a scratch MySQL database (DB_CONFIG's name with a "_load" suffix).
+
+Usage: python benchmarks/load_test.py [--history-orders N] [--terminals N] [--operations N]
+                                      [--output results.json] [--baseline baseline.json | --save-baseline baseline.json]
+"""
+import argparse
+import datetime
+import itertools
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import cafe  # noqa: E402
+from cafe import CafeBillingSystem, Order, OrderItem  # noqa: E402
+
+OPERATION_MIX = (("create_order", 0.60), ("get_order", 0.20), ("get_customer_orders", 0.15),
+                 ("get_daily_sales_report", 0.05))
+CATEGORIES = ("Beverages", "Cold Beverages", "Snacks", "Sandwiches", "Desserts", "Breakfast")
+PAYMENT_METHODS = ("cash", "card", "upi")
+SEED_CHUNK = 20000  # History orders per seeding transaction
+SEED_OPTIONS = ("seed", "menu_items", "customers", "history_orders", "history_days", "backend")
+PERCENTILES = (50, 95, 99)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--backend", choices=("sqlite", "mysql"), default="sqlite")
+    parser.add_argument("--db", help="SQLite file to seed, or reuse if it was seeded with the same options (default: a temporary file).")
+    parser.add_argument("--seed", type=int, default=17, help="Seed for every random choice (default: %(default)s).")
+    parser.add_argument("--menu-items", type=int, default=60, help="Synthetic menu size (default: %(default)s).")
+    parser.add_argument("--customers", type=int, default=20000, help="Distinct customers (default: %(default)s).")
+    parser.add_argument("--history-orders", type=int, default=1000000, help="Historical orders seeded (default: %(default)s).")
+    parser.add_argument("--history-days", type=int, default=730, help="Days the history is spread over (default: %(default)s).")
+    parser.add_argument("--terminals", type=int, default=4, help="Simulated terminals placing orders at once (default: %(default)s).")
+    parser.add_argument("--operations", type=int, default=2000, help="Operations per terminal (default: %(default)s).")
+    parser.add_argument("--runs", type=int, default=3, help="Load runs whose medians are reported (default: %(default)s).")
+    parser.add_argument("--output", help="Write the results to this JSON file.")
+    parser.add_argument("--baseline", help="Compare with the results saved in this JSON file.")
+    parser.add_argument("--save-baseline", help="Save the results as a baseline to this JSON file.")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Allowed slowdown against the baseline, as a fraction (default: %(default)s).")
+    parser.add_argument("--min-regression-ms", type=float, default=1.0,
+                        help="Ignore slowdowns smaller than this many milliseconds (default: %(default)s).")
+    return parser.parse_args()
+
+
+def open_backend(args: argparse.Namespace, scratch_dir: str) -> cafe.StorageBackend:
+    if args.backend == "mysql":
+        config = {**cafe.DB_CONFIG, 'database': cafe.DB_CONFIG['database'] + "_load"}
+        return cafe.MySQLConnector(config, **{**cafe.POOL_CONFIG, 'pool_size': args.terminals + 1})
+    return cafe.SQLiteConnector(**{**cafe.SQLITE_CONFIG, 'path': args.db or os.path.join(scratch_dir, "load.db")})
+
+
+class Population:
+    """The synthetic customers, drawn with a long-tailed popularity: customer k is ordered for about 1/(k+1) as often."""
+
+    def __init__(self, customers: int):
+        self.names = [f"load-customer-{k:06d}" for k in range(customers)]
+        weights = [1 / (k + 1) for k in range(customers)]
+        self.cum_weights = list(itertools.accumulate(weights))
+
+    def pick(self, rng: random.Random) -> str:
+        return rng.choices(self.names, cum_weights=self.cum_weights)[0]
+
+
+def seed_menu(db: cafe.StorageBackend, rng: random.Random, menu_items: int) -> None:
+    db.execute_query("DELETE FROM orders")
+    db.execute_query("DELETE FROM menu_items")
+    with db.transaction() as cursor:
+        cursor.executemany(
+            "INSERT INTO menu_items (name, price, category, available) VALUES (%s, %s, %s, %s)",
+            [(f"Load item {n:03d}", cafe.to_money(rng.choice((10, 20, 35, 50, 80, 90, 120, 150, 180, 240))
+                                                  + rng.choice((0, 0, 0.5, 0.25))),
+              CATEGORIES[n % len(CATEGORIES)], True)
+             for n in range(menu_items)]
+        )
+
+
+def seed_history(system: CafeBillingSystem, rng: random.Random, population: Population,
+                 orders: int, days: int) -> None:
+    """Writes orders priced exactly as create_order prices them, over the days before today."""
+    menu = system.get_menu_items()
+    money = system.money
+    first_day = datetime.datetime.combine(datetime.date.today() - datetime.timedelta(days=days), datetime.time(8))
+    order_id = 0
+    started = time.monotonic()
+    while order_id < orders:
+        order_rows, item_rows = [], []
+        for _ in range(min(SEED_CHUNK, orders - order_id)):
+            order_id += 1
+            items = [(rng.choice(menu), rng.randint(1, 3)) for _ in range(rng.randint(1, 6))]
+            line_totals = [money.line_total(item.price, quantity) for item, quantity in items]
+            totals = money.bill_totals(line_totals)
+            order_time = first_day + datetime.timedelta(days=(order_id - 1) * days // orders,
+                                                        seconds=rng.randrange(14 * 3600))
+            order_rows.append((order_id, population.pick(rng), rng.randint(1, 20), order_time, "completed",
+                               rng.choice(PAYMENT_METHODS), totals.subtotal, totals.cgst, totals.sgst, totals.total))
+            item_rows.extend((order_id, item.id, item.name, quantity, item.price, line_total)
+                             for (item, quantity), line_total in zip(items, line_totals))
+        with system.db.transaction() as cursor:
+            cursor.executemany(
+                "INSERT INTO orders (id, customer_name, table_number, order_time, status, payment_method, "
+                "subtotal, cgst, sgst, total) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)", order_rows
+            )
+            cursor.executemany(
+                "INSERT INTO order_items (order_id, item_id, item_name, quantity, unit_price, total_price) "
+                "VALUES (%s, %s, %s, %s, %s, %s)", item_rows
+            )
+        print(f"\rSeeded {order_id:,} of {orders:,} history orders ({order_id / (time.monotonic() - started):,.0f}/s)",
+              end="", flush=True)
+    print()
+    system.rebuild_daily_sales()
+    system.rebuild_customers()
+
+
+def prepare(args: argparse.Namespace, system: CafeBillingSystem, population: Population) -> None:
+    """Seeds the database unless --db names a file already seeded with the same options."""
+    options = {option: getattr(args, option) for option in SEED_OPTIONS}
+    marker = f"{args.db}.seed.json" if args.db else None
+    if marker and os.path.exists(marker):
+        with open(marker, encoding="utf-8") as marker_file:
+            if json.load(marker_file) == options:
+                reset_to_history(system, args)
+                print(f"Reusing the history seeded in {args.db}.")
+                return
+    rng = random.Random(args.seed)
+    seed_menu(system.db, rng, args.menu_items)
+    system.invalidate_menu_cache()
+    seed_history(system, rng, population, args.history_orders, args.history_days)
+    if marker:
+        with open(marker, "w", encoding="utf-8") as marker_file:
+            json.dump(options, marker_file)
+
+
+def reset_to_history(system: CafeBillingSystem, args: argparse.Namespace) -> None:
+    """Drops the orders load runs placed today, so every run starts from the same history."""
+    system.db.execute_query("DELETE FROM orders WHERE id > %s", (args.history_orders,))
+    system.rebuild_daily_sales(datetime.date.today(), datetime.date.today())
+    system.rebuild_customers()
+
+
+def terminal(system: CafeBillingSystem, population: Population, args: argparse.Namespace, number: int,
+             latencies: dict, failures: list) -> None:
+    """One till: runs its share of the operation mix and records each call's latency in milliseconds."""
+    rng = random.Random(args.seed * 1000 + number)
+    menu = system.get_menu_items()
+    operations = [operation for operation, _ in OPERATION_MIX]
+    weights = [weight for _, weight in OPERATION_MIX]
+    placed = []
+    timings = {operation: [] for operation in operations}
+    for _ in range(args.operations):
+        operation = rng.choices(operations, weights)[0]
+        if operation == "get_order" and not placed:
+            operation = "create_order"
+        if operation == "create_order":
+            order = Order(
+                customer_name=population.pick(rng),
+                table_number=rng.randint(1, 20),
+                items=[OrderItem(item_id=rng.choice(menu).id, quantity=rng.randint(1, 3), price=0)
+                       for _ in range(rng.randint(1, 6))],
+                payment_method=rng.choice(PAYMENT_METHODS)
+            )
+            call = lambda: system.create_order(order)  # noqa: E731
+        elif operation == "get_order":
+            order_id = rng.choice(placed)
+            call = lambda: system.get_order(order_id)  # noqa: E731
+        elif operation == "get_customer_orders":
+            customer = population.pick(rng)
+            call = lambda: system.get_customer_orders(customer, limit=20)  # noqa: E731
+        else:
+            day = datetime.date.today() - datetime.timedelta(days=rng.randint(1, args.history_days))
+            call = lambda: system.get_daily_sales_report(day)  # noqa: E731
+
+        start = time.perf_counter()
+        result = call()
+        timings[operation].append((time.perf_counter() - start) * 1000)
+        if result is None:
+            failures.append(f"terminal {number}: {operation} returned nothing")
+        elif operation == "create_order":
+            placed.append(result.id)
+    latencies[number] = timings
+
+
+def percentile(sorted_values: list, percent: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    rank = max(int(round(percent / 100 * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def summarize(latencies: dict) -> dict:
+    summary = {}
+    for operation, _ in OPERATION_MIX:
+        values = sorted(value for timings in latencies.values() for value in timings[operation])
+        if not values:
+            continue
+        summary[operation] = {
+            "calls": len(values),
+            "mean_ms": sum(values) / len(values),
+            **{f"p{percent}_ms": percentile(values, percent) for percent in PERCENTILES},
+            "max_ms": values[-1]
+        }
+    return summary
+
+
+def run_load(system: CafeBillingSystem, population: Population, args: argparse.Namespace) -> dict:
+    """One load run: every terminal works through its operations at once."""
+    latencies, failures = {}, []
+    terminals = [
+        threading.Thread(target=terminal, args=(system, population, args, number, latencies, failures))
+        for number in range(args.terminals)
+    ]
+    start = time.perf_counter()
+    for thread in terminals:
+        thread.start()
+    for thread in terminals:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    operations = summarize(latencies)
+    return {
+        "elapsed_seconds": elapsed,
+        "orders_per_second": operations.get("create_order", {}).get("calls", 0) / elapsed,
+        "failures": failures,
+        "operations": operations
+    }
+
+
+def median_of_runs(runs: list) -> dict:
+    """Each operation's statistics, and the throughput, as their medians over the runs."""
+    operations = {}
+    for operation, stats in runs[0]["operations"].items():
+        operations[operation] = {
+            key: statistics.median(run["operations"][operation][key] for run in runs) for key in stats
+        }
+    return {
+        "orders_per_second": statistics.median(run["orders_per_second"] for run in runs),
+        "operations": operations
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float, min_regression_ms: float) -> list:
+    """Returns a description of every percentile or throughput that regressed against the baseline."""
+    regressions = []
+    if baseline.get("config", {}).get("seeding") != results["config"]["seeding"]:
+        print("Warning: the baseline was seeded with different options; comparing anyway.")
+    for operation, stats in results["operations"].items():
+        base = baseline.get("operations", {}).get(operation)
+        if base is None:
+            continue
+        for percent in PERCENTILES:
+            key = f"p{percent}_ms"
+            limit = max(base[key] * (1 + tolerance), base[key] + min_regression_ms)
+            status = "REGRESSION" if stats[key] > limit else "ok"
+            print(f"  {status:<10} {operation:<24} {key:<7} {stats[key]:9.2f} ms (baseline {base[key]:.2f}, limit {limit:.2f})")
+            if stats[key] > limit:
+                regressions.append(f"{operation} {key} {stats[key]:.2f} ms > {limit:.2f} ms")
+    base_rate = baseline.get("orders_per_second")
+    if base_rate:
+        floor = base_rate * (1 - tolerance)
+        status = "REGRESSION" if results["orders_per_second"] < floor else "ok"
+        print(f"  {status:<10} {'orders per second':<32} {results['orders_per_second']:9.1f} (baseline {base_rate:.1f}, floor {floor:.1f})")
+        if results["orders_per_second"] < floor:
+            regressions.append(f"orders/s {results['orders_per_second']:.1f} < {floor:.1f}")
+    return regressions
+
+
+def main():
+    args = parse_args()
+    scratch_dir = tempfile.mkdtemp(prefix="cafe-load-")
+    cafe.OFFLINE_QUEUE_CONFIG['path'] = os.path.join(scratch_dir, "offline_orders.db")
+    cafe.QUERY_STATS_CONFIG['slow_query_log'] = os.path.join(scratch_dir, "slow_queries.log")
+
+    db = open_backend(args, scratch_dir)
+    if not db.is_connected():
+        print(f"{args.backend}: database unreachable")
+        sys.exit(1)
+    system = CafeBillingSystem(db)
+    population = Population(args.customers)
+    try:
+        prepare(args, system, population)
+        runs = []
+        for number in range(args.runs):
+            if number:
+                reset_to_history(system, args)
+            db.query_stats.reset()
+            runs.append(run_load(system, population, args))
+            print(f"Run {number + 1}: {runs[-1]['elapsed_seconds']:.1f} s, {runs[-1]['orders_per_second']:.0f} orders/s")
+        slowest_statements = dict(list(db.query_stats.snapshot().items())[:10])
+    finally:
+        system.close()
+
+    failures = [failure for run in runs for failure in run["failures"]]
+    results = {
+        "config": {
+            "seeding": {option: getattr(args, option) for option in SEED_OPTIONS},
+            "terminals": args.terminals,
+            "operations_per_terminal": args.operations,
+            "runs": args.runs
+        },
+        "environment": {"python": platform.python_version(), "platform": platform.platform()},
+        "started_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        **median_of_runs(runs),
+        "failures": len(failures),
+        "runs": [{**run, "failures": len(run["failures"])} for run in runs],
+        "slowest_statements": slowest_statements  # From the last run
+    }
+
+    print(f"{args.terminals} terminals x {args.operations} operations, median of {args.runs} run(s): "
+          f"{results['orders_per_second']:.0f} orders/s, {len(failures)} failure(s)")
+    for operation, stats in results["operations"].items():
+        print(f"  {operation:<24} {stats['calls']:>7.0f} calls   p50 {stats['p50_ms']:7.2f} ms   "
+              f"p95 {stats['p95_ms']:7.2f} ms   p99 {stats['p99_ms']:7.2f} ms   max {stats['max_ms']:8.2f} ms")
+    for failure in failures[:10]:
+        print(f"FAIL {failure}")
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, "w", encoding="utf-8") as results_file:
+                json.dump(results, results_file, indent=2)
+            print(f"Results written to {path}.")
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as baseline_file:
+            baseline = json.load(baseline_file)
+        print(f"Compared with {args.baseline} (tolerance {args.tolerance:.0%}):")
+        regressions = compare(results, baseline, args.tolerance, args.min_regression_ms)
+        print(f"{len(regressions)} regression(s).")
+    sys.exit(1 if failures or regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""Outage drill for the offline order queue.
+
+Places orders continuously while the database "goes down" part-way through. The
+outage is injected into the backend: while it lasts, every connection it lends
+raises OperationalError, as a MySQL server that went away does. The first order
+of the outage commits but loses its reply, so the replay must find it already
+written. The database is then brought back, and the drill waits for the flusher
+to drain the queue. It fails unless every order's idempotency key appears in
+orders exactly once.
+
+Runs against a temporary SQLite database, or against a scratch MySQL database
+(DB_CONFIG's name with a "_drill" suffix). Every rollup is rebuilt on cleanup.
+
+Usage: python benchmarks/offline_drill.py [orders] [sqlite|mysql]
+"""
+import os
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import cafe  # noqa: E402
+
+
+def open_backend(name: str, scratch_dir: str) -> cafe.StorageBackend:
+    if name == "mysql":
+        config = {**cafe.DB_CONFIG, 'database': cafe.DB_CONFIG['database'] + "_drill"}
+        return cafe.MySQLConnector(config, **cafe.POOL_CONFIG)
+    return cafe.SQLiteConnector(**{**cafe.SQLITE_CONFIG, 'path': os.path.join(scratch_dir, "drill.db")})
+
+
+class Outage:
+    """Switches a backend's connections off and on, and can drop the reply to one commit."""
+
+    def __init__(self, db: cafe.StorageBackend):
+        self.down = False
+        self.lose_next_commit_reply = False
+        connection, transaction = db.connection, db.transaction
+
+        @contextmanager
+        def failing_connection():
+            if self.down:
+                raise cafe.OperationalError("drill: database unreachable")
+            with connection() as driver_connection:
+                yield driver_connection
+
+        @contextmanager
+        def failing_transaction():
+            with transaction() as cursor:
+                yield cursor
+            if self.lose_next_commit_reply:
+                # Committed, but the client never hears so
+                self.lose_next_commit_reply = False
+                raise cafe.OperationalError("drill: connection lost before the commit was acknowledged")
+
+        db.connection = failing_connection
+        db.transaction = failing_transaction
+
+
+def main():
+    orders = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    backend = sys.argv[2] if len(sys.argv) > 2 else "sqlite"
+
+    scratch_dir = tempfile.mkdtemp(prefix="cafe-drill-")
+    cafe.OFFLINE_QUEUE_CONFIG['path'] = os.path.join(scratch_dir, "offline_orders.db")
+    cafe.OFFLINE_QUEUE_CONFIG['flush_interval'] = 0.5
+    db = open_backend(backend, scratch_dir)
+    db.execute_query("DELETE FROM orders")
+    system = cafe.CafeBillingSystem(db)
+    outage = Outage(db)
+
+    try:
+        menu = system.get_menu_items()
+        keys, queued = [], 0
+        for n in range(orders):
+            if n == orders // 3:
+                print("-- database down --")
+                outage.lose_next_commit_reply = True
+            elif n == orders // 3 + 1:
+                outage.down = True
+            if n == 2 * orders // 3:
+                print("-- database back --")
+                outage.down = False
+
+            order = cafe.Order(
+                customer_name=f"drill-{n}",
+                table_number=1 + n % 12,
+                items=[cafe.OrderItem(item_id=menu[n % len(menu)].id, quantity=1, price=0)],
+                payment_method="cash"
+            )
+            saved_order = system.create_order(order)
+            if saved_order is None:
+                print(f"order {n} was rejected")
+                sys.exit(1)
+            queued += saved_order.id is None
+            keys.append(saved_order.idempotency_key)
+
+        deadline = time.monotonic() + 60
+        while system.offline_queue.pending_count() and time.monotonic() < deadline:
+            time.sleep(0.5)
+
+        placeholders = ", ".join(["%s"] * len(keys))
+        rows = system.db.fetch_all(
+            f"SELECT idempotency_key, COUNT(*) AS copies FROM orders WHERE idempotency_key IN ({placeholders}) GROUP BY idempotency_key",
+            tuple(keys)
+        )
+        copies = {row['idempotency_key']: row['copies'] for row in rows}
+        lost = [key for key in keys if key not in copies]
+        duplicated = [key for key, count in copies.items() if count > 1]
+        print(f"{orders} orders placed on {backend}, {queued} queued offline, "
+              f"{system.offline_queue.pending_count()} still pending, {len(lost)} lost, {len(duplicated)} duplicated")
+    finally:
+        outage.down = False
+        db.execute_query("DELETE FROM orders")
+        system.rebuild_daily_sales()
+        system.rebuild_customers()
+        system.close()
+    sys.exit(1 if lost or duplicated else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Stress test for the MySQLConnector connection pool.
+
+Many worker threads share one MySQLConnector and run a mix of plain reads and
+transactions, while a "chaos" thread periodically kills the pool's server
+sessions to exercise reconnects. A call can only fail if a kill lands while it
+is running, so the script fails if there are more lost calls than killed
+sessions, or any other kind of error. It prints the pool stats at the end.
+Runs against a scratch database (DB_CONFIG's database name with a "_stress"
+suffix) that is created for the run and dropped afterwards; only sessions on
+that database are killed.
+
+Usage: python benchmarks/stress_pool.py [threads] [calls_per_thread] [pool_size]
+"""
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import mysql.connector  # noqa: E402
+from mysql.connector import InterfaceError, OperationalError  # noqa: E402
+from cafe import DB_CONFIG, POOL_CONFIG, MySQLConnector  # noqa: E402
+
+
+def worker(db: MySQLConnector, calls: int, lost: list, failures: list) -> None:
+    for n in range(calls):
+        try:
+            if n % 10 == 0:
+                with db.transaction() as cursor:
+                    cursor.execute("SELECT COUNT(*) AS count FROM menu_items")
+                    cursor.fetchall()
+            else:
+                with db.connection() as connection:
+                    cursor = connection.cursor()
+                    cursor.execute("SELECT id, price FROM menu_items WHERE id = %s", (1 + n % 10,))
+                    cursor.fetchall()
+                    cursor.close()
+        except (InterfaceError, OperationalError) as e:
+            lost.append(repr(e))
+        except Exception as e:
+            failures.append(repr(e))
+
+
+def chaos(config: dict, stop: threading.Event, interval: float, killed: list) -> None:
+    """Kills the pool's server sessions on the scratch database from outside to simulate dropped connections."""
+    admin = mysql.connector.connect(autocommit=True, **config)
+    cursor = admin.cursor()
+    while not stop.wait(interval):
+        cursor.execute(
+            "SELECT id FROM information_schema.processlist WHERE db = %s AND id <> CONNECTION_ID()",
+            (config['database'],)
+        )
+        for (session_id,) in cursor.fetchall():
+            try:
+                cursor.execute(f"KILL {int(session_id)}")
+                killed.append(session_id)
+            except mysql.connector.Error:
+                pass
+    admin.close()
+
+
+def main():
+    threads = int(sys.argv[1]) if len(sys.argv) > 1 else 32
+    calls = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    pool_size = int(sys.argv[3]) if len(sys.argv) > 3 else POOL_CONFIG['pool_size']
+
+    # validate_after=0 pings on every checkout, so killed sessions are noticed before use
+    config = {**DB_CONFIG, 'database': DB_CONFIG['database'] + "_stress"}
+    db = MySQLConnector(config, **{**POOL_CONFIG, 'pool_size': pool_size, 'validate_after': 0.0})
+    killed, lost, failures = [], [], []
+    stop = threading.Event()
+    chaos_thread = threading.Thread(target=chaos, args=(config, stop, 0.5, killed), daemon=True)
+
+    start = time.perf_counter()
+    chaos_thread.start()
+    workers = [threading.Thread(target=worker, args=(db, calls, lost, failures)) for _ in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    stop.set()
+    chaos_thread.join()  # No kill may land on the session dropping the database
+    elapsed = time.perf_counter() - start
+
+    total = threads * calls
+    print(f"{threads} threads x {calls} calls on a pool of {pool_size}: {total / elapsed:,.0f} calls/s")
+    print(f"sessions killed: {len(killed)}, calls lost to a kill: {len(lost)}, other failures: {len(failures)}")
+    for failure in failures[:5]:
+        print(f"  {failure}")
+    for key, value in db.pool_stats().items():
+        print(f"  {key}: {value:,.1f}" if isinstance(value, float) else f"  {key}: {value}")
+    db.execute_query(f"DROP DATABASE IF EXISTS {config['database']}")
+    db.close_connection()
+    sys.exit(1 if failures or len(lost) > len(killed) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,55 @@
+import argparse
+import asyncio
+import bisect
+import csv
 import datetime
-from typing import Dict, List, Optional
-from dataclasses import dataclass
-import mysql.connector
-from mysql.connector import Error
+import functools
+import itertools
+import json
+import os
+import queue
+import re
+import sqlite3
+import sys
+import threading
+import time
+import unicodedata
+import uuid
+from abc import ABC, abstractmethod
+from array import array
+from collections import OrderedDict, deque, namedtuple
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+from dataclasses import dataclass, field, replace
+
+try:
+    import mysql.connector
+    from mysql.connector import Error, InterfaceError, OperationalError
+    from mysql.connector.errorcode import ER_CANT_DROP_FIELD_OR_KEY, ER_DUP_FIELDNAME, ER_DUP_KEYNAME
+    from mysql.connector.errors import PoolError
+except ImportError: # Only the SQLite backend is available without mysql-connector-python
+    mysql = None
+    ER_DUP_FIELDNAME, ER_DUP_KEYNAME, ER_CANT_DROP_FIELD_OR_KEY = 1060, 1061, 1091
+
+    class Error(Exception):
+        pass
+
+    class InterfaceError(Error):
+        pass
+
+    class OperationalError(Error):
+        pass
+
+    class PoolError(Error):
+        pass
+
+# Errors raised by the drivers of either storage backend
+DB_ERRORS = (Error, sqlite3.Error)
+
+# Storage backend used by CafeBillingSystem: 'mysql' (DB_CONFIG) or 'sqlite' (SQLITE_CONFIG)
+DB_BACKEND = 'mysql'
 
 # Database Configuration
 DB_CONFIG = {
@@ -13,24 +60,95 @@ DB_CONFIG = {
     'database': 'chaicoffee_cafe'
 }
 
-@dataclass
+# Connection pool settings for MySQLConnector
+POOL_CONFIG = {
+    'pool_size': 5,           # Maximum open connections per process
+    'validate_after': 30.0,   # Ping a connection on checkout only if idle for this many seconds
+    'checkout_timeout': 10.0, # Seconds to wait for a free connection before giving up
+    'max_retries': 3,         # Connection attempts before reporting the database as down
+    'retry_backoff': 0.5      # Initial delay between attempts, doubled after each failure
+}
+
+# Embedded SQLite backend, for development, tests and single-till kiosks without a MySQL server
+SQLITE_CONFIG = {
+    'path': 'chaicoffee_cafe.db',  # Database file, created on first use
+    'synchronous': 'FULL',         # NORMAL is faster in WAL mode but may lose the last orders on a power cut
+    'busy_timeout': 5.0,           # Seconds a writer waits for another connection's transaction to finish
+    'cache_size_kb': 16384,        # Page cache per connection
+    'mmap_size': 268435456,        # Bytes of the file read through memory mapping
+    'cached_statements': 256       # Prepared statements kept per connection
+}
+
+# Local order-taking server (cafe_server.py) that several counters can share
+SERVER_CONFIG = {
+    'host': '127.0.0.1',
+    'port': 8765,
+    'use_server': False,    # True makes cafe_GUI.py a thin client of the server instead of opening the database
+    'batch_window': 0.0,    # Extra seconds to wait for more orders; those arriving during a commit share the next one anyway
+    'max_batch_size': 32,   # Most orders written in one commit
+    'workers': 8,           # Threads the server runs database calls on
+    'timeout': 10.0         # Seconds a client waits for a reply
+}
+
+# Group commit: concurrent create_order calls share one transaction (see OrderCommitQueue)
+GROUP_COMMIT_CONFIG = {
+    'enabled': False,      # True queues create_order calls and commits them together; each caller still waits for its commit
+    'window': 0.002,       # Seconds to wait for more orders once one has arrived; 0 batches only what queued during the last commit
+    'max_batch_size': 64   # Most orders written in one commit
+}
+
+# asyncio facade over the billing API (see AsyncCafeBillingSystem)
+ASYNC_CONFIG = {
+    'workers': 8,      # Threads running the blocking calls; MySQL calls beyond POOL_CONFIG's pool_size wait for a connection
+    'timeout': 10.0    # Default seconds a call may take before it raises asyncio.TimeoutError; None waits indefinitely
+}
+
+# Recently placed or viewed orders kept in memory for get_order (see OrderCache)
+ORDER_CACHE_CONFIG = {
+    'max_orders': 2000,        # Most orders kept; the least recently used are dropped first
+    'max_bytes': 8 * 1024**2   # Estimated memory the cached orders may take
+}
+
+# Customer name search for Customer History type-ahead (see CustomerIndex)
+CUSTOMER_SEARCH_CONFIG = {
+    'limit': 10,               # Suggestions returned per search
+    'refresh_interval': 5.0    # Seconds between checks for customers whose orders another counter placed
+}
+
+# Per-statement timing kept by every storage backend (see QueryStats)
+QUERY_STATS_CONFIG = {
+    'enabled': True,                       # Time every statement; False skips the bookkeeping entirely
+    'slow_query_ms': 250.0,                # Statements slower than this are written to the slow-query log
+    'slow_query_log': 'slow_queries.log',  # File slow statements are appended to; None prints them instead
+    'dump_path': 'query_stats.json'        # JSON file the GUI writes the stats to on exit; None skips it
+}
+
+# Local queue that keeps the till taking orders while MySQL is unreachable
+OFFLINE_QUEUE_CONFIG = {
+    'path': 'offline_orders.db', # SQLite file holding queued orders and the last known menu
+    'flush_interval': 5.0,       # Seconds between attempts to replay queued orders into MySQL
+    'batch_size': 50             # Queued orders written per replay transaction
+}
+
+# Models are slotted: no per-instance __dict__, as bulk reads build one per row
+@dataclass(slots=True)
 class MenuItem:
     """Represents a menu item."""
     id: int
     name: str
-    price: float
+    price: Decimal
     category: str
     available: bool = True
 
-@dataclass
+@dataclass(slots=True)
 class OrderItem:
     """Represents an item in an order."""
     item_id: int
     quantity: int
-    price: float  # Price at the time of order
+    price: Decimal  # Price at the time of order
     name: str = "" # Name at the time of order
 
-@dataclass
+@dataclass(slots=True)
 class Order:
     """Represents a customer order."""
     customer_name: str
@@ -40,435 +158,3146 @@ class Order:
     status: str = "completed"
     order_time: Optional[datetime.datetime] = None
     id: Optional[int] = None
+    idempotency_key: Optional[str] = None # Lets a retried or replayed order be written only once
+    provisional_id: Optional[str] = None # Set instead of id while the order waits in the offline queue
 
-class MySQLConnector:
-    """Handles MySQL database connection and operations."""
-    def __init__(self, db_config: Dict):
-        self.db_config = db_config
-        self.connection = None
-        self.connect()
-        self.create_database_and_tables()
-        self.insert_initial_data()
+PAISA = Decimal("0.01")
+ZERO_RUPEES = Decimal("0.00")
 
-    def connect(self):
-        """Establishes a connection to the MySQL database."""
-        try:
-            # Connect without specifying a database first, to create it if it doesn't exist
-            self.connection = mysql.connector.connect(
-                host=self.db_config['host'],
-                port=self.db_config.get('port', 3306),
-                user=self.db_config['user'],
-                password=self.db_config['password']
+def to_money(value) -> Decimal:
+    """Returns an amount in rupees as a Decimal rounded to the paisa; floats are read by their shortest repr."""
+    if isinstance(value, float):
+        value = repr(value)
+    return Decimal(value).quantize(PAISA, ROUND_HALF_UP)
+
+def to_paise(value) -> int:
+    """Returns an amount in rupees (Decimal, float or int) as a whole number of paise."""
+    return round(value * 100)
+
+_NOT_NAME_CHARACTERS = re.compile(r"[^\w\s]+")
+
+def normalize_customer_name(name: str) -> str:
+    """Returns the key a customer is known by: case folded, accents and punctuation dropped, spaces collapsed."""
+    folded = "".join(char for char in unicodedata.normalize("NFKD", name.casefold()) if not unicodedata.combining(char))
+    key = " ".join(_NOT_NAME_CHARACTERS.sub(" ", folded).split())
+    return key or " ".join(folded.split())  # A name of punctuation only is kept as typed
+
+@dataclass(slots=True)
+class BillTotals:
+    """Subtotal, taxes and total of one bill, in rupees to the paisa."""
+    subtotal: Decimal
+    cgst: Decimal
+    sgst: Decimal
+    total: Decimal
+
+class MoneyEngine:
+    """Exact bill arithmetic shared by pricing, bills, reports and the GUI.
+
+    Line totals are exact; CGST and SGST are each rounded half-up to the paisa once
+    per bill, from the subtotal. The total is the sum of those three rounded amounts,
+    so every printed bill adds up and matches the row stored for the order.
+    """
+    def __init__(self, cgst_rate: float, sgst_rate: float):
+        self.cgst_rate = Decimal(str(cgst_rate)) / 100
+        self.sgst_rate = Decimal(str(sgst_rate)) / 100
+        # Rates in hundredths of a percent for the integer-paise batch path
+        self._cgst_basis_points = int(self.cgst_rate * 10000)
+        self._sgst_basis_points = int(self.sgst_rate * 10000)
+        if self._cgst_basis_points != self.cgst_rate * 10000 or self._sgst_basis_points != self.sgst_rate * 10000:
+            raise ValueError("Tax rates may have at most two decimal places.")
+
+    def line_total(self, price, quantity: int) -> Decimal:
+        if type(price) is not Decimal: # Prices read through to_money() are already exact to the paisa
+            price = to_money(price)
+        return price * quantity
+
+    def bill_totals(self, line_totals: Iterable[Decimal]) -> BillTotals:
+        """Totals for one bill from its line totals."""
+        subtotal = ZERO_RUPEES
+        for line_total in line_totals:
+            subtotal += line_total
+        cgst = (subtotal * self.cgst_rate).quantize(PAISA, ROUND_HALF_UP)
+        sgst = (subtotal * self.sgst_rate).quantize(PAISA, ROUND_HALF_UP)
+        return BillTotals(subtotal, cgst, sgst, subtotal + cgst + sgst)
+
+    def batch_taxes(self, subtotals_paise: Sequence[int]) -> Tuple[List[int], List[int], List[int]]:
+        """CGST, SGST and totals in paise for many non-negative subtotals in paise, rounded as bill_totals() rounds.
+
+        Integer arithmetic throughout, for reports and backfills over thousands of orders.
+        """
+        cgst_bp, sgst_bp = self._cgst_basis_points, self._sgst_basis_points
+        cgst = [(subtotal * cgst_bp + 5000) // 10000 for subtotal in subtotals_paise]
+        # CGST and SGST are normally levied at the same rate
+        sgst = cgst if sgst_bp == cgst_bp else [(subtotal * sgst_bp + 5000) // 10000 for subtotal in subtotals_paise]
+        totals = [subtotal + c + s for subtotal, c, s in zip(subtotals_paise, cgst, sgst)]
+        return cgst, sgst, totals
+
+class OrderBatch:
+    """Many orders and their items stored column by column, for bulk reads that should not build objects per row.
+
+    Order columns are indexed by order position and item columns by item position;
+    order n's items are positions item_offsets[n] to item_offsets[n + 1]. Amounts are
+    integer paise, a missing item_id is 0, and repeated strings are stored once.
+    """
+    __slots__ = ("ids", "customer_names", "table_numbers", "order_times", "statuses", "payment_methods",
+                 "subtotals", "cgst", "sgst", "totals", "item_offsets",
+                 "item_ids", "item_names", "quantities", "unit_prices", "line_totals", "_strings")
+
+    def __init__(self):
+        self.ids = array('q')
+        self.customer_names: List[str] = []
+        self.table_numbers: List[Optional[int]] = []
+        self.order_times: List[Optional[datetime.datetime]] = []
+        self.statuses: List[Optional[str]] = []
+        self.payment_methods: List[Optional[str]] = []
+        self.subtotals = array('q')
+        self.cgst = array('q')
+        self.sgst = array('q')
+        self.totals = array('q')
+        self.item_offsets = array('q', [0])
+        self.item_ids = array('q')
+        self.item_names: List[str] = []
+        self.quantities = array('q')
+        self.unit_prices = array('q')
+        self.line_totals = array('q')
+        self._strings: Dict[str, str] = {}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _shared(self, value: Optional[str]) -> Optional[str]:
+        return value if value is None else self._strings.setdefault(value, value)
+
+    def append_order(self, order_id: int, customer_name: str, table_number: Optional[int],
+                     order_time: Optional[datetime.datetime], status: Optional[str], payment_method: Optional[str],
+                     subtotal, cgst, sgst, total) -> None:
+        """Adds an order; the items appended after it, until the next order, are its items."""
+        self.ids.append(order_id)
+        self.customer_names.append(self._shared(customer_name))
+        self.table_numbers.append(table_number)
+        self.order_times.append(order_time)
+        self.statuses.append(self._shared(status))
+        self.payment_methods.append(self._shared(payment_method))
+        self.subtotals.append(to_paise(subtotal))
+        self.cgst.append(to_paise(cgst))
+        self.sgst.append(to_paise(sgst))
+        self.totals.append(to_paise(total))
+        self.item_offsets.append(len(self.item_ids))
+
+    def append_item(self, item_id: Optional[int], item_name: str, quantity: int, unit_price, total_price) -> None:
+        """Adds an item to the order appended last."""
+        self.item_ids.append(item_id or 0)
+        self.item_names.append(self._shared(item_name))
+        self.quantities.append(quantity)
+        self.unit_prices.append(to_paise(unit_price))
+        self.line_totals.append(to_paise(total_price))
+        self.item_offsets[-1] = len(self.item_ids)
+
+    def order(self, index: int) -> Order:
+        """Builds the Order model for one order, as get_order returns it."""
+        items = [
+            OrderItem(
+                item_id=self.item_ids[position] or None,
+                quantity=self.quantities[position],
+                price=Decimal(self.unit_prices[position]).scaleb(-2),
+                name=self.item_names[position]
             )
-            if self.connection.is_connected():
-                cursor = self.connection.cursor()
-                # Create database if it doesn't exist
-                cursor.execute(f"CREATE DATABASE IF NOT EXISTS {self.db_config['database']}")
-                cursor.close()
-                self.connection.close() # Close and reconnect with the database selected
+            for position in range(self.item_offsets[index], self.item_offsets[index + 1])
+        ]
+        return Order(
+            id=self.ids[index],
+            customer_name=self.customer_names[index],
+            table_number=self.table_numbers[index],
+            order_time=self.order_times[index],
+            status=self.statuses[index],
+            payment_method=self.payment_methods[index],
+            items=items
+        )
 
-                # Reconnect with the specific database
-                self.connection = mysql.connector.connect(**self.db_config)
-                if self.connection.is_connected():
-                    print(f"Connected to MySQL database: {self.db_config['database']}")
-                else:
-                    print("Failed to reconnect to database.")
+    def sales_totals(self) -> BillTotals:
+        """Sums of the stored subtotals, taxes and totals over every order."""
+        return BillTotals(*(Decimal(sum(column)).scaleb(-2) for column in (self.subtotals, self.cgst, self.sgst, self.totals)))
 
-        except Error as e:
-            print(f"Error connecting to MySQL: {e}")
-            print("Please ensure MySQL server is running and credentials are correct.")
-            print(f"DB Host: {self.db_config['host']}, Port: {self.db_config['port']}, User: {self.db_config['user']}, Password: {self.db_config['password']}")
-            self.connection = None # Set connection to None if it fails
+    def item_sales(self) -> Dict[str, Tuple[int, Decimal]]:
+        """Quantity sold and pre-tax sales per item name, highest sales first."""
+        quantities: Dict[str, int] = {}
+        sales: Dict[str, int] = {}
+        for name, quantity, line_total in zip(self.item_names, self.quantities, self.line_totals):
+            quantities[name] = quantities.get(name, 0) + quantity
+            sales[name] = sales.get(name, 0) + line_total
+        return {
+            name: (quantities[name], Decimal(paise).scaleb(-2))
+            for name, paise in sorted(sales.items(), key=lambda entry: entry[1], reverse=True)
+        }
+
+LINK_ORDERS_CHUNK_SIZE = 500  # Order ids per UPDATE when rebuild_customer_totals links orders to customers
+
+def rebuild_customer_totals(db: "StorageBackend", cursor) -> int:
+    """Links orders without a customer to one, then recomputes every customer's running totals; returns the customer count.
+
+    Spellings that normalize alike (see normalize_customer_name) become one customer,
+    named by the spelling with the most orders. Customers left without orders are
+    removed. Runs on a cursor returning dictionary rows, in the caller's transaction;
+    used by the migration adding customers and by CafeBillingSystem.rebuild_customers.
+    """
+    cursor.execute("SELECT id, customer_name FROM orders WHERE customer_id IS NULL")
+    spellings: Dict[str, Dict[str, int]] = {}
+    order_ids: Dict[str, List[int]] = {}
+    for row in cursor.fetchall():
+        key = normalize_customer_name(row['customer_name'])
+        names = spellings.setdefault(key, {})
+        names[row['customer_name']] = names.get(row['customer_name'], 0) + 1
+        order_ids.setdefault(key, []).append(row['id'])
+    if spellings:
+        # Adds 0 visits to a customer who already exists, so only missing ones are created
+        cursor.executemany(db.increment_upsert_sql("customers", ("name_key",), ("visit_count",), kept_columns=("name",)),
+                           [(key, max(names, key=lambda name: (names[name], name)), 0) for key, names in spellings.items()])
+        cursor.execute("SELECT id, name_key FROM customers")
+        customer_ids = {row['name_key']: row['id'] for row in cursor.fetchall()}
+        # The name keys are computed in Python, so each customer's orders are linked by primary key,
+        # LINK_ORDERS_CHUNK_SIZE orders per UPDATE
+        for key, ids in order_ids.items():
+            for start in range(0, len(ids), LINK_ORDERS_CHUNK_SIZE):
+                chunk = ids[start:start + LINK_ORDERS_CHUNK_SIZE]
+                cursor.execute(f"UPDATE orders SET customer_id = %s WHERE id IN ({', '.join(['%s'] * len(chunk))})",
+                               (customer_ids[key], *chunk))
+
+    cursor.execute("""
+        UPDATE customers SET
+            visit_count = (SELECT COUNT(*) FROM orders WHERE orders.customer_id = customers.id),
+            lifetime_spend = (SELECT COALESCE(SUM(total), 0) FROM orders WHERE orders.customer_id = customers.id),
+            first_visit = (SELECT MIN(order_time) FROM orders WHERE orders.customer_id = customers.id),
+            last_visit = (SELECT MAX(order_time) FROM orders WHERE orders.customer_id = customers.id),
+            favourite_item_id = NULL,
+            favourite_quantity = 0
+    """)
+    cursor.execute("DELETE FROM customer_items")
+    cursor.execute("DELETE FROM customers WHERE visit_count = 0")
+    # The customer_items triggers set each customer's favourite as the rows go in
+    cursor.execute("""
+        INSERT INTO customer_items (customer_id, item_id, quantity)
+        SELECT o.customer_id, i.item_id, SUM(i.quantity)
+        FROM orders o
+        JOIN order_items i ON i.order_id = o.id
+        WHERE o.customer_id IS NOT NULL AND i.item_id IS NOT NULL
+        GROUP BY o.customer_id, i.item_id
+    """)
+    cursor.execute("SELECT COUNT(*) AS customers FROM customers")
+    return cursor.fetchone()['customers']
+
+# Versioned schema changes, applied in order by StorageBackend.migrate().
+# Each entry is (version, description, statements); never edit an applied entry, add a new one.
+# A statement may also be a function(backend, cursor), for data changes SQL alone cannot make.
+# Every backend has its own list in its own SQL dialect; the versions and resulting schema must match.
+MYSQL_SCHEMA_MIGRATIONS = [
+    (1, "Create menu, orders and order_items tables", [
+        """
+        CREATE TABLE IF NOT EXISTS menu_items (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            name VARCHAR(255) NOT NULL UNIQUE,
+            price DECIMAL(10, 2) NOT NULL,
+            category VARCHAR(255),
+            available BOOLEAN DEFAULT TRUE
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS orders (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            customer_name VARCHAR(255) NOT NULL,
+            table_number INT,
+            order_time DATETIME DEFAULT CURRENT_TIMESTAMP,
+            status VARCHAR(50) DEFAULT 'completed',
+            payment_method VARCHAR(50),
+            subtotal DECIMAL(10, 2) NOT NULL,
+            cgst DECIMAL(10, 2) NOT NULL,
+            sgst DECIMAL(10, 2) NOT NULL,
+            total DECIMAL(10, 2) NOT NULL
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS order_items (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            order_id INT,
+            item_id INT,
+            item_name VARCHAR(255) NOT NULL,
+            quantity INT NOT NULL,
+            unit_price DECIMAL(10, 2) NOT NULL,
+            total_price DECIMAL(10, 2) NOT NULL,
+            FOREIGN KEY (order_id) REFERENCES orders(id) ON DELETE CASCADE,
+            FOREIGN KEY (item_id) REFERENCES menu_items(id) ON DELETE SET NULL
+        )
+        """
+    ]),
+    (2, "Add menu version stamp maintained by menu_items triggers", [
+        """
+        CREATE TABLE IF NOT EXISTS menu_version (
+            id TINYINT PRIMARY KEY,
+            version BIGINT NOT NULL
+        )
+        """,
+        "INSERT IGNORE INTO menu_version (id, version) VALUES (1, 0)",
+        "DROP TRIGGER IF EXISTS menu_items_after_insert",
+        "DROP TRIGGER IF EXISTS menu_items_after_update",
+        "DROP TRIGGER IF EXISTS menu_items_after_delete",
+        """
+        CREATE TRIGGER menu_items_after_insert AFTER INSERT ON menu_items
+        FOR EACH ROW UPDATE menu_version SET version = version + 1 WHERE id = 1
+        """,
+        """
+        CREATE TRIGGER menu_items_after_update AFTER UPDATE ON menu_items
+        FOR EACH ROW UPDATE menu_version SET version = version + 1 WHERE id = 1
+        """,
+        """
+        CREATE TRIGGER menu_items_after_delete AFTER DELETE ON menu_items
+        FOR EACH ROW UPDATE menu_version SET version = version + 1 WHERE id = 1
+        """
+    ]),
+    (3, "Index orders for customer history and date-range reports", [
+        # Serves customer_name = ? ORDER BY order_time DESC, id DESC (InnoDB appends id to every secondary index)
+        "CREATE INDEX idx_orders_customer_time ON orders (customer_name, order_time)",
+        # Serves order_time >= ? AND order_time < ? in the sales reports
+        "CREATE INDEX idx_orders_order_time ON orders (order_time)"
+    ]),
+    (4, "Add daily_sales rollup maintained by create_order", [
+        """
+        CREATE TABLE IF NOT EXISTS daily_sales (
+            sale_date DATE NOT NULL,
+            payment_method VARCHAR(50) NOT NULL,
+            order_count INT NOT NULL,
+            subtotal DECIMAL(14, 2) NOT NULL,
+            cgst DECIMAL(14, 2) NOT NULL,
+            sgst DECIMAL(14, 2) NOT NULL,
+            total DECIMAL(14, 2) NOT NULL,
+            PRIMARY KEY (sale_date, payment_method)
+        )
+        """,
+        # Backfill from existing orders; REPLACE keeps this safe to re-run
+        """
+        REPLACE INTO daily_sales (sale_date, payment_method, order_count, subtotal, cgst, sgst, total)
+        SELECT DATE(order_time), COALESCE(payment_method, ''), COUNT(*), SUM(subtotal), SUM(cgst), SUM(sgst), SUM(total)
+        FROM orders
+        GROUP BY DATE(order_time), COALESCE(payment_method, '')
+        """
+    ]),
+    (5, "Add idempotency keys to orders for offline replay", [
+        "ALTER TABLE orders ADD COLUMN idempotency_key CHAR(32) NULL",
+        "CREATE UNIQUE INDEX uq_orders_idempotency_key ON orders (idempotency_key)"
+    ]),
+    (6, "Add customers with running totals, merging names that differ only in case, spacing or punctuation", [
+        # name_key compares byte for byte: keys are already normalized by normalize_customer_name,
+        # and the default collation would let two distinct keys collide
+        """
+        CREATE TABLE IF NOT EXISTS customers (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            name_key VARCHAR(255) CHARACTER SET utf8mb4 COLLATE utf8mb4_bin NOT NULL UNIQUE,
+            name VARCHAR(255) NOT NULL,
+            visit_count INT NOT NULL DEFAULT 0,
+            lifetime_spend DECIMAL(14, 2) NOT NULL DEFAULT 0,
+            first_visit DATETIME NULL,
+            last_visit DATETIME NULL,
+            favourite_item_id INT NULL,
+            favourite_quantity INT NOT NULL DEFAULT 0,
+            FOREIGN KEY (favourite_item_id) REFERENCES menu_items(id) ON DELETE SET NULL
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS customer_items (
+            customer_id INT NOT NULL,
+            item_id INT NOT NULL,
+            quantity INT NOT NULL,
+            PRIMARY KEY (customer_id, item_id),
+            FOREIGN KEY (customer_id) REFERENCES customers(id) ON DELETE CASCADE,
+            FOREIGN KEY (item_id) REFERENCES menu_items(id) ON DELETE CASCADE
+        )
+        """,
+        "DROP TRIGGER IF EXISTS customer_items_after_insert",
+        "DROP TRIGGER IF EXISTS customer_items_after_update",
+        # The favourite is the item bought most often, the lowest id on a tie; counts only ever grow
+        """
+        CREATE TRIGGER customer_items_after_insert AFTER INSERT ON customer_items
+        FOR EACH ROW UPDATE customers SET favourite_item_id = NEW.item_id, favourite_quantity = NEW.quantity
+        WHERE id = NEW.customer_id
+          AND (NEW.quantity > favourite_quantity OR (NEW.quantity = favourite_quantity AND NEW.item_id < favourite_item_id))
+        """,
+        """
+        CREATE TRIGGER customer_items_after_update AFTER UPDATE ON customer_items
+        FOR EACH ROW UPDATE customers SET favourite_item_id = NEW.item_id, favourite_quantity = NEW.quantity
+        WHERE id = NEW.customer_id
+          AND (NEW.quantity > favourite_quantity OR (NEW.quantity = favourite_quantity AND NEW.item_id < favourite_item_id))
+        """,
+        # One statement, so a re-run stops at the duplicate column before adding a second foreign key
+        "ALTER TABLE orders ADD COLUMN customer_id INT NULL, ADD CONSTRAINT fk_orders_customer FOREIGN KEY (customer_id) REFERENCES customers(id)",
+        # Serves customer_id = ? ORDER BY order_time DESC, id DESC, and replaces the foreign key's own index
+        "CREATE INDEX idx_orders_customer_id_time ON orders (customer_id, order_time)",
+        # History and search now find a customer's orders by customer_id, so this index only slows inserts
+        "DROP INDEX idx_orders_customer_time ON orders",
+        rebuild_customer_totals
+    ])
+]
+
+# SQLite DDL is transactional, so each of these migrations applies atomically
+SQLITE_SCHEMA_MIGRATIONS = [
+    (1, "Create menu, orders and order_items tables", [
+        """
+        CREATE TABLE IF NOT EXISTS menu_items (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name VARCHAR(255) NOT NULL UNIQUE,
+            price DECIMAL(10, 2) NOT NULL,
+            category VARCHAR(255),
+            available BOOLEAN DEFAULT TRUE
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS orders (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            customer_name VARCHAR(255) NOT NULL,
+            table_number INT,
+            order_time DATETIME DEFAULT CURRENT_TIMESTAMP,
+            status VARCHAR(50) DEFAULT 'completed',
+            payment_method VARCHAR(50),
+            subtotal DECIMAL(10, 2) NOT NULL,
+            cgst DECIMAL(10, 2) NOT NULL,
+            sgst DECIMAL(10, 2) NOT NULL,
+            total DECIMAL(10, 2) NOT NULL
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS order_items (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            order_id INT,
+            item_id INT,
+            item_name VARCHAR(255) NOT NULL,
+            quantity INT NOT NULL,
+            unit_price DECIMAL(10, 2) NOT NULL,
+            total_price DECIMAL(10, 2) NOT NULL,
+            FOREIGN KEY (order_id) REFERENCES orders(id) ON DELETE CASCADE,
+            FOREIGN KEY (item_id) REFERENCES menu_items(id) ON DELETE SET NULL
+        )
+        """,
+        # MySQL indexes foreign keys implicitly; SQLite needs it spelled out for the cascade and history joins
+        "CREATE INDEX IF NOT EXISTS idx_order_items_order_id ON order_items (order_id)"
+    ]),
+    (2, "Add menu version stamp maintained by menu_items triggers", [
+        """
+        CREATE TABLE IF NOT EXISTS menu_version (
+            id INTEGER PRIMARY KEY,
+            version BIGINT NOT NULL
+        )
+        """,
+        "INSERT OR IGNORE INTO menu_version (id, version) VALUES (1, 0)",
+        """
+        CREATE TRIGGER IF NOT EXISTS menu_items_after_insert AFTER INSERT ON menu_items
+        BEGIN UPDATE menu_version SET version = version + 1 WHERE id = 1; END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS menu_items_after_update AFTER UPDATE ON menu_items
+        BEGIN UPDATE menu_version SET version = version + 1 WHERE id = 1; END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS menu_items_after_delete AFTER DELETE ON menu_items
+        BEGIN UPDATE menu_version SET version = version + 1 WHERE id = 1; END
+        """
+    ]),
+    (3, "Index orders for customer history and date-range reports", [
+        # The rowid (id) ends every SQLite index entry, so this also serves ORDER BY order_time DESC, id DESC
+        "CREATE INDEX IF NOT EXISTS idx_orders_customer_time ON orders (customer_name, order_time)",
+        "CREATE INDEX IF NOT EXISTS idx_orders_order_time ON orders (order_time)"
+    ]),
+    (4, "Add daily_sales rollup maintained by create_order", [
+        """
+        CREATE TABLE IF NOT EXISTS daily_sales (
+            sale_date DATE NOT NULL,
+            payment_method VARCHAR(50) NOT NULL,
+            order_count INT NOT NULL,
+            subtotal DECIMAL(14, 2) NOT NULL,
+            cgst DECIMAL(14, 2) NOT NULL,
+            sgst DECIMAL(14, 2) NOT NULL,
+            total DECIMAL(14, 2) NOT NULL,
+            PRIMARY KEY (sale_date, payment_method)
+        )
+        """,
+        """
+        INSERT OR REPLACE INTO daily_sales (sale_date, payment_method, order_count, subtotal, cgst, sgst, total)
+        SELECT DATE(order_time), COALESCE(payment_method, ''), COUNT(*), SUM(subtotal), SUM(cgst), SUM(sgst), SUM(total)
+        FROM orders
+        GROUP BY DATE(order_time), COALESCE(payment_method, '')
+        """
+    ]),
+    (5, "Add idempotency keys to orders for offline replay", [
+        "ALTER TABLE orders ADD COLUMN idempotency_key CHAR(32) NULL",
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_orders_idempotency_key ON orders (idempotency_key)"
+    ]),
+    (6, "Add customers with running totals, merging names that differ only in case, spacing or punctuation", [
+        """
+        CREATE TABLE IF NOT EXISTS customers (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name_key VARCHAR(255) NOT NULL UNIQUE,
+            name VARCHAR(255) NOT NULL,
+            visit_count INT NOT NULL DEFAULT 0,
+            lifetime_spend DECIMAL(14, 2) NOT NULL DEFAULT 0,
+            first_visit DATETIME NULL,
+            last_visit DATETIME NULL,
+            favourite_item_id INT NULL,
+            favourite_quantity INT NOT NULL DEFAULT 0,
+            FOREIGN KEY (favourite_item_id) REFERENCES menu_items(id) ON DELETE SET NULL
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS customer_items (
+            customer_id INT NOT NULL,
+            item_id INT NOT NULL,
+            quantity INT NOT NULL,
+            PRIMARY KEY (customer_id, item_id),
+            FOREIGN KEY (customer_id) REFERENCES customers(id) ON DELETE CASCADE,
+            FOREIGN KEY (item_id) REFERENCES menu_items(id) ON DELETE CASCADE
+        )
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS customer_items_after_insert AFTER INSERT ON customer_items
+        BEGIN
+            UPDATE customers SET favourite_item_id = NEW.item_id, favourite_quantity = NEW.quantity
+            WHERE id = NEW.customer_id
+              AND (NEW.quantity > favourite_quantity OR (NEW.quantity = favourite_quantity AND NEW.item_id < favourite_item_id));
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS customer_items_after_update AFTER UPDATE ON customer_items
+        BEGIN
+            UPDATE customers SET favourite_item_id = NEW.item_id, favourite_quantity = NEW.quantity
+            WHERE id = NEW.customer_id
+              AND (NEW.quantity > favourite_quantity OR (NEW.quantity = favourite_quantity AND NEW.item_id < favourite_item_id));
+        END
+        """,
+        "ALTER TABLE orders ADD COLUMN customer_id INTEGER NULL REFERENCES customers(id)",
+        "CREATE INDEX IF NOT EXISTS idx_orders_customer_id_time ON orders (customer_id, order_time)",
+        "DROP INDEX IF EXISTS idx_orders_customer_time",
+        rebuild_customer_totals
+    ])
+]
+
+# MySQL errors that only mean a migration statement was already applied
+RERUNNABLE_MIGRATION_ERRORS = (ER_DUP_KEYNAME, ER_DUP_FIELDNAME, ER_CANT_DROP_FIELD_OR_KEY)
+
+class _StaleMenuError(Exception):
+    """Raised when an order was priced from a menu version that is no longer current."""
+
+@dataclass(slots=True)
+class StatementStats:
+    """Counters and latency histogram for one normalized statement."""
+    calls: int = 0
+    errors: int = 0
+    rows: int = 0  # Rows fetched, or rows changed by statements that return none
+    total_seconds: float = 0.0
+    max_seconds: float = 0.0
+    buckets: List[int] = field(default_factory=list)
+
+class QueryStats:
+    """Latency histograms, call counts and row counts per normalized SQL statement, plus a slow-query log.
+
+    Statements are keyed with literals and placeholders replaced by ?, and IN lists and
+    multi-row VALUES lists collapsed, so one query run with different parameters is one entry. A statement's
+    latency covers its execute call and every fetch of its rows.
+    """
+    # Upper bounds of the histogram buckets in milliseconds; one more bucket counts everything slower
+    BUCKET_BOUNDS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+    _LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b|%s")
+    _IN_LISTS = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+    _ROW_LISTS = re.compile(r"(\(\s*\?(?:\s*,\s*\?)*\s*\))(?:\s*,\s*\(\s*\?(?:\s*,\s*\?)*\s*\))+")
+    _NORMALIZED_CACHE_SIZE = 4096
+
+    def __init__(self, enabled: bool = True, slow_query_ms: float = 250.0, slow_query_log: Optional[str] = None,
+                 dump_path: Optional[str] = None):
+        self.enabled = enabled
+        self.slow_query_ms = slow_query_ms
+        self.slow_query_log = slow_query_log
+        self.dump_path = dump_path
+        self._bounds = tuple(bound / 1000 for bound in self.BUCKET_BOUNDS_MS)
+        self._lock = threading.Lock()
+        self._statements: Dict[str, StatementStats] = {}
+        self._normalized: Dict[str, str] = {}  # Raw SQL text -> normalized form, as the same strings recur
+
+    def normalize(self, sql: str) -> str:
+        normalized = self._normalized.get(sql)
+        if normalized is None:
+            normalized = " ".join(sql.split())
+            normalized = self._LITERALS.sub("?", normalized)
+            normalized = self._IN_LISTS.sub("IN (...)", normalized)
+            normalized = self._ROW_LISTS.sub(r"\1, ...", normalized)
+            if len(self._normalized) >= self._NORMALIZED_CACHE_SIZE:
+                self._normalized.clear()
+            self._normalized[sql] = normalized
+        return normalized
+
+    def record(self, sql: str, seconds: float, rows: int, failed: bool = False) -> None:
+        """Counts one run of a statement."""
+        statement = self.normalize(sql)
+        bucket = bisect.bisect_left(self._bounds, seconds)
+        with self._lock:
+            stats = self._statements.get(statement)
+            if stats is None:
+                stats = self._statements[statement] = StatementStats(buckets=[0] * (len(self._bounds) + 1))
+            stats.calls += 1
+            stats.errors += failed
+            stats.rows += rows
+            stats.total_seconds += seconds
+            if seconds > stats.max_seconds:
+                stats.max_seconds = seconds
+            stats.buckets[bucket] += 1
+        if seconds * 1000 >= self.slow_query_ms:
+            self._log_slow_query(statement, seconds, rows)
+
+    def _log_slow_query(self, statement: str, seconds: float, rows: int) -> None:
+        line = f"{datetime.datetime.now().isoformat(timespec='milliseconds')} {seconds * 1000:.1f} ms {rows} rows: {statement}"
+        if self.slow_query_log is None:
+            print(f"Slow query: {line}")
+            return
+        try:
+            with open(self.slow_query_log, "a", encoding="utf-8") as log:
+                log.write(line + "\n")
+        except OSError as e:
+            print(f"Error writing slow-query log: {e}")
+
+    def _percentile_ms(self, stats: StatementStats, fraction: float) -> float:
+        # Upper bound of the bucket holding that fraction of calls, capped at the slowest call seen
+        wanted = fraction * stats.calls
+        seen = 0
+        for bound, count in zip(self.BUCKET_BOUNDS_MS, stats.buckets):
+            seen += count
+            if seen >= wanted:
+                return min(bound, stats.max_seconds * 1000)
+        return stats.max_seconds * 1000
 
-    def create_database_and_tables(self):
-        """Creates tables if they don't exist."""
-        if not self.connection or not self.connection.is_connected():
-            print("Cannot create tables: No database connection.")
+    def snapshot(self) -> Dict[str, Dict]:
+        """Returns the stats per normalized statement, slowest total time first."""
+        with self._lock:
+            statements = [(statement, StatementStats(stats.calls, stats.errors, stats.rows, stats.total_seconds,
+                                                     stats.max_seconds, list(stats.buckets)))
+                          for statement, stats in self._statements.items()]
+        statements.sort(key=lambda entry: entry[1].total_seconds, reverse=True)
+        return {
+            statement: {
+                "calls": stats.calls,
+                "errors": stats.errors,
+                "rows": stats.rows,
+                "total_ms": stats.total_seconds * 1000,
+                "mean_ms": stats.total_seconds * 1000 / stats.calls,
+                "p50_ms": self._percentile_ms(stats, 0.50),
+                "p95_ms": self._percentile_ms(stats, 0.95),
+                "p99_ms": self._percentile_ms(stats, 0.99),
+                "max_ms": stats.max_seconds * 1000,
+                "histogram": dict(zip([f"<={bound}ms" for bound in self.BUCKET_BOUNDS_MS] + ["slower"], stats.buckets))
+            }
+            for statement, stats in statements
+        }
+
+    def report(self, limit: int = 20) -> str:
+        """Formats the statements taking the most total time as a table."""
+        return self.format_report(self.snapshot(), limit)
+
+    @staticmethod
+    def format_report(snapshot: Dict[str, Dict], limit: int = 20) -> str:
+        """Formats a snapshot, live or read back from a dump, as a table."""
+        lines = [f"{'calls':>8} {'errors':>6} {'rows':>9} {'total ms':>10} {'mean':>8} {'p95':>8} {'max':>8}  statement"]
+        for statement, stats in list(snapshot.items())[:limit]:
+            lines.append(f"{stats['calls']:>8} {stats['errors']:>6} {stats['rows']:>9} {stats['total_ms']:>10.1f} {stats['mean_ms']:>8.2f} "
+                         f"{stats['p95_ms']:>8.2f} {stats['max_ms']:>8.2f}  {statement[:100]}")
+        return "\n".join(lines)
+
+    def dump(self, path: Optional[str] = None) -> None:
+        """Writes the snapshot as JSON to path (default: dump_path, if set)."""
+        path = path or self.dump_path
+        if path is None:
             return
+        try:
+            with open(path, "w", encoding="utf-8") as dump_file:
+                json.dump(self.snapshot(), dump_file, indent=2)
+        except OSError as e:
+            print(f"Error writing query stats: {e}")
+
+    def reset(self) -> None:
+        with self._lock:
+            self._statements.clear()
+
+class _TimedCursor:
+    """Wraps a driver cursor, recording each statement's latency and rows in QueryStats once it is done with."""
+    __slots__ = ("_cursor", "_stats", "_sql", "_seconds", "_rows", "_fetched")
 
-        cursor = self.connection.cursor()
+    def __init__(self, cursor, stats: QueryStats):
+        self._cursor = cursor
+        self._stats = stats
+        self._sql = None
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def execute(self, query: str, params=()):
+        if self._sql is not None:
+            self.finish()
+        self._sql = query
+        self._rows = 0
+        self._fetched = False
+        start = time.perf_counter()
         try:
-            # Create menu_items table
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS menu_items (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    name VARCHAR(255) NOT NULL UNIQUE,
-                    price DECIMAL(10, 2) NOT NULL,
-                    category VARCHAR(255),
-                    available BOOLEAN DEFAULT TRUE
-                )
-            """)
-            # Create orders table
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS orders (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    customer_name VARCHAR(255) NOT NULL,
-                    table_number INT,
-                    order_time DATETIME DEFAULT CURRENT_TIMESTAMP,
-                    status VARCHAR(50) DEFAULT 'completed',
-                    payment_method VARCHAR(50),
-                    subtotal DECIMAL(10, 2) NOT NULL,
-                    cgst DECIMAL(10, 2) NOT NULL,
-                    sgst DECIMAL(10, 2) NOT NULL,
-                    total DECIMAL(10, 2) NOT NULL
-                )
-            """)
-            # Create order_items table
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS order_items (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    order_id INT,
-                    item_id INT,
-                    item_name VARCHAR(255) NOT NULL,
-                    quantity INT NOT NULL,
-                    unit_price DECIMAL(10, 2) NOT NULL,
-                    total_price DECIMAL(10, 2) NOT NULL,
-                    FOREIGN KEY (order_id) REFERENCES orders(id) ON DELETE CASCADE,
-                    FOREIGN KEY (item_id) REFERENCES menu_items(id) ON DELETE SET NULL
-                )
-            """)
-            self.connection.commit()
-            print("Database tables checked/created successfully.")
-        except Error as e:
-            print(f"Error creating tables: {e}")
+            return self._cursor.execute(query, params)
+        except BaseException:
+            self._stats.record(query, time.perf_counter() - start, 0, failed=True)
+            self._sql = None
+            raise
+        finally:
+            self._seconds = time.perf_counter() - start
+
+    def executemany(self, query: str, seq_of_params):
+        if self._sql is not None:
+            self.finish()
+        self._sql = query
+        self._rows = 0
+        self._fetched = False
+        start = time.perf_counter()
+        try:
+            return self._cursor.executemany(query, seq_of_params)
+        except BaseException:
+            self._stats.record(query, time.perf_counter() - start, 0, failed=True)
+            self._sql = None
+            raise
+        finally:
+            self._seconds = time.perf_counter() - start
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = self._cursor.fetchone()
+        self._seconds += time.perf_counter() - start
+        self._fetched = True
+        self._rows += row is not None
+        return row
+
+    def fetchmany(self, size: int):
+        start = time.perf_counter()
+        rows = self._cursor.fetchmany(size)
+        self._seconds += time.perf_counter() - start
+        self._fetched = True
+        self._rows += len(rows)
+        return rows
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = self._cursor.fetchall()
+        self._seconds += time.perf_counter() - start
+        self._fetched = True
+        self._rows += len(rows)
+        return rows
+
+    def finish(self) -> None:
+        """Records the current statement; called on the next execute and on close."""
+        if self._sql is not None:
+            rows = self._rows if self._fetched else max(self._cursor.rowcount, 0)
+            self._stats.record(self._sql, self._seconds, rows)
+            self._sql = None
+
+    def close(self):
+        self.finish()
+        return self._cursor.close()
+
+class StorageBackend(ABC):
+    """Connection, query and transaction interface CafeBillingSystem uses, whichever database is behind it.
+
+    Subclasses supply connections, cursors, the schema migrations and the few statements
+    whose SQL differs between databases; queries elsewhere use %s placeholders on both.
+    """
+    SCHEMA_MIGRATIONS: List[Tuple[int, str, list]] = []
+
+    _ready = False
+    query_stats: QueryStats  # Set by each subclass from QUERY_STATS_CONFIG
+    statements: Dict[str, str]  # Registered statements by name; set empty by each subclass
+    _transactions: threading.local  # This thread's open transaction() connection, if any; set by each subclass
+
+    def ensure_connected(self) -> bool:
+        """Connects and prepares the schema unless that already succeeded; returns whether the database is reachable."""
+        if not self._ready:
+            self.connect()
+            if self._ready:
+                self.migrate()
+                self.insert_initial_data()
+        return self._ready
+
+    @abstractmethod
+    def connect(self):
+        """Opens the database, creating it if needed, and sets the ready flag."""
+
+    def is_connected(self) -> bool:
+        """Returns True once the database is reachable."""
+        return self._ready
+
+    @abstractmethod
+    def connection(self):
+        """Context manager lending a driver connection for the duration of the block."""
+
+    @abstractmethod
+    def _cursor(self, connection, dictionary: bool = False):
+        """Opens a cursor on the connection, returning rows as dictionaries if asked."""
+
+    @abstractmethod
+    def _begin(self, connection) -> None:
+        """Starts an explicit transaction on the connection."""
+
+    def _open_cursor(self, connection, dictionary: bool = False):
+        """Opens a cursor whose statements are timed into query_stats while it is enabled."""
+        cursor = self._cursor(connection, dictionary)
+        return _TimedCursor(cursor, self.query_stats) if self.query_stats.enabled else cursor
+
+    @abstractmethod
+    def _prepare(self, connection, sql: str):
+        """Returns a cursor for running one registered statement repeatedly, and the SQL to run on it."""
+
+    def _execute_migration_statement(self, cursor, statement: str) -> None:
+        cursor.execute(statement)
+
+    def _run_data_migration(self, connection, migrate_data: Callable) -> None:
+        cursor = self._open_cursor(connection, dictionary=True)
+        try:
+            migrate_data(self, cursor)
         finally:
             cursor.close()
 
+    @abstractmethod
+    def increment_upsert_sql(self, table: str, key_columns: Tuple[str, ...], value_columns: Tuple[str, ...],
+                             kept_columns: Tuple[str, ...] = (), earliest_columns: Tuple[str, ...] = (),
+                             latest_columns: Tuple[str, ...] = (), returning_id: bool = False) -> str:
+        """SQL inserting one row, or adding its value columns to the row that already has its key.
+
+        Parameters follow the columns in the order key, kept, value, earliest, latest. On an
+        existing row, kept columns are left alone and earliest and latest columns keep the
+        smaller or larger value. With returning_id, run it through upsert_id for the row's id.
+        """
+
+    def upsert_id(self, name: str, params: tuple) -> int:
+        """Runs a registered upsert built with returning_id and returns the id of the row it inserted or updated."""
+        return self.execute_statement(name, params)[1]
+
+    @abstractmethod
+    def hour_sql(self, column: str) -> str:
+        """SQL expression for the hour (0-23) of a DATETIME column."""
+
+    @abstractmethod
+    def close_connection(self):
+        """Closes the backend's open connections."""
+
+    def migrate(self):
+        """Applies any schema migrations newer than the version recorded in schema_migrations."""
+        if not self.is_connected():
+            print("Cannot migrate schema: No database connection.")
+            return
+
+        try:
+            with self.connection() as connection:
+                cursor = self._open_cursor(connection)
+                try:
+                    cursor.execute("""
+                        CREATE TABLE IF NOT EXISTS schema_migrations (
+                            version INT PRIMARY KEY,
+                            description VARCHAR(255) NOT NULL,
+                            applied_at DATETIME DEFAULT CURRENT_TIMESTAMP
+                        )
+                    """)
+                    cursor.execute("SELECT COALESCE(MAX(version), 0) FROM schema_migrations")
+                    current_version = cursor.fetchone()[0]
+
+                    for version, description, statements in self.SCHEMA_MIGRATIONS:
+                        if version <= current_version:
+                            continue
+                        print(f"Applying schema migration {version}: {description}")
+                        self._begin(connection)
+                        for statement in statements:
+                            if callable(statement):
+                                self._run_data_migration(connection, statement)
+                            else:
+                                self._execute_migration_statement(cursor, statement)
+                        cursor.execute(
+                            "INSERT INTO schema_migrations (version, description) VALUES (%s, %s)",
+                            (version, description)
+                        )
+                        connection.commit()
+                        current_version = version
+                    print(f"Database schema is at version {current_version}.")
+                finally:
+                    cursor.close()
+        except DB_ERRORS as e:
+            print(f"Error migrating schema: {e}")
+
     def insert_initial_data(self):
         """Inserts sample menu items if the menu_items table is empty."""
-        if not self.connection or not self.connection.is_connected():
+        if not self.is_connected():
             print("Cannot insert initial data: No database connection.")
             return
 
-        cursor = self.connection.cursor()
         try:
-            cursor.execute("SELECT COUNT(*) FROM menu_items")
-            if cursor.fetchone()[0] == 0:
-                print("Inserting initial menu data...")
-                menu_items_data = [
-                    ('Tea', 10.0, 'Beverages', True),
-                    ('Coffee', 20.0, 'Beverages', True),
-                    ('Chocolate Coffee', 50.0, 'Beverages', True),
-                    ('Cold Coffee', 80.0, 'Beverages', True),
-                    ('Mocha', 80.0, 'Beverages', True),
-                    ('Latte', 90.0, 'Beverages', True),
-                    ('Espresso', 90.0, 'Beverages', True),
-                    ('Cold Coffee with Ice Cream', 100.0, 'Beverages', True),
-                    ('Cappuccino', 120.0, 'Beverages', True),
-                    ('Americano', 150.0, 'Beverages', True)
-                ]
-                insert_query = """
-                    INSERT INTO menu_items (name, price, category, available)
-                    VALUES (%s, %s, %s, %s)
-                """
-                cursor.executemany(insert_query, menu_items_data)
-                self.connection.commit()
-                print("Initial menu data inserted.")
-            else:
-                print("Menu items already exist.")
-        except Error as e:
+            with self.transaction() as cursor:
+                cursor.execute("SELECT COUNT(*) AS count FROM menu_items")
+                if cursor.fetchone()['count'] == 0:
+                    print("Inserting initial menu data...")
+                    menu_items_data = [
+                        ('Tea', 10.0, 'Beverages', True),
+                        ('Coffee', 20.0, 'Beverages', True),
+                        ('Chocolate Coffee', 50.0, 'Beverages', True),
+                        ('Cold Coffee', 80.0, 'Beverages', True),
+                        ('Mocha', 80.0, 'Beverages', True),
+                        ('Latte', 90.0, 'Beverages', True),
+                        ('Espresso', 90.0, 'Beverages', True),
+                        ('Cold Coffee with Ice Cream', 100.0, 'Beverages', True),
+                        ('Cappuccino', 120.0, 'Beverages', True),
+                        ('Americano', 150.0, 'Beverages', True)
+                    ]
+                    insert_query = """
+                        INSERT INTO menu_items (name, price, category, available)
+                        VALUES (%s, %s, %s, %s)
+                    """
+                    cursor.executemany(insert_query, menu_items_data)
+                    print("Initial menu data inserted.")
+                else:
+                    print("Menu items already exist.")
+        except DB_ERRORS as e:
             print(f"Error inserting initial data: {e}")
-            self.connection.rollback()
-        finally:
-            cursor.close()
 
     def execute_query(self, query: str, params: Optional[tuple] = None) -> Optional[int]:
         """Executes a DML query (INSERT, UPDATE, DELETE) and returns lastrowid for inserts."""
-        if not self.connection or not self.connection.is_connected():
+        if not self.is_connected():
             print("No database connection. Cannot execute query.")
             return None
-        
-        cursor = self.connection.cursor()
+
         try:
-            cursor.execute(query, params or ())
-            self.connection.commit()
-            return cursor.lastrowid if query.strip().upper().startswith("INSERT") else None
-        except Error as e:
+            with self.connection() as connection:
+                cursor = self._open_cursor(connection)
+                try:
+                    cursor.execute(query, params or ())
+                    return cursor.lastrowid if query.lstrip()[:6].upper() == "INSERT" else None
+                finally:
+                    cursor.close()
+        except DB_ERRORS as e:
             print(f"Error executing query: {e}")
-            self.connection.rollback()
             return None
-        finally:
-            cursor.close()
 
     def fetch_all(self, query: str, params: Optional[tuple] = None) -> List[Dict]:
         """Fetches all rows from a SELECT query."""
-        if not self.connection or not self.connection.is_connected():
+        if not self.is_connected():
             print("No database connection. Cannot fetch data.")
             return []
-        
-        cursor = self.connection.cursor(dictionary=True) # Returns results as dictionaries
+
         try:
-            cursor.execute(query, params or ())
-            return cursor.fetchall()
-        except Error as e:
+            with self.connection() as connection:
+                cursor = self._open_cursor(connection, dictionary=True) # Returns results as dictionaries
+                try:
+                    cursor.execute(query, params or ())
+                    return cursor.fetchall()
+                finally:
+                    cursor.close()
+        except DB_ERRORS as e:
             print(f"Error fetching all data: {e}")
             return []
-        finally:
-            cursor.close()
 
     def fetch_one(self, query: str, params: Optional[tuple] = None) -> Optional[Dict]:
         """Fetches a single row from a SELECT query."""
-        if not self.connection or not self.connection.is_connected():
+        if not self.is_connected():
             print("No database connection. Cannot fetch data.")
             return None
-        
-        cursor = self.connection.cursor(dictionary=True)
+
         try:
-            cursor.execute(query, params or ())
-            return cursor.fetchone()
-        except Error as e:
+            with self.connection() as connection:
+                cursor = self._open_cursor(connection, dictionary=True)
+                try:
+                    cursor.execute(query, params or ())
+                    row = cursor.fetchone()
+                    cursor.fetchall() # Drain any remaining rows so the connection can be reused
+                    return row
+                finally:
+                    cursor.close()
+        except DB_ERRORS as e:
             print(f"Error fetching one data: {e}")
             return None
-        finally:
-            cursor.close()
 
-    def close_connection(self):
-        """Closes the database connection."""
-        if self.connection and self.connection.is_connected():
-            self.connection.close()
-            print("MySQL connection closed.")
+    def register_statements(self, statements: Dict[str, str]) -> None:
+        """Adds named statements for fetch_statement, execute_statement and executemany_statement."""
+        self.statements.update(statements)
 
-class CafeBillingSystem:
-    """Main class for cafe billing operations."""
-    
-    CGST_RATE = 9.0  # 9% Central GST
-    SGST_RATE = 9.0  # 9% State GST
-    
-    def __init__(self) -> None:
-        self.db = MySQLConnector(DB_CONFIG)
-        # Ensure database connection is active before proceeding
-        if not self.db.connection or not self.db.connection.is_connected():
-            raise ConnectionError("Database connection failed during initialization. Please check DB_CONFIG and MySQL server status.")
+    def _run_statement(self, name: str, run, params):
+        """Calls run(cursor, sql, params) with the cursor kept for a registered statement, on this thread's
+        transaction connection if it has one, otherwise on a borrowed connection."""
+        connection = getattr(self._transactions, "connection", None)
+        if connection is not None:
+            return run(*self._reuse_cursor(connection, name), params)
+        with self.connection() as connection:
+            return run(*self._reuse_cursor(connection, name), params)
 
-    def get_menu_items(self) -> List[MenuItem]:
-        """Get list of available menu items from the database."""
-        query = "SELECT id, name, price, category, available FROM menu_items WHERE available = TRUE"
-        menu_data = self.db.fetch_all(query)
-        return [
-            MenuItem(
-                id=item['id'],
-                name=item['name'],
-                price=float(item['price']),
-                category=item['category'],
-                available=bool(item['available'])
-            )
-            for item in menu_data
-        ]
-    
-    def create_order(self, order: Order) -> int:
-        """Create a new order and return its ID."""
-        if not self.db.connection or not self.db.connection.is_connected():
-            print("Database not connected. Cannot create order.")
-            return -1
+    def _reuse_cursor(self, connection, name: str):
+        # Cursors live on their connection, so they are dropped with it when it is closed or discarded
+        cursors = getattr(connection, "statement_cursors", None)
+        if cursors is None:
+            cursors = connection.statement_cursors = {}
+        entry = cursors.get(name)
+        if entry is None:
+            entry = cursors[name] = self._prepare(connection, self.statements[name])
+        return entry
 
-        try:
-            # Calculate subtotal and taxes from current menu prices for accuracy
-            subtotal = 0.0
-            order_items_to_save = []
-            
-            for item_in_order in order.items:
-                # Fetch current item price from DB to avoid discrepancies
-                menu_item_query = "SELECT id, name, price FROM menu_items WHERE id = %s"
-                menu_item_data = self.db.fetch_one(menu_item_query, (item_in_order.item_id,))
-                
-                if not menu_item_data:
-                    print(f"Error: Menu item with ID {item_in_order.item_id} not found.")
-                    return -1 # Or handle as per business logic (e.g., skip item)
-                
-                actual_price = float(menu_item_data['price'])
-                item_total = actual_price * item_in_order.quantity
-                subtotal += item_total
-                
-                order_items_to_save.append({
-                    'item_id': item_in_order.item_id,
-                    'item_name': menu_item_data['name'], # Use name from DB
-                    'quantity': item_in_order.quantity,
-                    'unit_price': actual_price,
-                    'total_price': item_total
-                })
+    def fetch_statement(self, name: str, params: tuple = ()) -> List[tuple]:
+        """Runs a registered SELECT and returns its rows as plain tuples; the fast path for hot reads.
 
-            cgst_amount = subtotal * (self.CGST_RATE / 100)
-            sgst_amount = subtotal * (self.SGST_RATE / 100)
-            total = subtotal + cgst_amount + sgst_amount
+        The statement is prepared once per connection and its cursor reused. Inside
+        transaction() it runs on that transaction's connection. Errors are raised, as from a
+        transaction's cursor, rather than printed.
+        """
+        return self._run_statement(name, self._fetch_rows, params)
 
-            # Insert into orders table
-            order_insert_query = """
-                INSERT INTO orders (customer_name, table_number, order_time, status, payment_method, subtotal, cgst, sgst, total)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-            """
-            order_time = datetime.datetime.now()
-            order_params = (
-                order.customer_name,
-                order.table_number,
-                order_time,
-                order.status,
-                order.payment_method,
-                subtotal,
-                cgst_amount,
-                sgst_amount,
-                total
-            )
-            new_order_id = self.db.execute_query(order_insert_query, order_params)
+    def execute_statement(self, name: str, params: tuple = ()) -> Tuple[int, Optional[int]]:
+        """Runs a registered INSERT, UPDATE or DELETE as fetch_statement runs a SELECT; returns (rowcount, lastrowid)."""
+        return self._run_statement(name, self._execute_one, params)
 
-            if new_order_id is None:
-                print("Failed to insert order into database.")
-                return -1
+    def executemany_statement(self, name: str, seq_of_params: Sequence[tuple]) -> int:
+        """Runs a registered statement once per parameter tuple; returns the rows affected."""
+        return self._run_statement(name, self._execute_many, seq_of_params)
 
-            # Insert into order_items table
-            order_item_insert_query = """
-                INSERT INTO order_items (order_id, item_id, item_name, quantity, unit_price, total_price)
-                VALUES (%s, %s, %s, %s, %s, %s)
-            """
-            for item_data in order_items_to_save:
-                item_params = (
-                    new_order_id,
-                    item_data['item_id'],
-                    item_data['item_name'],
-                    item_data['quantity'],
-                    item_data['unit_price'],
-                    item_data['total_price']
-                )
-                self.db.execute_query(order_item_insert_query, item_params)
+    def _fetch_rows(self, cursor, sql: str, params) -> List[tuple]:
+        start = time.perf_counter()
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+        if self.query_stats.enabled:
+            self.query_stats.record(sql, time.perf_counter() - start, len(rows))
+        return rows
 
-            return new_order_id
-        except Exception as e:
-            print(f"Error creating order: {e}")
-            return -1
+    def _execute_one(self, cursor, sql: str, params) -> Tuple[int, Optional[int]]:
+        start = time.perf_counter()
+        cursor.execute(sql, params)
+        if self.query_stats.enabled:
+            self.query_stats.record(sql, time.perf_counter() - start, max(cursor.rowcount, 0))
+        return cursor.rowcount, cursor.lastrowid
 
-    def get_order(self, order_id: int) -> Optional[Order]:
-        """Retrieve order details by order ID from the database."""
-        order_query = "SELECT * FROM orders WHERE id = %s"
-        order_data = self.db.fetch_one(order_query, (order_id,))
+    def _execute_many(self, cursor, sql: str, seq_of_params) -> int:
+        start = time.perf_counter()
+        cursor.executemany(sql, seq_of_params)
+        if self.query_stats.enabled:
+            self.query_stats.record(sql, time.perf_counter() - start, max(cursor.rowcount, 0))
+        return cursor.rowcount
 
-        if not order_data:
-            return None
-        
-        items_query = "SELECT item_id, quantity, unit_price, item_name FROM order_items WHERE order_id = %s"
-        items_data = self.db.fetch_all(items_query, (order_id,))
+    STREAM_ROW_MODES = ("tuple", "namedtuple", "dict")
 
-        items = [
-            OrderItem(
-                item_id=item['item_id'],
-                quantity=item['quantity'],
-                price=float(item['unit_price']),
-                name=item['item_name']
-            )
-            for item in items_data
-        ]
+    def stream(self, query: str, params: Optional[tuple] = None, batch_size: int = 500,
+               row_mode: str = "tuple") -> Iterator:
+        """Yields the rows of a SELECT query lazily, fetching them from the database batch_size at a time.
 
-        return Order(
-            id=order_data['id'],
-            customer_name=order_data['customer_name'],
-            table_number=order_data['table_number'],
-            order_time=order_data['order_time'],
-            status=order_data['status'],
-            payment_method=order_data['payment_method'],
-            items=items
-        )
+        row_mode picks the row type: plain tuples (cheapest), named tuples built once per
+        query from the cursor's column names, or dictionaries as fetch_all returns.
+        """
+        if row_mode not in self.STREAM_ROW_MODES:
+            raise ValueError(f"Unknown row mode '{row_mode}'. Choose one of: {', '.join(self.STREAM_ROW_MODES)}.")
+        if not self.is_connected():
+            print("No database connection. Cannot fetch data.")
+            return
 
-    def get_daily_sales_report(self, date: datetime.date) -> Dict[str, float]:
-        """Get sales report for a specific date from the database."""
-        report = {
-            "date": date.isoformat(),
-            "order_count": 0,
-            "total_sales_before_tax": 0.0,
-            "total_cgst": 0.0,
-            "total_sgst": 0.0,
-            "total_gst": 0.0,
-            "net_sales": 0.0
-        }
+        try:
+            with self.connection() as connection:
+                cursor = self._open_cursor(connection, dictionary=row_mode == "dict")
+                cursor.execute(query, params or ())
+                make_row = None
+                if row_mode == "namedtuple":
+                    make_row = namedtuple("Row", [column[0] for column in cursor.description], rename=True)._make
+                try:
+                    while True:
+                        rows = cursor.fetchmany(batch_size)
+                        if not rows:
+                            break
+                        if make_row:
+                            yield from map(make_row, rows)
+                        else:
+                            yield from rows
+                finally:
+                    # A stream abandoned early leaves its cursor for the connection to discard; still count its statement
+                    if isinstance(cursor, _TimedCursor):
+                        cursor.finish()
+                cursor.close()
+        except DB_ERRORS as e:
+            print(f"Error streaming data: {e}")
 
-        query = """
-            SELECT 
-                COUNT(id) AS order_count,
-                SUM(subtotal) AS total_sales_before_tax,
-                SUM(cgst) AS total_cgst,
-                SUM(sgst) AS total_sgst,
-                SUM(total) AS net_sales
-            FROM orders
-            WHERE DATE(order_time) = %s
-        """
-        # Convert date to string in 'YYYY-MM-DD' format for MySQL DATE comparison
-        result = self.db.fetch_one(query, (date.strftime('%Y-%m-%d'),))
-
-        if result and result['order_count'] is not None:
-            report['order_count'] = int(result['order_count'])
-            report['total_sales_before_tax'] = float(result['total_sales_before_tax'] or 0.0)
-            report['total_cgst'] = float(result['total_cgst'] or 0.0)
-            report['total_sgst'] = float(result['total_sgst'] or 0.0)
-            report['total_gst'] = report['total_cgst'] + report['total_sgst']
-            report['net_sales'] = float(result['net_sales'] or 0.0)
-        
-        return report
+    @contextmanager
+    def transaction(self):
+        """Yields a cursor whose statements are committed together, or rolled back on any error."""
+        with self.connection() as connection:
+            self._begin(connection)
+            cursor = self._open_cursor(connection, dictionary=True)
+            outer = getattr(self._transactions, "connection", None)
+            self._transactions.connection = connection # Registered statements run in this transaction until it ends
+            try:
+                yield cursor
+                connection.commit()
+            finally:
+                self._transactions.connection = outer
+                cursor.close()
 
-    def get_customer_orders(self, customer_name: str) -> List[Dict]:
-        """Get order history for the given customer from the database."""
-        # First, get all orders for the customer
-        orders_query = "SELECT id, table_number, order_time, subtotal, cgst, sgst, total FROM orders WHERE customer_name = %s ORDER BY order_time DESC"
-        customer_orders_data = self.db.fetch_all(orders_query, (customer_name,))
-        
-        if not customer_orders_data:
-            return []
+class MySQLConnector(StorageBackend):
+    """Handles MySQL database connections and operations through a small connection pool."""
+    SCHEMA_MIGRATIONS = MYSQL_SCHEMA_MIGRATIONS
 
-        orders_summary = []
-        for order_data in customer_orders_data:
-            items_query = "SELECT item_name, quantity, unit_price, total_price FROM order_items WHERE order_id = %s"
-            order_items_data = self.db.fetch_all(items_query, (order_data['id'],))
-            
-            items_list = []
-            for item in order_items_data:
-                items_list.append({
-                    'name': item['item_name'],
-                    'quantity': int(item['quantity']),
-                    'price': float(item['unit_price']),
-                    'total': float(item['total_price'])
-                })
-            
-            orders_summary.append({
-                'order_id': int(order_data['id']),
-                'date': order_data['order_time'].strftime('%Y-%m-%d'),
-                'table': int(order_data['table_number']),
-                'items': items_list,
-                'subtotal': float(order_data['subtotal']),
-                'cgst_amount': float(order_data['cgst']),
-                'sgst_amount': float(order_data['sgst']),
-                'total_with_gst': float(order_data['total'])
-            })
-
-        return orders_summary
+    def __init__(self, db_config: Dict, pool_size: int = 5, validate_after: float = 30.0,
+                 checkout_timeout: float = 10.0, max_retries: int = 3, retry_backoff: float = 0.5):
+        self.db_config = db_config
+        self.pool_size = pool_size
+        self.validate_after = validate_after  # Seconds a connection may sit idle before it is pinged on checkout
+        self.checkout_timeout = checkout_timeout
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
 
-    def generate_bill(self, order: Order) -> str:
-        """Generate a formatted bill string for the order."""
-        lines = [
-            f"-------- CHAICOFFEE.COM --------",
-            f"Order ID: {order.id}",
-            f"Customer Name: {order.customer_name}",
-            f"Table Number: {order.table_number}",
-            f"Order Time: {order.order_time.strftime('%Y-%m-%d %H:%M:%S') if order.order_time else 'N/A'}",
-            f"Payment Method: {order.payment_method}",
-            f"Status: {order.status}",
-            "",
-            f"Items:"
+        self._lock = threading.Condition()
+        self._idle = deque()  # (connection, last_used) pairs, most recently used last
+        self._created = 0
+        self._in_use = 0
+        self._checkouts = 0
+        self._waits = 0
+        self._wait_time = 0.0
+        self._max_wait_time = 0.0
+        self._reconnects = 0
+        self._ready = False
+        self.query_stats = QueryStats(**QUERY_STATS_CONFIG)
+        self.statements = {}
+        self._transactions = threading.local()
+
+        self.ensure_connected()
+
+    def connect(self):
+        """Creates the database if needed and opens the first pooled connection."""
+        try:
+            # Connect without specifying a database first, to create it if it doesn't exist
+            server_connection = mysql.connector.connect(
+                host=self.db_config['host'],
+                port=self.db_config.get('port', 3306),
+                user=self.db_config['user'],
+                password=self.db_config['password']
+            )
+            cursor = server_connection.cursor()
+            # Create database if it doesn't exist
+            cursor.execute(f"CREATE DATABASE IF NOT EXISTS {self.db_config['database']}")
+            cursor.close()
+            server_connection.close()
+
+            # Warm the pool with one connection to the specific database
+            with self.connection():
+                pass
+            self._ready = True
+            print(f"Connected to MySQL database: {self.db_config['database']} (pool size {self.pool_size})")
+
+        except Error as e:
+            print(f"Error connecting to MySQL: {e}")
+            print("Please ensure MySQL server is running and credentials are correct.")
+            print(f"DB Host: {self.db_config['host']}, Port: {self.db_config['port']}, User: {self.db_config['user']}, Password: {self.db_config['password']}")
+            self._ready = False
+
+    def _open_connection(self):
+        """Opens a new connection, retrying with exponential backoff."""
+        delay = self.retry_backoff
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                # Autocommit keeps plain reads from pinning an old snapshot on a reused connection;
+                # multi-statement writes go through transaction()
+                return mysql.connector.connect(autocommit=True, **self.db_config)
+            except Error as e:
+                if attempt == self.max_retries:
+                    raise
+                print(f"Error connecting to MySQL (attempt {attempt}/{self.max_retries}): {e}. Retrying in {delay:.1f}s.")
+                time.sleep(delay)
+                delay *= 2
+
+    def _checkout(self):
+        """Takes an idle connection, or opens a new one if the pool has room, waiting otherwise."""
+        start = time.monotonic()
+        with self._lock:
+            waited = False
+            while not self._idle and self._created >= self.pool_size:
+                waited = True
+                remaining = self.checkout_timeout - (time.monotonic() - start)
+                if remaining <= 0:
+                    raise PoolError(f"Timed out after {self.checkout_timeout}s waiting for a database connection.")
+                self._lock.wait(remaining)
+
+            if self._idle:
+                connection, last_used = self._idle.pop()
+            else:
+                connection, last_used = None, None
+                self._created += 1
+            self._in_use += 1
+            self._checkouts += 1
+            if waited:
+                wait_time = time.monotonic() - start
+                self._waits += 1
+                self._wait_time += wait_time
+                self._max_wait_time = max(self._max_wait_time, wait_time)
+
+        try:
+            if connection is None:
+                connection = self._open_connection()
+            elif time.monotonic() - last_used > self.validate_after:
+                # Only connections that sat idle long enough to be dropped by the server are pinged
+                try:
+                    connection.ping(reconnect=False)
+                except Error:
+                    self._close_quietly(connection)
+                    connection = self._open_connection()
+                    with self._lock:
+                        self._reconnects += 1
+        except Exception:
+            with self._lock:
+                self._in_use -= 1
+                self._created -= 1
+                self._lock.notify()
+            raise
+        return connection
+
+    def _checkin(self, connection, broken: bool):
+        """Returns a connection to the pool, or discards it if it is no longer usable."""
+        with self._lock:
+            self._in_use -= 1
+            if broken:
+                self._created -= 1
+            else:
+                self._idle.append((connection, time.monotonic()))
+            self._lock.notify()
+        if broken:
+            self._close_quietly(connection)
+
+    @staticmethod
+    def _close_quietly(connection):
+        try:
+            connection.close()
+        except Error:
+            pass
+
+    @contextmanager
+    def connection(self):
+        """Borrows a pooled connection for the duration of the block."""
+        connection = self._checkout()
+        broken = False
+        try:
+            yield connection
+        except BaseException as e:
+            # A lost connection, or one abandoned mid-result (such as a stream closed early),
+            # is dropped from the pool; the next checkout opens a fresh one
+            broken = isinstance(e, (InterfaceError, OperationalError)) or not isinstance(e, Exception)
+            if not broken:
+                try:
+                    connection.rollback()
+                except Error:
+                    broken = True
+            raise
+        finally:
+            self._checkin(connection, broken)
+
+    def pool_stats(self) -> Dict[str, float]:
+        """Returns a snapshot of pool usage counters."""
+        with self._lock:
+            return {
+                "pool_size": self.pool_size,
+                "created": self._created,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "checkouts": self._checkouts,
+                "waits": self._waits,
+                "total_wait_ms": self._wait_time * 1000,
+                "max_wait_ms": self._max_wait_time * 1000,
+                "reconnects": self._reconnects
+            }
+
+    def _cursor(self, connection, dictionary: bool = False):
+        # Unbuffered: stream() reads each fetchmany batch off the socket instead of the whole result
+        return connection.cursor(dictionary=dictionary)
+
+    def _prepare(self, connection, sql: str):
+        # A prepared cursor sends the statement to the server once, then only its parameters on each execute
+        return connection.cursor(prepared=True), sql
+
+    def _begin(self, connection) -> None:
+        connection.start_transaction()
+
+    def _execute_migration_statement(self, cursor, statement: str) -> None:
+        # DDL commits implicitly in MySQL, so each statement is written to be safe to re-run
+        try:
+            cursor.execute(statement)
+        except Error as e:
+            if e.errno not in RERUNNABLE_MIGRATION_ERRORS:
+                raise
+
+    def increment_upsert_sql(self, table: str, key_columns: Tuple[str, ...], value_columns: Tuple[str, ...],
+                             kept_columns: Tuple[str, ...] = (), earliest_columns: Tuple[str, ...] = (),
+                             latest_columns: Tuple[str, ...] = (), returning_id: bool = False) -> str:
+        columns = key_columns + kept_columns + value_columns + earliest_columns + latest_columns
+        updates = ([f"{column} = {column} + VALUES({column})" for column in value_columns]
+                   + [f"{column} = LEAST({column}, VALUES({column}))" for column in earliest_columns]
+                   + [f"{column} = GREATEST({column}, VALUES({column}))" for column in latest_columns])
+        if returning_id:
+            updates.insert(0, "id = LAST_INSERT_ID(id)")  # Reported as lastrowid for an update as for an insert
+        return (f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))}) "
+                f"ON DUPLICATE KEY UPDATE {', '.join(updates)}")
+
+    def hour_sql(self, column: str) -> str:
+        return f"HOUR({column})"
+
+    def close_connection(self):
+        """Closes all idle pooled connections."""
+        with self._lock:
+            idle = [connection for connection, _ in self._idle]
+            self._idle.clear()
+            self._created -= len(idle)
+        for connection in idle:
+            self._close_quietly(connection)
+        if idle:
+            print("MySQL connection pool closed.")
+
+# Explicit adapters and converters for the DATE/DATETIME columns, as sqlite3's built-in ones are deprecated
+sqlite3.register_adapter(datetime.date, datetime.date.isoformat)
+sqlite3.register_adapter(datetime.datetime, lambda value: value.isoformat(" "))
+sqlite3.register_adapter(Decimal, str) # Stored as numbers through the DECIMAL columns' numeric affinity
+sqlite3.register_converter("DATE", lambda value: datetime.date.fromisoformat(value.decode()))
+sqlite3.register_converter("DATETIME", lambda value: datetime.datetime.fromisoformat(value.decode()))
+
+def _sqlite_dict_row(cursor, row) -> Dict:
+    return {column[0]: value for column, value in zip(cursor.description, row)}
+
+class _SQLiteConnection(sqlite3.Connection):
+    """sqlite3 connection that can carry the cursors kept for registered statements."""
+
+class _SQLiteCursor(sqlite3.Cursor):
+    """sqlite3 cursor that accepts the %s placeholders used by the queries in this module."""
+    def execute(self, query: str, params=()):
+        return super().execute(query.replace("%s", "?"), params)
+
+    def executemany(self, query: str, seq_of_params):
+        return super().executemany(query.replace("%s", "?"), seq_of_params)
+
+class SQLiteConnector(StorageBackend):
+    """Embedded SQLite storage in WAL mode, with one connection per thread over a single database file."""
+    SCHEMA_MIGRATIONS = SQLITE_SCHEMA_MIGRATIONS
+
+    def __init__(self, path: str, synchronous: str = 'FULL', busy_timeout: float = 5.0,
+                 cache_size_kb: int = 16384, mmap_size: int = 268435456, cached_statements: int = 256):
+        self.path = path
+        self.synchronous = synchronous
+        self.busy_timeout = busy_timeout
+        self.cache_size_kb = cache_size_kb
+        self.mmap_size = mmap_size
+        self.cached_statements = cached_statements  # sqlite3 keeps this many prepared statements per connection
+
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = []
+        self._generation = 0  # Bumped by close_connection so threads reopen instead of reusing closed connections
+        self._ready = False
+        self.query_stats = QueryStats(**QUERY_STATS_CONFIG)
+        self.statements = {}
+        self._transactions = threading.local()
+
+        self.ensure_connected()
+
+    def connect(self):
+        """Opens (creating if needed) the database file and this thread's connection."""
+        try:
+            with self.connection():
+                pass
+            self._ready = True
+            print(f"Opened SQLite database: {self.path}")
+        except sqlite3.Error as e:
+            print(f"Error opening SQLite database {self.path}: {e}")
+            self._ready = False
+
+    def _open_connection(self) -> sqlite3.Connection:
+        # isolation_level=None leaves transactions to _begin(), so plain reads never hold one open
+        connection = sqlite3.connect(
+            self.path,
+            timeout=self.busy_timeout,
+            isolation_level=None,
+            detect_types=sqlite3.PARSE_DECLTYPES,
+            check_same_thread=False, # close_connection() closes every thread's connection
+            cached_statements=self.cached_statements,
+            factory=_SQLiteConnection
+        )
+        connection.execute("PRAGMA journal_mode=WAL") # Readers never block the writer, nor it them
+        connection.execute(f"PRAGMA synchronous={self.synchronous}")
+        connection.execute("PRAGMA foreign_keys=ON") # For ON DELETE CASCADE from orders to order_items
+        connection.execute(f"PRAGMA cache_size=-{int(self.cache_size_kb)}")
+        connection.execute(f"PRAGMA mmap_size={int(self.mmap_size)}")
+        connection.execute("PRAGMA temp_store=MEMORY") # Sorts and GROUP BYs for the reports stay off disk
+        return connection
+
+    @contextmanager
+    def connection(self):
+        """Lends this thread's connection for the duration of the block, opening it on first use."""
+        generation, connection = getattr(self._local, "connection", (None, None))
+        if generation != self._generation:
+            connection = self._open_connection()
+            self._local.connection = (self._generation, connection)
+            with self._lock:
+                self._connections.append(connection)
+        try:
+            yield connection
+        except BaseException:
+            if connection.in_transaction:
+                connection.rollback()
+            raise
+
+    def _cursor(self, connection, dictionary: bool = False):
+        cursor = connection.cursor(_SQLiteCursor)
+        if dictionary:
+            cursor.row_factory = _sqlite_dict_row
+        return cursor
+
+    def _prepare(self, connection, sql: str):
+        # sqlite3 compiles each SQL text once into its statement cache; the placeholders are translated here once too
+        return connection.cursor(), sql.replace("%s", "?")
+
+    def _begin(self, connection) -> None:
+        # Take the write lock up front; a deferred transaction that later writes can fail with SQLITE_BUSY
+        connection.execute("BEGIN IMMEDIATE")
+
+    def increment_upsert_sql(self, table: str, key_columns: Tuple[str, ...], value_columns: Tuple[str, ...],
+                             kept_columns: Tuple[str, ...] = (), earliest_columns: Tuple[str, ...] = (),
+                             latest_columns: Tuple[str, ...] = (), returning_id: bool = False) -> str:
+        columns = key_columns + kept_columns + value_columns + earliest_columns + latest_columns
+        updates = ([f"{column} = {column} + excluded.{column}" for column in value_columns]
+                   + [f"{column} = MIN({column}, excluded.{column})" for column in earliest_columns]
+                   + [f"{column} = MAX({column}, excluded.{column})" for column in latest_columns])
+        return (f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))}) "
+                f"ON CONFLICT ({', '.join(key_columns)}) DO UPDATE SET {', '.join(updates)}"
+                + (" RETURNING id" if returning_id else ""))
+
+    def upsert_id(self, name: str, params: tuple) -> int:
+        # lastrowid is not set when the upsert updates, so the id comes back through RETURNING
+        return self.fetch_statement(name, params)[0][0]
+
+    def hour_sql(self, column: str) -> str:
+        return f"CAST(strftime('%H', {column}) AS INTEGER)"
+
+    def close_connection(self):
+        """Closes every thread's connection; threads open a new one on their next query."""
+        with self._lock:
+            connections = self._connections
+            self._connections = []
+            self._generation += 1
+        for connection in connections:
+            connection.close()
+        if connections:
+            print("SQLite connections closed.")
+
+def open_storage_backend(backend: Optional[str] = None) -> StorageBackend:
+    """Opens the storage backend named by backend, or by DB_BACKEND if not given."""
+    backend = backend or DB_BACKEND
+    if backend == 'mysql':
+        if mysql is None:
+            raise RuntimeError("The MySQL backend needs mysql-connector-python; install it or set DB_BACKEND = 'sqlite'.")
+        return MySQLConnector(DB_CONFIG, **POOL_CONFIG)
+    if backend == 'sqlite':
+        return SQLiteConnector(**SQLITE_CONFIG)
+    raise ValueError(f"Unknown storage backend '{backend}'. Choose 'mysql' or 'sqlite'.")
+
+class OfflineOrderQueue:
+    """Durable local queue (SQLite) for priced orders taken while MySQL is unreachable."""
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=FULL") # An acknowledged order must survive a power cut
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS queued_orders (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                idempotency_key TEXT NOT NULL UNIQUE,
+                payload TEXT NOT NULL
+            )
+        """)
+        # Prices are kept as exact decimal strings, as in the queued orders; a REAL column would round them
+        price_types = [row[2] for row in self.connection.execute("PRAGMA table_info(menu_snapshot)") if row[1] == 'price']
+        if price_types == ['REAL']:
+            self.connection.execute("ALTER TABLE menu_snapshot RENAME TO menu_snapshot_real")
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS menu_snapshot (
+                id INTEGER PRIMARY KEY,
+                name TEXT NOT NULL,
+                price TEXT NOT NULL,
+                category TEXT,
+                available INTEGER NOT NULL
+            )
+        """)
+        if price_types == ['REAL']:
+            # A snapshot saved by an older version: keep it, so an offline restart can still take orders
+            self.connection.execute("BEGIN")
+            self.connection.execute("""
+                INSERT INTO menu_snapshot (id, name, price, category, available)
+                SELECT id, name, printf('%.2f', price), category, available FROM menu_snapshot_real
+            """)
+            self.connection.execute("DROP TABLE menu_snapshot_real")
+            self.connection.execute("COMMIT")
+
+    def enqueue(self, payload: Dict) -> int:
+        """Stores a priced order and returns its queue sequence number."""
+        record = {**payload, 'order_time': payload['order_time'].isoformat()}
+        with self._lock:
+            cursor = self.connection.execute(
+                "INSERT INTO queued_orders (idempotency_key, payload) VALUES (?, ?)",
+                (payload['idempotency_key'], json.dumps(record, default=str)) # Amounts are kept as exact strings
+            )
+            return cursor.lastrowid
+
+    def peek(self, limit: int) -> List[Tuple[int, Dict]]:
+        """Returns up to limit of the oldest queued orders without removing them."""
+        with self._lock:
+            rows = self.connection.execute(
+                "SELECT seq, payload FROM queued_orders ORDER BY seq LIMIT ?", (limit,)
+            ).fetchall()
+        return [(seq, self._decode(payload_json)) for seq, payload_json in rows]
+
+    def find(self, idempotency_key: str) -> Optional[Tuple[int, Dict]]:
+        """Returns the queued order with this idempotency key and its sequence number, or None."""
+        with self._lock:
+            row = self.connection.execute(
+                "SELECT seq, payload FROM queued_orders WHERE idempotency_key = ?", (idempotency_key,)
+            ).fetchone()
+        return (row[0], self._decode(row[1])) if row else None
+
+    @staticmethod
+    def _decode(payload_json: str) -> Dict:
+        payload = json.loads(payload_json)
+        payload['order_time'] = datetime.datetime.fromisoformat(payload['order_time'])
+        for column in ('subtotal', 'cgst', 'sgst', 'total'):
+            payload[column] = to_money(payload[column])
+        payload['items'] = [
+            (item_id, name, quantity, to_money(unit_price), to_money(total_price))
+            for item_id, name, quantity, unit_price, total_price in payload['items']
         ]
+        return payload
 
-        subtotal = 0.0 # Recalculate from order items to be sure
-        for item in order.items:
-            line = f"- {item.name} x{item.quantity} @ ₹{item.price:.2f} = ₹{item.price * item.quantity:.2f}"
-            lines.append(line)
-            subtotal += item.price * item.quantity
+    def remove(self, seqs: List[int]) -> None:
+        """Deletes orders that have been written to MySQL."""
+        with self._lock:
+            self.connection.executemany("DELETE FROM queued_orders WHERE seq = ?", [(seq,) for seq in seqs])
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return self.connection.execute("SELECT COUNT(*) FROM queued_orders").fetchone()[0]
+
+    def save_menu(self, menu: Dict[int, MenuItem]) -> None:
+        """Keeps a copy of the menu so orders can still be priced after an offline restart."""
+        with self._lock:
+            self.connection.execute("BEGIN")
+            try:
+                self.connection.execute("DELETE FROM menu_snapshot")
+                self.connection.executemany(
+                    "INSERT INTO menu_snapshot (id, name, price, category, available) VALUES (?, ?, ?, ?, ?)",
+                    [(item.id, item.name, item.price, item.category, int(item.available)) for item in menu.values()]
+                )
+                self.connection.execute("COMMIT")
+            except BaseException:
+                # Left open, the transaction would hold the queue's write lock and fail every later write
+                self.connection.execute("ROLLBACK")
+                raise
+
+    def load_menu(self) -> Dict[int, MenuItem]:
+        with self._lock:
+            rows = self.connection.execute("SELECT id, name, price, category, available FROM menu_snapshot ORDER BY id").fetchall()
+        return {
+            row[0]: MenuItem(id=row[0], name=row[1], price=to_money(row[2]), category=row[3], available=bool(row[4]))
+            for row in rows
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self.connection.close()
+
+class OrderCommitQueue:
+    """Gathers orders from concurrent create_order calls and commits them together on one thread.
+
+    A caller waits until the batch holding its order has committed, so the Order it gets
+    back is as durable as one written on its own. A batch is every order queued while the
+    last one was committing, plus those arriving within window of its first, up to
+    max_batch_size orders.
+    """
+
+    def __init__(self, commit: Callable[[List[Order]], List[Optional[Order]]], window: float = 0.002,
+                 max_batch_size: int = 64):
+        self.commit = commit
+        self.window = window
+        self.max_batch_size = max_batch_size
+        self.batches = 0
+        self.orders = 0
+        self._pending = queue.Queue()
+        self._lock = threading.Lock()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="order-group-commit", daemon=True)
+        self._thread.start()
+
+    def submit(self, order: Order) -> Optional[Order]:
+        """Queues the order and returns it as saved, or None, once its batch has been written."""
+        future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("the order commit queue is closed.")
+            self._pending.put((order, future))
+        return future.result()
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "batches": self.batches,
+            "orders": self.orders,
+            "average_batch_size": self.orders / self.batches if self.batches else 0.0
+        }
+
+    def close(self) -> None:
+        """Commits the orders already queued, then stops the commit thread."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._pending.put(None)
+        self._thread.join()
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            entry = self._pending.get()
+            if entry is None:
+                break
+            batch = [entry]
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch_size:
+                try:
+                    entry = self._pending.get_nowait()
+                except queue.Empty:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        entry = self._pending.get(timeout=remaining)
+                    except queue.Empty:
+                        break
+                if entry is None:
+                    stopping = True
+                    break
+                batch.append(entry)
+            self._commit_batch(batch)
+
+    def _commit_batch(self, batch: List[Tuple[Order, Future]]) -> None:
+        try:
+            results = self.commit([order for order, _ in batch])
+        except Exception as e:
+            results = [e] * len(batch)
+        self.batches += 1
+        self.orders += len(batch)
+        for (_, future), result in zip(batch, results):
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+class OrderCache:
+    """Bounded LRU of assembled orders by id, for get_order.
+
+    Orders do not change once placed, so an entry stays valid until invalidate() is
+    called for it, as anything that changes an order's status or refunds it must.
+    Orders are copied in and out, so callers cannot change a cached one. Limited both
+    by count and by an estimate of the memory the orders take.
+    """
+    ORDER_OVERHEAD_BYTES = 600  # Order, its items list and field values, less the strings counted separately
+    ITEM_OVERHEAD_BYTES = 250   # One OrderItem with its Decimal price, less its name
+
+    def __init__(self, max_orders: int = 2000, max_bytes: int = 8 * 1024**2):
+        self.max_orders = max_orders
+        self.max_bytes = max_bytes
+        self._orders: "OrderedDict[int, Tuple[Order, int]]" = OrderedDict()  # id -> (order, estimated bytes), oldest first
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @classmethod
+    def estimate_bytes(cls, order: Order) -> int:
+        return (cls.ORDER_OVERHEAD_BYTES + len(order.customer_name) + len(order.payment_method or "")
+                + sum(cls.ITEM_OVERHEAD_BYTES + len(item.name) for item in order.items))
+
+    @staticmethod
+    def _copy(order: Order) -> Order:
+        return replace(order, items=[replace(item) for item in order.items])
+
+    def get(self, order_id: int) -> Optional[Order]:
+        with self._lock:
+            entry = self._orders.get(order_id)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._orders.move_to_end(order_id)
+            self.hits += 1
+        return self._copy(entry[0])
+
+    def put(self, order: Order) -> None:
+        """Caches a saved order as get_order would read it back."""
+        if order.id is None:
+            return # Queued offline; not in the database yet
+        cached = replace(self._copy(order), idempotency_key=None, provisional_id=None)
+        size = self.estimate_bytes(cached)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._orders.pop(order.id, None)
+            if previous is not None:
+                self.bytes -= previous[1]
+            self._orders[order.id] = (cached, size)
+            self.bytes += size
+            while len(self._orders) > self.max_orders or self.bytes > self.max_bytes:
+                _, (_, evicted_size) = self._orders.popitem(last=False)
+                self.bytes -= evicted_size
+                self.evictions += 1
+
+    def invalidate(self, order_id: int) -> None:
+        """Drops one order, so the next get_order reads it from the database."""
+        with self._lock:
+            entry = self._orders.pop(order_id, None)
+            if entry is not None:
+                self.bytes -= entry[1]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._orders.clear()
+            self.bytes = 0
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "orders": len(self._orders),
+                "bytes": self.bytes,
+                "evictions": self.evictions
+            }
+
+class CustomerIndex:
+    """In-memory index of customer names for case-insensitive prefix and fuzzy search.
+
+    Names are normalized as for the customers table (see normalize_customer_name), so
+    "rahul" finds "Rahul K." and each customer is suggested under one spelling. Prefix
+    search bisects sorted lists of the normalized names and of every later word in
+    them, so "kum" also finds "Rahul Kumar". When that gives too few
+    results, the same lists are searched for every text one edit away from what was typed
+    (a letter missing, extra, wrong, or two letters swapped), which finds "Rahul" for "rahl".
+    Names are only ever added; add() takes new ones incrementally.
+    """
+    MIN_FUZZY_LENGTH = 3  # Shorter text is one edit away from too many names to suggest any
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ids: Dict[str, int] = {}   # Normalized name -> index into _names
+        self._names: List[str] = []
+        self._name_keys: List[str] = []  # Normalized names, sorted, with the matching indexes in _name_ids
+        self._name_ids: List[int] = []
+        self._word_keys: List[str] = []  # Normalized names from their second word on, sorted, indexes in _word_ids
+        self._word_ids: List[int] = []
+        self._alphabet = set()           # Characters in any normalized name, for the fuzzy variants
+
+    @staticmethod
+    def normalize(name: str) -> str:
+        return normalize_customer_name(name)
+
+    @staticmethod
+    def _word_suffixes(key: str) -> Iterator[str]:
+        start = key.find(" ")
+        while start != -1:
+            yield key[start + 1:]
+            start = key.find(" ", start + 1)
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def add(self, names: Iterable[str]) -> int:
+        """Indexes the names not indexed yet; returns how many were new."""
+        with self._lock:
+            new_entries = []
+            for name in names:
+                key = self.normalize(name) if name else ""
+                if not key or key in self._ids:
+                    continue
+                self._ids[key] = len(self._names)
+                new_entries.append((key, len(self._names)))
+                self._names.append(name)
+            for key, _ in new_entries:
+                self._alphabet.update(key)
+
+            if len(new_entries) * 8 > len(self._names):
+                # Mostly new names (such as the first load): sorting everything beats inserting one by one
+                name_entries = sorted(itertools.chain(zip(self._name_keys, self._name_ids), new_entries))
+                word_entries = sorted(itertools.chain(
+                    zip(self._word_keys, self._word_ids),
+                    ((suffix, name_id) for key, name_id in new_entries for suffix in self._word_suffixes(key))))
+                self._name_keys = [key for key, _ in name_entries]
+                self._name_ids = [name_id for _, name_id in name_entries]
+                self._word_keys = [key for key, _ in word_entries]
+                self._word_ids = [name_id for _, name_id in word_entries]
+            else:
+                for key, name_id in new_entries:
+                    self._insort(self._name_keys, self._name_ids, key, name_id)
+                    for suffix in self._word_suffixes(key):
+                        self._insort(self._word_keys, self._word_ids, suffix, name_id)
+            return len(new_entries)
+
+    @staticmethod
+    def _insort(keys: List[str], ids: List[int], key: str, name_id: int) -> None:
+        position = bisect.bisect_right(keys, key)
+        keys.insert(position, key)
+        ids.insert(position, name_id)
+
+    def search(self, text: str, limit: int = 10) -> List[str]:
+        """Returns up to limit names: those starting with text, then those with a word starting with it, then fuzzy matches."""
+        key = self.normalize(text)
+        if not key or limit <= 0:
+            return []
+        found: List[int] = []
+        seen = set()
+        with self._lock:
+            self._collect_prefixed(key, limit, found, seen)
+            if len(found) < limit and len(key) >= self.MIN_FUZZY_LENGTH:
+                fuzzy: List[int] = []
+                for variant in sorted(self._edits(key, self._matched_length(key)) - {key}):
+                    self._collect_prefixed(variant, limit - len(found), fuzzy, seen)
+                    if len(fuzzy) >= limit - len(found):
+                        break
+                found.extend(fuzzy)
+            return [self._names[name_id] for name_id in found]
+
+    def _collect_prefixed(self, prefix: str, limit: int, found: List[int], seen: set) -> None:
+        """Appends to found the names, then the later words of names, that start with prefix."""
+        for keys, ids in ((self._name_keys, self._name_ids), (self._word_keys, self._word_ids)):
+            position = bisect.bisect_left(keys, prefix)
+            while position < len(keys) and len(found) < limit and keys[position].startswith(prefix):
+                name_id = ids[position]
+                if name_id not in seen:
+                    seen.add(name_id)
+                    found.append(name_id)
+                position += 1
+
+    def _has_prefixed(self, prefix: str) -> bool:
+        for keys in (self._name_keys, self._word_keys):
+            position = bisect.bisect_left(keys, prefix)
+            if position < len(keys) and keys[position].startswith(prefix):
+                return True
+        return False
+
+    def _matched_length(self, key: str) -> int:
+        """Length of the longest start of key that some name or word starts with."""
+        low, high = 0, len(key)
+        while low < high:
+            middle = (low + high + 1) // 2
+            if self._has_prefixed(key[:middle]):
+                low = middle
+            else:
+                high = middle - 1
+        return low
+
+    def _edits(self, key: str, matched: int) -> set:
+        """Every text one deletion, insertion, substitution or swap of neighbours away from key that could match.
 
-        cgst = subtotal * (self.CGST_RATE / 100)
-        sgst = subtotal * (self.SGST_RATE / 100)
-        total = subtotal + cgst + sgst
+        No name starts with key[:matched + 1], so the edit must be within it.
+        """
+        splits = [(key[:i], key[i:]) for i in range(min(matched + 1, len(key)) + 1)]
+        edits = {left + right[1:] for left, right in splits if right}
+        edits.update(left + right[1] + right[0] + right[2:] for left, right in splits if len(right) > 1)
+        for char in self._alphabet:
+            edits.update(left + char + right[1:] for left, right in splits if right)
+            edits.update(left + char + right for left, right in splits)
+        return edits
+
+class CafeBillingSystem:
+    """Main class for cafe billing operations."""
+    
+    CGST_RATE = 9.0  # 9% Central GST
+    SGST_RATE = 9.0  # 9% State GST
+    
+    money = MoneyEngine(CGST_RATE, SGST_RATE)
+
+    ANALYTICS_DIMENSIONS = ("day", "hour", "item", "category", "table", "payment_method")
+    MENU_CACHE_TTL = 300.0  # Seconds before the cached menu is reloaded from the database
+
+    # Column layout of order export/import files; CSV repeats the order columns on each item row
+    EXPORT_ORDER_COLUMNS = ("order_id", "idempotency_key", "customer_name", "table_number", "order_time",
+                            "status", "payment_method", "subtotal", "cgst", "sgst", "total")
+    EXPORT_ITEM_COLUMNS = ("item_id", "item_name", "quantity", "unit_price", "total_price")
+    TRANSFER_CHUNK_SIZE = 5000  # Orders per import transaction, and between export checkpoints
+    MULTI_ROW_INSERT_ROWS = 500  # Rows per multi-row INSERT, keeping statements within parameter limits
+
+    # Statements on the order and menu hot paths, prepared once per connection (see StorageBackend.fetch_statement)
+    STATEMENTS = {
+        "menu_version": "SELECT version FROM menu_version WHERE id = 1",
+        "menu_items": "SELECT id, name, price, category, available FROM menu_items ORDER BY id",
+        "insert_order": "INSERT INTO orders (customer_name, table_number, order_time, status, payment_method, subtotal, cgst, sgst, total, idempotency_key, customer_id) "
+                        "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)",
+        # INSERT ... SELECT share-locks the version row, so the menu cannot change before commit
+        "insert_order_at_menu_version": "INSERT INTO orders (customer_name, table_number, order_time, status, payment_method, subtotal, cgst, sgst, total, idempotency_key, customer_id) "
+                                        "SELECT %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s FROM menu_version WHERE id = 1 AND version = %s",
+        "order_by_id": "SELECT id, customer_name, table_number, order_time, status, payment_method FROM orders WHERE id = %s",
+        "order_items_by_order": "SELECT item_id, quantity, unit_price, item_name FROM order_items WHERE order_id = %s",
+        "order_id_by_idempotency_key": "SELECT id FROM orders WHERE idempotency_key = %s",
+        "max_customer_id": "SELECT MAX(id) FROM customers",
+        "customer_names": "SELECT name FROM customers",
+        "customer_names_between": "SELECT name FROM customers WHERE id > %s AND id <= %s",
+        "customer_summary": "SELECT c.id, c.name, c.visit_count, c.lifetime_spend, c.first_visit, c.last_visit, m.name, c.favourite_quantity "
+                            "FROM customers c LEFT JOIN menu_items m ON m.id = c.favourite_item_id WHERE c.name_key = %s"
+    }
+
+    def __init__(self, db: Optional[StorageBackend] = None) -> None:
+        self.db = db if db is not None else open_storage_backend()
+        self.offline_queue = OfflineOrderQueue(OFFLINE_QUEUE_CONFIG['path'])
+
+        # Menu cache keyed by item id, stamped with the menu_version it was loaded at
+        self._menu_lock = threading.Lock()
+        self._menu_cache: Optional[Dict[int, MenuItem]] = None
+        self._menu_version: Optional[int] = None
+        self._menu_loaded_at = 0.0
+        self.menu_cache_hits = 0
+        self.menu_cache_misses = 0
+
+        # Assembled orders by id; create_order writes through it, so a just-placed order is never read back
+        self.order_cache = OrderCache(**ORDER_CACHE_CONFIG)
+
+        # Customer names for search_customers; loaded on the first search, then kept current
+        self.customer_index = CustomerIndex()
+        self._customer_index_lock = threading.Lock()
+        self._customer_scan: Optional[Tuple[int, int]] = None  # Highest customer ids read by the last two refreshes
+        self._customer_index_checked = 0.0
+        self._new_customers = deque()  # Customers of orders placed here since the last search
+
+        # Without a database, orders can still be taken as long as a menu was saved locally
+        self._db_down = not self.db.is_connected()
+        if self._db_down:
+            if not self.offline_queue.load_menu():
+                self.offline_queue.close()
+                raise ConnectionError("Database connection failed during initialization. Please check DB_BACKEND and the matching DB_CONFIG or SQLITE_CONFIG.")
+            print("Database unreachable: orders will be queued locally until it is back.")
+
+        # The writes whose SQL differs between backends: the running totals kept beside each order
+        self._daily_sales_upsert_query = self.db.increment_upsert_sql(
+            "daily_sales", ("sale_date", "payment_method"), ("order_count", "subtotal", "cgst", "sgst", "total")
+        )
+        customer_columns = dict(key_columns=("name_key",), kept_columns=("name",), value_columns=("visit_count", "lifetime_spend"),
+                                earliest_columns=("first_visit",), latest_columns=("last_visit",))
+        self._customer_upsert_query = self.db.increment_upsert_sql("customers", **customer_columns)
+        self._customer_items_upsert_query = self.db.increment_upsert_sql("customer_items", ("customer_id", "item_id"), ("quantity",))
+        self.db.register_statements({
+            **self.STATEMENTS,
+            "daily_sales_upsert": self._daily_sales_upsert_query,
+            "customer_upsert": self.db.increment_upsert_sql("customers", **customer_columns, returning_id=True)
+        })
+
+        # Optional batching of concurrent create_order calls into shared commits
+        self.group_commit: Optional[OrderCommitQueue] = None
+        if GROUP_COMMIT_CONFIG['enabled']:
+            self.group_commit = OrderCommitQueue(self.create_orders, GROUP_COMMIT_CONFIG['window'],
+                                                 GROUP_COMMIT_CONFIG['max_batch_size'])
+
+        # Background replay of queued orders
+        self._stop_flusher = threading.Event()
+        self._flusher = threading.Thread(target=self._flush_offline_orders_loop, name="offline-order-flusher", daemon=True)
+        self._flusher.start()
+
+    def close(self) -> None:
+        """Commits any grouped orders, stops the offline flusher and releases database and queue connections."""
+        if self.group_commit is not None:
+            self.group_commit.close()
+        self._stop_flusher.set()
+        self._flusher.join()
+        self.db.close_connection()
+        self.offline_queue.close()
+
+    def _load_menu(self) -> Tuple[Dict[int, MenuItem], int]:
+        """Returns the cached menu and its version, reloading it if it is missing or expired."""
+        with self._menu_lock:
+            if self._menu_cache is not None and time.monotonic() - self._menu_loaded_at < self.MENU_CACHE_TTL:
+                self.menu_cache_hits += 1
+                return self._menu_cache, self._menu_version
+            self.menu_cache_misses += 1
+
+        # Read the version and the rows in one transaction so they describe the same menu
+        with self.db.transaction():
+            version = int(self.db.fetch_statement("menu_version")[0][0])
+            menu = {
+                item_id: MenuItem(id=item_id, name=name, price=to_money(price), category=category, available=bool(available))
+                for item_id, name, price, category, available in self.db.fetch_statement("menu_items")
+            }
+
+        with self._menu_lock:
+            self._menu_cache = menu
+            self._menu_version = version
+            self._menu_loaded_at = time.monotonic()
+        self.offline_queue.save_menu(menu)
+        return menu, version
+
+    def _offline_menu(self) -> Dict[int, MenuItem]:
+        """The last menu seen, for pricing orders while the database is unreachable."""
+        with self._menu_lock:
+            if self._menu_cache is not None:
+                return self._menu_cache
+        menu = self.offline_queue.load_menu()
+        if not menu:
+            raise LookupError("No menu is available while the database is unreachable.")
+        return menu
+
+    def invalidate_menu_cache(self) -> None:
+        """Drops the cached menu; call after changing menu_items so the next read reloads it."""
+        with self._menu_lock:
+            self._menu_cache = None
+            self._menu_version = None
+
+    def menu_cache_stats(self) -> Dict[str, float]:
+        """Returns hit/miss counters and the version of the currently cached menu."""
+        with self._menu_lock:
+            lookups = self.menu_cache_hits + self.menu_cache_misses
+            return {
+                "hits": self.menu_cache_hits,
+                "misses": self.menu_cache_misses,
+                "hit_rate": self.menu_cache_hits / lookups if lookups else 0.0,
+                "version": self._menu_version,
+                "items": len(self._menu_cache) if self._menu_cache is not None else 0
+            }
+
+    def invalidate_order(self, order_id: int) -> None:
+        """Drops one order from the order cache; call after changing the order's status or refunding it."""
+        self.order_cache.invalidate(order_id)
+
+    def invalidate_order_cache(self) -> None:
+        """Drops every cached order; call after changing or deleting orders other than through this class."""
+        self.order_cache.clear()
+
+    def order_cache_stats(self) -> Dict[str, float]:
+        """Returns hit/miss counters and the size of the order cache."""
+        return self.order_cache.stats()
+
+    def get_menu_items(self) -> List[MenuItem]:
+        """Get list of available menu items, served from the menu cache."""
+        try:
+            menu, _ = self._load_menu()
+        except DB_ERRORS as e:
+            print(f"Error fetching menu items: {e}")
+            try:
+                menu = self._offline_menu()
+            except LookupError:
+                return []
+        return [item for item in menu.values() if item.available]
+    
+    def create_order(self, order: Order, verify: bool = False) -> Optional[Order]:
+        """Create a new order and return it as saved, or None if it could not be created.
+
+        Items are priced from the menu cache and the whole order is written in a single
+        transaction. The returned Order carries its id, order_time and priced items, so
+        the bill needs no further reads. With verify, the transaction is rolled back unless
+        every row was written; group-committed orders are always checked so. If the database cannot be reached, the priced order is
+        saved to the offline queue instead and returned with a provisional_id and no id.
+        An order whose idempotency key is already saved or queued is not written again; it
+        comes back as it was first saved, so resending after a lost reply is safe.
+        With group commit enabled (GROUP_COMMIT_CONFIG), the order is written together with
+        other threads' orders, and this call returns once that shared commit is done.
+        """
+        if self.group_commit is not None:
+            return self.group_commit.submit(replace(order, idempotency_key=order.idempotency_key or uuid.uuid4().hex))
+        return self._create_order_now(order, verify)
+
+    def _create_order_now(self, order: Order, verify: bool = False) -> Optional[Order]:
+        """create_order without group commit: writes the order in its own transaction."""
+        if not order.items:
+            print("Error: Cannot create an order without items.")
+            return None
+        idempotency_key = order.idempotency_key or uuid.uuid4().hex
+
+        try:
+            if not self._db_down:
+                try:
+                    return self._create_order_online(order, idempotency_key, verify)
+                except (InterfaceError, OperationalError, PoolError) as e:
+                    # The order may or may not have committed; its idempotency key makes the replay safe
+                    print(f"Database unavailable ({e}). Saving order to the offline queue.")
+                    self._db_down = True
+            return self._queue_order(order, idempotency_key)
+        except LookupError as e:
+            print(f"Error: {e}")
+            return None
+        except Exception as e:
+            # A resend of an order that was written (its reply lost) fails on the key; return the saved order
+            saved_order = self._find_saved_order(idempotency_key)
+            if saved_order is not None:
+                return saved_order
+            print(f"Error creating order: {e}")
+            return None
+
+    def _find_saved_order(self, idempotency_key: str) -> Optional[Order]:
+        """The order already written under idempotency_key, as get_order reads it, or None."""
+        try:
+            rows = self.db.fetch_statement("order_id_by_idempotency_key", (idempotency_key,))
+        except DB_ERRORS:
+            return None
+        order = self.get_order(rows[0][0]) if rows else None
+        return replace(order, idempotency_key=idempotency_key) if order is not None else None
+
+    def _create_order_online(self, order: Order, idempotency_key: str, verify: bool) -> Order:
+        """Prices the order from the menu cache and writes it, repricing once if the menu changed."""
+        for attempt in range(2):
+            menu, menu_version = self._load_menu()
+            if attempt == 0 and any(item.item_id not in menu for item in order.items):
+                # The item may have been added since the menu was cached
+                self.invalidate_menu_cache()
+                continue
+            priced_order = self._price_order(order, menu, idempotency_key)
+            try:
+                with self.db.transaction() as cursor:
+                    order_id = self._write_order(cursor, priced_order, menu_version, verify)
+                saved_order = self._saved_order(priced_order, order_id=order_id)
+                self._remember_order(saved_order)
+                return saved_order
+            except _StaleMenuError:
+                self.invalidate_menu_cache()
+        raise RuntimeError("the menu kept changing while the order was being saved.")
+
+    def create_orders(self, orders: List[Order]) -> List[Optional[Order]]:
+        """Create many orders in one transaction; returns each one as saved, or None where create_order would.
+
+        For group commit and for a server taking orders from several terminals at once:
+        the orders and their items are written with multi-row INSERTs under one commit. An
+        order whose idempotency key is already written is not written again and comes back
+        as first saved. The transaction is rolled back unless every row was written, as with
+        create_order's verify. If the batch cannot be written together, each order is retried
+        on its own through create_order, so a failure only affects the order that caused it.
+        """
+        keys = [order.idempotency_key or uuid.uuid4().hex for order in orders]
+        if self._db_down:
+            return [self._create_order_now(replace(order, idempotency_key=key)) for order, key in zip(orders, keys)]
+
+        try:
+            for attempt in range(2):
+                menu, menu_version = self._load_menu()
+                if attempt == 0 and any(item.item_id not in menu for order in orders for item in order.items):
+                    # Items may have been added since the menu was cached
+                    self.invalidate_menu_cache()
+                    continue
+                priced_orders = {}
+                for index, (order, key) in enumerate(zip(orders, keys)):
+                    if not order.items:
+                        print("Error: Cannot create an order without items.")
+                    elif key in keys[:index]:
+                        print(f"Error: Order {key} appears twice in the batch.")
+                    else:
+                        try:
+                            priced_orders[index] = self._price_order(order, menu, key)
+                        except LookupError as e:
+                            print(f"Error: {e}")
+                try:
+                    results: List[Optional[Order]] = [None] * len(orders)
+                    if not priced_orders:
+                        return results
+                    already_written = {}
+                    with self.db.transaction() as cursor:
+                        placeholders = ", ".join(["%s"] * len(priced_orders))
+                        cursor.execute(f"SELECT id, idempotency_key FROM orders WHERE idempotency_key IN ({placeholders})",
+                                       tuple(priced_order['idempotency_key'] for priced_order in priced_orders.values()))
+                        written_ids = {row['idempotency_key']: row['id'] for row in cursor.fetchall()}
+                        for index, priced_order in list(priced_orders.items()):
+                            if priced_order['idempotency_key'] in written_ids:
+                                # A resend after a lost reply: answered with the order as first saved
+                                already_written[index] = written_ids[priced_order['idempotency_key']]
+                                del priced_orders[index]
+                        order_ids = self._write_orders(cursor, list(priced_orders.values()), menu_version)
+                    for (index, priced_order), order_id in zip(priced_orders.items(), order_ids):
+                        results[index] = self._saved_order(priced_order, order_id=order_id)
+                        self._remember_order(results[index])
+                    for index, order_id in already_written.items():
+                        order = self.get_order(order_id)
+                        results[index] = replace(order, idempotency_key=keys[index]) if order is not None else None
+                    return results
+                except _StaleMenuError:
+                    self.invalidate_menu_cache()
+            raise RuntimeError("the menu kept changing while the orders were being saved.")
+        except Exception as e:
+            print(f"Error creating {len(orders)} orders together ({e}); creating them one at a time.")
+            return [self._create_order_now(replace(order, idempotency_key=key), verify=True) for order, key in zip(orders, keys)]
+
+    def _remember_order(self, order: Order) -> None:
+        """Keeps a just-saved order for get_order, and its customer for search_customers."""
+        self.order_cache.put(order)
+        if self._customer_scan is not None:
+            self._new_customers.append(order.customer_name)
+
+    def _queue_order(self, order: Order, idempotency_key: str) -> Order:
+        """Prices the order from the last known menu and saves it locally for later replay."""
+        priced_order = self._price_order(order, self._offline_menu(), idempotency_key)
+        try:
+            seq = self.offline_queue.enqueue(priced_order)
+        except sqlite3.IntegrityError:
+            # Already queued under this key: a resend, answered with the order as first queued
+            seq, priced_order = self.offline_queue.find(idempotency_key)
+            return self._saved_order(priced_order, provisional_id=f"P-{seq}")
+        print(f"Order queued offline as P-{seq}.")
+        return self._saved_order(priced_order, provisional_id=f"P-{seq}")
+
+    @staticmethod
+    def _saved_order(priced_order: Dict, order_id: Optional[int] = None,
+                     provisional_id: Optional[str] = None) -> Order:
+        """Builds the Order a caller gets back from the values that were written."""
+        return Order(
+            id=order_id,
+            provisional_id=provisional_id,
+            idempotency_key=priced_order['idempotency_key'],
+            customer_name=priced_order['customer_name'],
+            table_number=priced_order['table_number'],
+            order_time=priced_order['order_time'],
+            status=priced_order['status'],
+            payment_method=priced_order['payment_method'],
+            items=[
+                OrderItem(item_id=item_id, quantity=quantity, price=unit_price, name=name)
+                for item_id, name, quantity, unit_price, _ in priced_order['items']
+            ]
+        )
+
+    def _price_order(self, order: Order, menu: Dict[int, MenuItem], idempotency_key: str) -> Dict:
+        """Prices an order against the given menu and returns the row values to be written."""
+        # Calculate subtotal and taxes from current menu prices for accuracy
+        order_items_to_save = []
+        for item_in_order in order.items:
+            menu_item = menu.get(item_in_order.item_id)
+            if menu_item is None:
+                raise LookupError(f"Menu item with ID {item_in_order.item_id} not found.")
+
+            order_items_to_save.append((
+                item_in_order.item_id,
+                menu_item.name, # Use name from DB
+                item_in_order.quantity,
+                menu_item.price,
+                self.money.line_total(menu_item.price, item_in_order.quantity)
+            ))
+
+        totals = self.money.bill_totals(item[4] for item in order_items_to_save)
+        return {
+            'idempotency_key': idempotency_key,
+            'customer_name': order.customer_name,
+            'table_number': order.table_number,
+            # Whole seconds, so the DATETIME column and the daily_sales date always agree
+            'order_time': datetime.datetime.now().replace(microsecond=0),
+            'status': order.status,
+            'payment_method': order.payment_method,
+            'subtotal': totals.subtotal,
+            'cgst': totals.cgst,
+            'sgst': totals.sgst,
+            'total': totals.total,
+            'items': order_items_to_save
+        }
+
+    def _write_order(self, cursor, priced_order: Dict, menu_version: Optional[int] = None,
+                     verify: bool = False) -> int:
+        """Inserts a priced order, its items, its daily_sales share and its customer's totals using the given transaction cursor.
+
+        With a menu_version, the order row is only inserted if the menu is still at that version.
+        With verify, the affected-row counts are checked so a short write aborts the transaction.
+        """
+        customer_id = self.db.upsert_id("customer_upsert", (
+            normalize_customer_name(priced_order['customer_name']), priced_order['customer_name'], 1,
+            priced_order['total'], priced_order['order_time'], priced_order['order_time']
+        ))
+        order_params = (
+            priced_order['customer_name'],
+            priced_order['table_number'],
+            priced_order['order_time'],
+            priced_order['status'],
+            priced_order['payment_method'],
+            priced_order['subtotal'],
+            priced_order['cgst'],
+            priced_order['sgst'],
+            priced_order['total'],
+            priced_order['idempotency_key'],
+            customer_id
+        )
+        if menu_version is None:
+            rowcount, new_order_id = self.db.execute_statement("insert_order", order_params)
+        else:
+            rowcount, new_order_id = self.db.execute_statement("insert_order_at_menu_version", order_params + (menu_version,))
+            if rowcount == 0:
+                raise _StaleMenuError()
+        if verify and rowcount != 1:
+            raise Error("The order row was not written.")
+
+        # Insert all rows into order_items table in one batch; on the plain cursor, which sends MySQL one
+        # multi-row INSERT where a prepared one would send a statement per item
+        order_item_insert_query = """
+            INSERT INTO order_items (order_id, item_id, item_name, quantity, unit_price, total_price)
+            VALUES (%s, %s, %s, %s, %s, %s)
+        """
+        cursor.executemany(order_item_insert_query, [
+            (new_order_id, *item_data) for item_data in priced_order['items']
+        ])
+        if verify and cursor.rowcount != len(priced_order['items']):
+            raise Error(f"Expected {len(priced_order['items'])} order item rows, wrote {cursor.rowcount}.")
+        cursor.executemany(self._customer_items_upsert_query, [
+            (customer_id, *item) for item in self._item_quantities(priced_order['items']).items()
+        ])
+
+        # Keep the daily rollup in step with the order, in the same transaction
+        self.db.execute_statement("daily_sales_upsert", (
+            priced_order['order_time'].date(), priced_order['payment_method'] or '', 1,
+            priced_order['subtotal'], priced_order['cgst'], priced_order['sgst'], priced_order['total']
+        ))
+
+        return new_order_id
+
+    def _write_orders(self, cursor, priced_orders: List[Dict], menu_version: Optional[int] = None) -> List[int]:
+        """Inserts many priced orders, their items, daily_sales shares and customer totals with multi-row INSERTs; returns their ids.
+
+        With a menu_version, the first order goes through _write_order's version check, whose
+        lock keeps the menu from changing before the whole batch commits. The affected-row
+        counts are always checked, as _write_order's verify does, so a short write aborts the transaction.
+        """
+        order_ids = {}
+        remaining = priced_orders
+        if menu_version is not None and priced_orders:
+            order_ids[priced_orders[0]['idempotency_key']] = self._write_order(cursor, priced_orders[0], menu_version, verify=True)
+            remaining = priced_orders[1:]
+        if not remaining:
+            return [order_ids[order['idempotency_key']] for order in priced_orders]
+
+        # One upsert per customer in the batch, then their ids by key
+        customers = {}
+        for order in remaining:
+            key = normalize_customer_name(order['customer_name'])
+            if key not in customers:
+                customers[key] = [order['customer_name'], 0, ZERO_RUPEES, order['order_time'], order['order_time']]
+            totals = customers[key]
+            totals[1] += 1
+            totals[2] += order['total']
+            totals[3] = min(totals[3], order['order_time'])
+            totals[4] = max(totals[4], order['order_time'])
+        cursor.executemany(self._customer_upsert_query, [(key, *totals) for key, totals in customers.items()])
+        keys = tuple(customers)
+        cursor.execute(f"SELECT id, name_key FROM customers WHERE name_key IN ({', '.join(['%s'] * len(keys))})", keys)
+        customer_ids = {row['name_key']: row['id'] for row in cursor.fetchall()}
+        order_customer_ids = [customer_ids[normalize_customer_name(order['customer_name'])] for order in remaining]
+
+        rowcount = self._insert_rows(cursor, "orders", ("customer_name", "table_number", "order_time", "status", "payment_method",
+                                             "subtotal", "cgst", "sgst", "total", "idempotency_key", "customer_id"), [
+            (order['customer_name'], order['table_number'], order['order_time'], order['status'], order['payment_method'],
+             order['subtotal'], order['cgst'], order['sgst'], order['total'], order['idempotency_key'], customer_id)
+            for order, customer_id in zip(remaining, order_customer_ids)
+        ])
+        if rowcount != len(remaining):
+            raise Error(f"Expected {len(remaining)} order rows, wrote {rowcount}.")
+        # Multi-row inserts do not report every generated id, so they are looked up by key
+        keys = tuple(order['idempotency_key'] for order in remaining)
+        cursor.execute(f"SELECT id, idempotency_key FROM orders WHERE idempotency_key IN ({', '.join(['%s'] * len(keys))})", keys)
+        order_ids.update((row['idempotency_key'], row['id']) for row in cursor.fetchall())
+        item_rows = [(order_ids[order['idempotency_key']], *item) for order in remaining for item in order['items']]
+        rowcount = self._insert_rows(cursor, "order_items", ("order_id", "item_id", "item_name", "quantity", "unit_price", "total_price"), item_rows)
+        if rowcount != len(item_rows):
+            raise Error(f"Expected {len(item_rows)} order item rows, wrote {rowcount}.")
+        customer_items = {}
+        for order, customer_id in zip(remaining, order_customer_ids):
+            for item_id, quantity in self._item_quantities(order['items']).items():
+                customer_items[customer_id, item_id] = customer_items.get((customer_id, item_id), 0) + quantity
+        cursor.executemany(self._customer_items_upsert_query, [key + (quantity,) for key, quantity in customer_items.items()])
+
+        rollup = {}
+        for order in remaining:
+            totals = rollup.setdefault((order['order_time'].date(), order['payment_method'] or ''), [0, ZERO_RUPEES, ZERO_RUPEES, ZERO_RUPEES, ZERO_RUPEES])
+            totals[0] += 1
+            for index, column in enumerate(('subtotal', 'cgst', 'sgst', 'total'), start=1):
+                totals[index] += order[column]
+        cursor.executemany(self._daily_sales_upsert_query, [key + tuple(totals) for key, totals in rollup.items()])
+        return [order_ids[order['idempotency_key']] for order in priced_orders]
+
+    @staticmethod
+    def _item_quantities(items: List[tuple]) -> Dict[int, int]:
+        """Quantity per menu item over an order's priced item rows (item_id, item_name, quantity, ...)."""
+        quantities: Dict[int, int] = {}
+        for item_id, _, quantity, *_ in items:
+            if item_id is not None:
+                quantities[item_id] = quantities.get(item_id, 0) + quantity
+        return quantities
+
+    @classmethod
+    def _insert_rows(cls, cursor, table: str, columns: Sequence[str], rows: List[tuple]) -> int:
+        """Inserts rows with multi-row INSERT statements of at most MULTI_ROW_INSERT_ROWS rows each; returns the rows written."""
+        row_placeholder = "(" + ", ".join(["%s"] * len(columns)) + ")"
+        written = 0
+        for start in range(0, len(rows), cls.MULTI_ROW_INSERT_ROWS):
+            chunk = rows[start:start + cls.MULTI_ROW_INSERT_ROWS]
+            cursor.execute(f"INSERT INTO {table} ({', '.join(columns)}) VALUES {', '.join([row_placeholder] * len(chunk))}",
+                           tuple(value for row in chunk for value in row))
+            written += cursor.rowcount
+        return written
+
+    def flush_offline_orders(self) -> int:
+        """Replays queued offline orders into the database in batches; returns how many were written.
+
+        Orders whose idempotency key is already in the database (for example because the
+        original attempt committed after all) are dropped from the queue without a second insert.
+        """
+        if not self.db.ensure_connected():
+            return 0
+
+        batch_size = OFFLINE_QUEUE_CONFIG['batch_size']
+        written = 0
+        while True:
+            batch = self.offline_queue.peek(batch_size)
+            if not batch:
+                break
+            keys = [payload['idempotency_key'] for _, payload in batch]
+            with self.db.transaction() as cursor:
+                placeholders = ", ".join(["%s"] * len(keys))
+                cursor.execute(f"SELECT idempotency_key FROM orders WHERE idempotency_key IN ({placeholders})", tuple(keys))
+                already_written = {row['idempotency_key'] for row in cursor.fetchall()}
+                for _, payload in batch:
+                    if payload['idempotency_key'] not in already_written:
+                        self._write_order(cursor, payload)
+                        written += 1
+            self.offline_queue.remove([seq for seq, _ in batch])
+
+        if self._db_down:
+            # Confirm the database answers before sending new orders to it again
+            with self.db.transaction() as cursor:
+                cursor.execute("SELECT 1 AS ok")
+                cursor.fetchall()
+            self._db_down = False
+            print("Database reachable again: resuming direct order writes.")
+        if written:
+            print(f"Replayed {written} offline order(s) into the database.")
+        return written
+
+    def _flush_offline_orders_loop(self) -> None:
+        while not self._stop_flusher.wait(OFFLINE_QUEUE_CONFIG['flush_interval']):
+            try:
+                self.flush_offline_orders()
+            except Exception as e:
+                print(f"Offline orders not replayed yet: {e}")
+
+    def get_order(self, order_id: int) -> Optional[Order]:
+        """Retrieve order details by order ID, from the order cache when it holds the order."""
+        cached = self.order_cache.get(order_id)
+        if cached is not None:
+            return cached
+        try:
+            order_rows = self.db.fetch_statement("order_by_id", (order_id,))
+            if not order_rows:
+                return None
+            item_rows = self.db.fetch_statement("order_items_by_order", (order_id,))
+        except DB_ERRORS as e:
+            print(f"Error fetching order {order_id}: {e}")
+            return None
+
+        order_id, customer_name, table_number, order_time, status, payment_method = order_rows[0]
+        order = Order(
+            id=order_id,
+            customer_name=customer_name,
+            table_number=table_number,
+            order_time=order_time,
+            status=status,
+            payment_method=payment_method,
+            items=[
+                OrderItem(item_id=item_id, quantity=quantity, price=to_money(unit_price), name=item_name)
+                for item_id, quantity, unit_price, item_name in item_rows
+            ]
+        )
+        self.order_cache.put(order)
+        return order
+
+    def search_customers(self, text: str, limit: Optional[int] = None) -> List[str]:
+        """Customer names matching what was typed, for type-ahead: prefix matches first, then fuzzy ones.
+
+        The names are indexed in memory (see CustomerIndex). The first call loads every
+        customer from the orders, which takes a few seconds at hundreds of thousands of
+        them; later calls add customers of orders placed since, here or at another counter.
+        """
+        self._refresh_customer_index()
+        return self.customer_index.search(text, limit or CUSTOMER_SEARCH_CONFIG['limit'])
+
+    def _refresh_customer_index(self) -> None:
+        with self._customer_index_lock:
+            new_customers = []
+            while self._new_customers:
+                new_customers.append(self._new_customers.popleft())
+            self.customer_index.add(new_customers)
+            if time.monotonic() - self._customer_index_checked < CUSTOMER_SEARCH_CONFIG['refresh_interval']:
+                return
+            try:
+                high = self.db.fetch_statement("max_customer_id")[0][0] or 0
+                if self._customer_scan is None:
+                    self.customer_index.add(name for name, in self.db.fetch_statement("customer_names"))
+                    self._customer_scan = (high, high)
+                else:
+                    # Reads back to the refresh before last, so a customer that committed after
+                    # a higher id was seen (its id taken earlier) is still picked up
+                    older, newer = self._customer_scan
+                    self.customer_index.add(name for name, in self.db.fetch_statement("customer_names_between", (older, high)))
+                    self._customer_scan = (newer, high)
+            except DB_ERRORS as e:
+                print(f"Error refreshing customer search: {e}")
+            self._customer_index_checked = time.monotonic()
+
+    def get_daily_sales_report(self, date: datetime.date) -> Dict:
+        """Get sales report for a specific date from the daily_sales rollup; amounts are Decimal rupees."""
+        report = {
+            "date": date.isoformat(),
+            "order_count": 0,
+            "total_sales_before_tax": ZERO_RUPEES,
+            "total_cgst": ZERO_RUPEES,
+            "total_sgst": ZERO_RUPEES,
+            "total_gst": ZERO_RUPEES,
+            "net_sales": ZERO_RUPEES,
+            "payment_methods": {}
+        }
+
+        query = """
+            SELECT payment_method, order_count, subtotal, cgst, sgst, total
+            FROM daily_sales
+            WHERE sale_date = %s
+        """
+        for payment_method, order_count, subtotal, cgst, sgst, total in self.db.stream(query, (date,)):
+            report['order_count'] += int(order_count)
+            report['total_sales_before_tax'] += to_money(subtotal)
+            report['total_cgst'] += to_money(cgst)
+            report['total_sgst'] += to_money(sgst)
+            report['net_sales'] += to_money(total)
+            report['payment_methods'][payment_method] = to_money(total)
+        report['total_gst'] = report['total_cgst'] + report['total_sgst']
+
+        return report
+
+    def get_sales_analytics(self, start: datetime.date, end: datetime.date,
+                            group_by: str) -> Tuple[Tuple[str, ...], Iterator[tuple]]:
+        """Aggregate sales over start..end (inclusive) grouped by one of ANALYTICS_DIMENSIONS.
+
+        Returns the column names and an iterator that streams one tuple per group.
+        """
+        if group_by not in self.ANALYTICS_DIMENSIONS:
+            raise ValueError(f"Cannot group sales by '{group_by}'. Choose one of: {', '.join(self.ANALYTICS_DIMENSIONS)}.")
+
+        orders_filter, orders_params = self._order_time_range(start, end)
+        if group_by in ("day", "payment_method"):
+            # Per-day and per-payment-method totals come straight from the rollup
+            rollup_filter, params = self._sale_date_range(start, end)
+            group_column = "sale_date" if group_by == "day" else "payment_method"
+            columns = (group_by, "orders", "sales_before_tax", "gst", "net_sales")
+            query = f"""
+                SELECT {group_column}, SUM(order_count), SUM(subtotal), SUM(cgst) + SUM(sgst), SUM(total)
+                FROM daily_sales
+                WHERE {rollup_filter}
+                GROUP BY {group_column}
+                ORDER BY {group_column}
+            """
+        elif group_by in ("hour", "table"):
+            group_expression = self.db.hour_sql("order_time") if group_by == "hour" else "table_number"
+            columns = (group_by, "orders", "sales_before_tax", "gst", "net_sales")
+            params = orders_params
+            query = f"""
+                SELECT {group_expression}, COUNT(*), SUM(subtotal), SUM(cgst) + SUM(sgst), SUM(total)
+                FROM orders
+                WHERE {orders_filter}
+                GROUP BY {group_expression}
+                ORDER BY {group_expression}
+            """
+        else:
+            # Taxes are stored per order, so item-level groups report quantities and pre-tax sales
+            group_expression = "i.item_name" if group_by == "item" else "COALESCE(m.category, 'Uncategorized')"
+            columns = (group_by, "orders", "quantity", "sales_before_tax")
+            orders_filter, params = self._order_time_range(start, end, column="o.order_time")
+            query = f"""
+                SELECT {group_expression}, COUNT(DISTINCT o.id), SUM(i.quantity), SUM(i.total_price)
+                FROM orders o
+                JOIN order_items i ON i.order_id = o.id
+                LEFT JOIN menu_items m ON m.id = i.item_id
+                WHERE {orders_filter}
+                GROUP BY {group_expression}
+                ORDER BY SUM(i.total_price) DESC
+            """
+
+        return columns, self.db.stream(query, params)
+
+    @staticmethod
+    def _order_time_range(start: Optional[datetime.date], end: Optional[datetime.date],
+                          column: str = "order_time") -> Tuple[str, tuple]:
+        """Builds a sargable order_time filter for the inclusive date range start..end."""
+        conditions, params = [], []
+        if start is not None:
+            conditions.append(f"{column} >= %s")
+            params.append(datetime.datetime.combine(start, datetime.time.min))
+        if end is not None:
+            conditions.append(f"{column} < %s")
+            params.append(datetime.datetime.combine(end + datetime.timedelta(days=1), datetime.time.min))
+        return " AND ".join(conditions) or "TRUE", tuple(params)
+
+    @staticmethod
+    def _sale_date_range(start: Optional[datetime.date], end: Optional[datetime.date]) -> Tuple[str, tuple]:
+        """Builds a sale_date filter for the inclusive date range start..end."""
+        conditions, params = [], []
+        if start is not None:
+            conditions.append("sale_date >= %s")
+            params.append(start)
+        if end is not None:
+            conditions.append("sale_date <= %s")
+            params.append(end)
+        return " AND ".join(conditions) or "TRUE", tuple(params)
+
+    def rebuild_daily_sales(self, start: Optional[datetime.date] = None, end: Optional[datetime.date] = None) -> int:
+        """Recompute the daily_sales rollup from raw orders for start..end (default: all days); returns rows written."""
+        orders_filter, orders_params = self._order_time_range(start, end)
+        rollup_filter, rollup_params = self._sale_date_range(start, end)
+        with self.db.transaction() as cursor:
+            cursor.execute(f"DELETE FROM daily_sales WHERE {rollup_filter}", rollup_params)
+            cursor.execute(f"""
+                INSERT INTO daily_sales (sale_date, payment_method, order_count, subtotal, cgst, sgst, total)
+                SELECT DATE(order_time), COALESCE(payment_method, ''), COUNT(*), SUM(subtotal), SUM(cgst), SUM(sgst), SUM(total)
+                FROM orders
+                WHERE {orders_filter}
+                GROUP BY DATE(order_time), COALESCE(payment_method, '')
+            """, orders_params)
+            return cursor.rowcount
+
+    def rebuild_customers(self) -> int:
+        """Link orders written without a customer and recompute every customer's running totals; returns the customer count."""
+        with self.db.transaction() as cursor:
+            customers = rebuild_customer_totals(self.db, cursor)
+        self.customer_index = CustomerIndex()  # Merged spellings drop out of the suggestions
+        self._customer_scan = None
+        self._customer_index_checked = 0.0
+        return customers
+
+    def check_daily_sales(self, start: Optional[datetime.date] = None, end: Optional[datetime.date] = None) -> List[Dict]:
+        """Compare the daily_sales rollup with raw orders; returns one entry per (date, payment method) that differs."""
+        orders_filter, orders_params = self._order_time_range(start, end)
+        rollup_filter, rollup_params = self._sale_date_range(start, end)
+        columns = ("order_count", "subtotal", "cgst", "sgst", "total")
+        raw_rows = self.db.stream(f"""
+            SELECT DATE(order_time) AS sale_date, COALESCE(payment_method, '') AS payment_method,
+                   COUNT(*) AS order_count, SUM(subtotal) AS subtotal, SUM(cgst) AS cgst, SUM(sgst) AS sgst, SUM(total) AS total
+            FROM orders
+            WHERE {orders_filter}
+            GROUP BY DATE(order_time), COALESCE(payment_method, '')
+        """, orders_params, row_mode="dict")
+        rollup_rows = self.db.stream(f"""
+            SELECT sale_date, payment_method, order_count, subtotal, cgst, sgst, total
+            FROM daily_sales
+            WHERE {rollup_filter}
+        """, rollup_params, row_mode="dict")
+
+        raw = {self._daily_sales_key(row): row for row in raw_rows}
+        rollup = {self._daily_sales_key(row): row for row in rollup_rows}
+        mismatches = []
+        for key in sorted(raw.keys() | rollup.keys()):
+            # Compared to the paisa, as SQLite sums the DECIMAL columns as floats
+            raw_values = tuple(to_money(raw[key][column]) for column in columns) if key in raw else (0, 0, 0, 0, 0)
+            rollup_values = tuple(to_money(rollup[key][column]) for column in columns) if key in rollup else (0, 0, 0, 0, 0)
+            if raw_values != rollup_values:
+                mismatches.append({
+                    'date': key[0].isoformat(),
+                    'payment_method': key[1],
+                    'orders': dict(zip(columns, raw_values)),
+                    'daily_sales': dict(zip(columns, rollup_values))
+                })
+        return mismatches
+
+    @staticmethod
+    def _daily_sales_key(row: Dict) -> Tuple[datetime.date, str]:
+        sale_date = row['sale_date']
+        if isinstance(sale_date, str): # SQLite's DATE() returns text
+            sale_date = datetime.date.fromisoformat(sale_date)
+        return sale_date, row['payment_method']
+
+    def check_order_totals(self, start: Optional[datetime.date] = None, end: Optional[datetime.date] = None,
+                           batch_size: int = 5000) -> List[Dict]:
+        """Recompute every order's taxes and total from its stored subtotal; returns the orders that differ.
+
+        Orders are streamed and checked batch_size at a time with the integer-paise batch path.
+        """
+        orders_filter, params = self._order_time_range(start, end)
+        rows = self.db.stream(
+            f"SELECT id, subtotal, cgst, sgst, total FROM orders WHERE {orders_filter} ORDER BY id", params, batch_size
+        )
+        mismatches = []
+        while True:
+            batch = list(itertools.islice(rows, batch_size))
+            if not batch:
+                break
+            cgst, sgst, totals = self.money.batch_taxes([to_paise(row[1]) for row in batch])
+            for (order_id, _, stored_cgst, stored_sgst, stored_total), expected in zip(batch, zip(cgst, sgst, totals)):
+                stored = (to_paise(stored_cgst), to_paise(stored_sgst), to_paise(stored_total))
+                if stored != expected:
+                    mismatches.append({
+                        'order_id': order_id,
+                        'stored': {'cgst': to_money(stored_cgst), 'sgst': to_money(stored_sgst), 'total': to_money(stored_total)},
+                        'expected': dict(zip(('cgst', 'sgst', 'total'), (Decimal(paise).scaleb(-2) for paise in expected)))
+                    })
+        return mismatches
+
+    def get_order_batch(self, start: Optional[datetime.date] = None, end: Optional[datetime.date] = None) -> OrderBatch:
+        """Load the orders placed from start to end (default: all), with their items, into one columnar OrderBatch."""
+        orders_filter, params = self._order_time_range(start, end, column="o.order_time")
+        rows = self.db.stream(f"""
+            SELECT o.id, o.customer_name, o.table_number, o.order_time, o.status, o.payment_method,
+                   o.subtotal, o.cgst, o.sgst, o.total,
+                   i.item_id, i.item_name, i.quantity, i.unit_price, i.total_price
+            FROM orders o
+            LEFT JOIN order_items i ON i.order_id = o.id
+            WHERE {orders_filter}
+            ORDER BY o.id, i.id
+        """, params, batch_size=self.TRANSFER_CHUNK_SIZE)
+
+        batch = OrderBatch()
+        last_order_id = None
+        for row in rows:
+            if row[0] != last_order_id:
+                batch.append_order(*row[:10])
+                last_order_id = row[0]
+            if row[11] is not None:
+                batch.append_item(*row[10:])
+        return batch
+
+    def export_orders(self, path: str, file_format: Optional[str] = None, start: Optional[datetime.date] = None,
+                      end: Optional[datetime.date] = None, resume: bool = True, progress: bool = True) -> int:
+        """Stream orders and their items to a CSV (one row per item) or JSON Lines (one order per line) file.
+
+        Rows are read through a streaming cursor and written as they arrive, so memory use does
+        not grow with the table. Every TRANSFER_CHUNK_SIZE orders the file is synced and a
+        checkpoint beside it records the last complete order; an interrupted export carries on
+        from there unless resume is False. Returns the number of orders written by this call.
+        """
+        file_format = self._transfer_format(path, file_format)
+        checkpoint_path = path + ".export-checkpoint"
+        checkpoint = self._read_checkpoint(checkpoint_path) if resume else None
+        if checkpoint:
+            output = open(path, "r+", newline="", encoding="utf-8")
+            output.seek(checkpoint['offset'])
+            output.truncate() # Drop anything written after the checkpoint; it is exported again
+            last_order_id = checkpoint['last_order_id']
+            print(f"Resuming export after order {last_order_id}.")
+        else:
+            output = open(path, "w", newline="", encoding="utf-8")
+            last_order_id = 0
+        writer = csv.writer(output) if file_format == "csv" else None
+        if writer and not checkpoint:
+            writer.writerow(self.EXPORT_ORDER_COLUMNS + self.EXPORT_ITEM_COLUMNS)
+
+        orders_filter, params = self._order_time_range(start, end, column="o.order_time")
+        rows = self.db.stream(f"""
+            SELECT o.id, o.idempotency_key, o.customer_name, o.table_number, o.order_time, o.status, o.payment_method,
+                   o.subtotal, o.cgst, o.sgst, o.total,
+                   i.item_id, i.item_name, i.quantity, i.unit_price, i.total_price
+            FROM orders o
+            LEFT JOIN order_items i ON i.order_id = o.id
+            WHERE o.id > %s AND {orders_filter}
+            ORDER BY o.id, i.id
+        """, (last_order_id,) + params, batch_size=self.TRANSFER_CHUNK_SIZE)
+
+        written = 0
+        started = time.monotonic()
+        try:
+            for order_id, order_rows in itertools.groupby(rows, key=lambda row: row[0]):
+                order_rows = list(order_rows)
+                first = order_rows[0]
+                order = first[:7] + tuple(str(to_money(amount)) for amount in first[7:11])
+                items = [
+                    row[11:14] + (str(to_money(row[14])), str(to_money(row[15])))
+                    for row in order_rows if row[12] is not None
+                ]
+                if writer:
+                    # Orders without items still get one row, with the item columns left empty
+                    writer.writerows([order + item for item in items] or [order])
+                else:
+                    record = dict(zip(self.EXPORT_ORDER_COLUMNS, order))
+                    record['items'] = [dict(zip(self.EXPORT_ITEM_COLUMNS, item)) for item in items]
+                    output.write(json.dumps(record, default=str) + "\n")
+                written += 1
+                last_order_id = order_id
+                if written % self.TRANSFER_CHUNK_SIZE == 0:
+                    output.flush()
+                    os.fsync(output.fileno())
+                    self._write_checkpoint(checkpoint_path, {'last_order_id': last_order_id, 'offset': output.tell()})
+                    if progress:
+                        self._print_progress("exported", written, started)
+        finally:
+            output.close()
+        if progress:
+            self._print_progress("exported", written, started, done=True)
+        if os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+        return written
+
+    def import_orders(self, path: str, file_format: Optional[str] = None, resume: bool = True,
+                      progress: bool = True) -> int:
+        """Load orders from a CSV or JSON Lines file in the layout export_orders writes.
+
+        Each chunk of TRANSFER_CHUNK_SIZE orders is written with executemany in one transaction,
+        together with its items and its share of daily_sales. Orders are matched on their
+        idempotency_key (derived from the source order's id, customer, time and total if it has none),
+        so importing a file twice never duplicates an order; a checkpoint beside the file also
+        lets an interrupted import skip the chunks it already committed. Item ids that are not
+        on this database's menu are stored as NULL, keeping the item name. Returns the number
+        of orders written.
+        """
+        file_format = self._transfer_format(path, file_format)
+        checkpoint_path = path + ".import-checkpoint"
+        checkpoint = self._read_checkpoint(checkpoint_path) if resume else None
+        skip = checkpoint['orders_done'] if checkpoint else 0
+        if skip:
+            print(f"Resuming import after {skip:,} orders.")
+        menu, _ = self._load_menu()
+
+        written = 0
+        started = time.monotonic()
+        with open(path, newline="", encoding="utf-8") as source_file:
+            records = self._read_transfer_records(source_file, file_format)
+            deque(itertools.islice(records, skip), maxlen=0) # Skip the orders committed before the checkpoint
+            done = skip
+            while True:
+                chunk = [self._import_order(record, menu) for record in itertools.islice(records, self.TRANSFER_CHUNK_SIZE)]
+                if not chunk:
+                    break
+                written += self._write_imported_orders(chunk)
+                done += len(chunk)
+                self._write_checkpoint(checkpoint_path, {'orders_done': done})
+                if progress:
+                    self._print_progress("imported", written, started)
+        if progress:
+            self._print_progress("imported", written, started, done=True)
+        if os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+        return written
+
+    def _write_imported_orders(self, chunk: List[Dict]) -> int:
+        """Writes one chunk of imported orders, skipping those already present; returns how many were new."""
+        keys = tuple(order['idempotency_key'] for order in chunk)
+        placeholders = ", ".join(["%s"] * len(keys))
+        with self.db.transaction() as cursor:
+            cursor.execute(f"SELECT idempotency_key FROM orders WHERE idempotency_key IN ({placeholders})", keys)
+            existing = {row['idempotency_key'] for row in cursor.fetchall()}
+            new_orders = [order for order in chunk if order['idempotency_key'] not in existing]
+            if not new_orders:
+                return 0
+
+            self._write_orders(cursor, new_orders)
+        return len(new_orders)
+
+    @staticmethod
+    def _read_transfer_records(source_file, file_format: str) -> Iterator[Dict]:
+        """Yields one dict per order from an export file; CSV rows are grouped by order_id."""
+        if file_format == "jsonl":
+            for line in source_file:
+                if line.strip():
+                    yield json.loads(line)
+            return
+        item_columns = CafeBillingSystem.EXPORT_ITEM_COLUMNS
+        for _, rows in itertools.groupby(csv.DictReader(source_file), key=lambda row: row['order_id']):
+            rows = list(rows)
+            record = dict(rows[0])
+            record['items'] = [{column: row[column] for column in item_columns} for row in rows if row.get('item_name')]
+            yield record
+
+    @staticmethod
+    def _import_order(record: Dict, menu: Dict[int, MenuItem]) -> Dict:
+        """Converts one exported order record into the row values import_orders writes."""
+        def optional_int(value) -> Optional[int]:
+            return int(value) if value not in (None, "") else None
+
+        # Orders from before idempotency keys get one derived from what identifies them at the source
+        idempotency_key = record.get('idempotency_key') or uuid.uuid5(uuid.NAMESPACE_URL, "cafe-import:" + "|".join(
+            str(record.get(column)) for column in ('order_id', 'customer_name', 'order_time', 'total')
+        )).hex
+        items = []
+        for item in record.get('items', []):
+            item_id = optional_int(item.get('item_id'))
+            items.append((
+                item_id if item_id in menu else None,
+                item['item_name'],
+                int(item['quantity']),
+                to_money(item['unit_price']),
+                to_money(item['total_price'])
+            ))
+        return {
+            'idempotency_key': idempotency_key,
+            'customer_name': record['customer_name'],
+            'table_number': optional_int(record.get('table_number')),
+            'order_time': datetime.datetime.fromisoformat(record['order_time']),
+            'status': record.get('status') or "completed",
+            'payment_method': record.get('payment_method') or None,
+            'subtotal': to_money(record['subtotal']),
+            'cgst': to_money(record['cgst']),
+            'sgst': to_money(record['sgst']),
+            'total': to_money(record['total']),
+            'items': items
+        }
+
+    @staticmethod
+    def _transfer_format(path: str, file_format: Optional[str]) -> str:
+        if file_format is None:
+            extension = os.path.splitext(path)[1].lower()
+            file_format = {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl"}.get(extension)
+        if file_format not in ("csv", "jsonl"):
+            raise ValueError(f"Cannot tell the format of '{path}'. Use a .csv or .jsonl file, or pass the format.")
+        return file_format
+
+    @staticmethod
+    def _read_checkpoint(checkpoint_path: str) -> Optional[Dict]:
+        if not os.path.exists(checkpoint_path):
+            return None
+        with open(checkpoint_path, encoding="utf-8") as checkpoint_file:
+            return json.load(checkpoint_file)
+
+    @staticmethod
+    def _write_checkpoint(checkpoint_path: str, state: Dict) -> None:
+        # Written aside and renamed, so a crash never leaves a half-written checkpoint
+        with open(checkpoint_path + ".tmp", "w", encoding="utf-8") as checkpoint_file:
+            json.dump(state, checkpoint_file)
+        os.replace(checkpoint_path + ".tmp", checkpoint_path)
+
+    @staticmethod
+    def _print_progress(action: str, orders: int, started: float, done: bool = False) -> None:
+        rate = orders / max(time.monotonic() - started, 1e-9)
+        print(f"  {action} {orders:,} orders ({rate:,.0f} orders/s)", end="\n" if done else "\r", flush=True)
+
+    def get_customer_summary(self, customer_name: str) -> Optional[Dict]:
+        """Visits, lifetime spend, first and last visit and favourite item of a customer, read from their running totals.
+
+        Any spelling of the name that normalizes alike finds the customer; returns None for
+        an unknown customer or when the database cannot be read.
+        """
+        try:
+            rows = self.db.fetch_statement("customer_summary", (normalize_customer_name(customer_name),))
+        except DB_ERRORS as e:
+            print(f"Error fetching customer summary: {e}")
+            return None
+        if not rows:
+            return None
+        customer_id, name, visits, lifetime_spend, first_visit, last_visit, favourite_item, favourite_quantity = rows[0]
+        lifetime_spend = to_money(lifetime_spend)
+        return {
+            'customer_id': int(customer_id),
+            'name': name,
+            'visits': int(visits),
+            'lifetime_spend': lifetime_spend,
+            'average_spend': to_money(lifetime_spend / visits) if visits else ZERO_RUPEES,
+            'first_visit': first_visit,
+            'last_visit': last_visit,
+            'favourite_item': favourite_item,
+            'favourite_item_quantity': int(favourite_quantity) if favourite_item is not None else 0
+        }
+
+    def get_customer_orders(self, customer_name: str, limit: Optional[int] = None,
+                            before: Optional[Tuple[datetime.datetime, int]] = None) -> List[Dict]:
+        """Get order history for the given customer, newest first, in a single query.
+
+        Orders are found through the customer they are linked to, so every spelling of the
+        name that normalizes alike gives the same history. Pass limit to fetch one page; pass
+        the (order_time, order_id) of the last order of the previous page as before to fetch
+        the page after it.
+        """
+        return list(self.iter_customer_orders(customer_name, limit, before))
+
+    def iter_customer_orders(self, customer_name: str, limit: Optional[int] = None,
+                             before: Optional[Tuple[datetime.datetime, int]] = None) -> Iterator[Dict]:
+        """Yield the same order summaries as get_customer_orders one at a time, streaming the rows behind them."""
+        conditions = ["customer_id = (SELECT id FROM customers WHERE name_key = %s)"]
+        params = [normalize_customer_name(customer_name)]
+        if before is not None:
+            # Keyset pagination: continue strictly after the last order already shown
+            conditions.append("(order_time < %s OR (order_time = %s AND id < %s))")
+            params.extend([before[0], before[0], before[1]])
+        limit_clause = ""
+        if limit is not None:
+            limit_clause = "LIMIT %s"
+            params.append(limit)
+
+        history_query = f"""
+            SELECT o.id, o.table_number, o.order_time, o.subtotal, o.cgst, o.sgst, o.total,
+                   i.item_name, i.quantity, i.unit_price, i.total_price
+            FROM (
+                SELECT id, table_number, order_time, subtotal, cgst, sgst, total
+                FROM orders
+                WHERE {" AND ".join(conditions)}
+                ORDER BY order_time DESC, id DESC
+                {limit_clause}
+            ) AS o
+            LEFT JOIN order_items i ON i.order_id = o.id
+            ORDER BY o.order_time DESC, o.id DESC, i.id
+        """
+        rows = self.db.stream(history_query, tuple(params), row_mode="namedtuple")
+
+        # Rows arrive grouped by order; fold each run of rows into one summary
+        for _, order_rows in itertools.groupby(rows, key=lambda row: row.id):
+            first = next(order_rows)
+            summary = {
+                'order_id': int(first.id),
+                'order_time': first.order_time,
+                'date': first.order_time.strftime('%Y-%m-%d'),
+                'table': int(first.table_number) if first.table_number is not None else None,  # NULL for takeaway imports
+                'items': [],
+                'subtotal': to_money(first.subtotal),
+                'cgst_amount': to_money(first.cgst),
+                'sgst_amount': to_money(first.sgst),
+                'total_with_gst': to_money(first.total)
+            }
+            for row in itertools.chain((first,), order_rows):
+                if row.item_name is not None:
+                    summary['items'].append({
+                        'name': row.item_name,
+                        'quantity': int(row.quantity),
+                        'price': to_money(row.unit_price),
+                        'total': to_money(row.total_price)
+                    })
+            yield summary
+
+    def generate_bill(self, order: Order) -> str:
+        """Generate a formatted bill string for the order."""
+        order_id_text = f"{order.provisional_id} (provisional)" if order.id is None and order.provisional_id else order.id
+        lines = [
+            f"-------- CHAICOFFEE.COM --------",
+            f"Order ID: {order_id_text}",
+            f"Customer Name: {order.customer_name}",
+            f"Table Number: {order.table_number}",
+            f"Order Time: {order.order_time.strftime('%Y-%m-%d %H:%M:%S') if order.order_time else 'N/A'}",
+            f"Payment Method: {order.payment_method}",
+            f"Status: {order.status}",
+            "",
+            f"Items:"
+        ]
+
+        line_totals = [] # Recalculate from order items, exactly as the order was priced
+        for item in order.items:
+            line_total = self.money.line_total(item.price, item.quantity)
+            lines.append(f"- {item.name} x{item.quantity} @ ₹{item.price:.2f} = ₹{line_total:.2f}")
+            line_totals.append(line_total)
+        totals = self.money.bill_totals(line_totals)
 
         lines.extend([
             "",
-            f"Subtotal (before GST): ₹{subtotal:.2f}",
-            f"CGST @ {self.CGST_RATE}%: ₹{cgst:.2f}",
-            f"SGST @ {self.SGST_RATE}%: ₹{sgst:.2f}",
-            f"Total Amount (including GST): ₹{total:.2f}",
+            f"Subtotal (before GST): ₹{totals.subtotal:.2f}",
+            f"CGST @ {self.CGST_RATE}%: ₹{totals.cgst:.2f}",
+            f"SGST @ {self.SGST_RATE}%: ₹{totals.sgst:.2f}",
+            f"Total Amount (including GST): ₹{totals.total:.2f}",
             "-"*30
         ])
 
         return "\n".join(lines)
 
+class AsyncCafeBillingSystem:
+    """asyncio version of the CafeBillingSystem calls a service needs.
+
+    Neither mysql-connector-python nor sqlite3 has an async driver, so each call runs the
+    blocking method on a bounded thread pool and awaits it: any number of requests can be
+    in flight on one event loop while at most `workers` threads touch the database.
+    Independent calls run concurrently when awaited together, as in
+        history, report = await asyncio.gather(cafe.get_customer_orders(name), cafe.get_daily_sales_report(day))
+    Every call takes a timeout in seconds (the instance's default if None) and raises
+    asyncio.TimeoutError when it passes. A call cancelled or timed out before a worker
+    picks it up never runs; one already running finishes in its thread and its result is
+    dropped, so an order may still be saved. Retry such an order with the same
+    idempotency_key: it is not saved twice, and the retry returns the order as first saved.
+    """
+    CGST_RATE = CafeBillingSystem.CGST_RATE
+    SGST_RATE = CafeBillingSystem.SGST_RATE
+    money = CafeBillingSystem.money
+    generate_bill = CafeBillingSystem.generate_bill  # Pure formatting; needs no await
+
+    def __init__(self, system: Optional[CafeBillingSystem] = None, workers: Optional[int] = None,
+                 timeout: Optional[float] = None) -> None:
+        """Wraps system, or a CafeBillingSystem of its own; workers and timeout default to ASYNC_CONFIG."""
+        self.system = system if system is not None else CafeBillingSystem()
+        self._owns_system = system is None
+        self.timeout = timeout if timeout is not None else ASYNC_CONFIG['timeout']
+        self._executor = ThreadPoolExecutor(max_workers=workers or ASYNC_CONFIG['workers'], thread_name_prefix="cafe-async")
+
+    async def _call(self, timeout: Optional[float], method: Callable, *args):
+        call = asyncio.get_running_loop().run_in_executor(self._executor, functools.partial(method, *args))
+        return await asyncio.wait_for(call, self.timeout if timeout is None else timeout)
+
+    async def get_menu_items(self, timeout: Optional[float] = None) -> List[MenuItem]:
+        return await self._call(timeout, self.system.get_menu_items)
+
+    async def create_order(self, order: Order, verify: bool = False, timeout: Optional[float] = None) -> Optional[Order]:
+        """Creates the order as CafeBillingSystem.create_order does; returns it as saved, or None."""
+        return await self._call(timeout, self.system.create_order, order, verify)
+
+    async def get_order(self, order_id: int, timeout: Optional[float] = None) -> Optional[Order]:
+        return await self._call(timeout, self.system.get_order, order_id)
+
+    async def get_daily_sales_report(self, date: datetime.date, timeout: Optional[float] = None) -> Dict:
+        return await self._call(timeout, self.system.get_daily_sales_report, date)
+
+    async def get_customer_orders(self, customer_name: str, limit: Optional[int] = None,
+                                  before: Optional[Tuple[datetime.datetime, int]] = None,
+                                  timeout: Optional[float] = None) -> List[Dict]:
+        return await self._call(timeout, self.system.get_customer_orders, customer_name, limit, before)
+
+    async def get_customer_summary(self, customer_name: str, timeout: Optional[float] = None) -> Optional[Dict]:
+        return await self._call(timeout, self.system.get_customer_summary, customer_name)
+
+    async def close(self) -> None:
+        """Waits for running calls, drops queued ones, and closes the system if this facade opened it."""
+        await asyncio.get_running_loop().run_in_executor(None, functools.partial(self._executor.shutdown, cancel_futures=True))
+        if self._owns_system:
+            self.system.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chaicoffee Cafe billing system maintenance commands.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    rebuild_parser = commands.add_parser("rebuild-daily-sales", help="Recompute the daily_sales rollup from raw orders.")
+    check_parser = commands.add_parser("check-daily-sales", help="Report days where daily_sales disagrees with raw orders.")
+    totals_parser = commands.add_parser("check-order-totals", help="Report orders whose stored taxes or total are not what their subtotal gives.")
+    export_parser = commands.add_parser("export-orders", help="Stream orders and their items to a CSV or JSON Lines file.")
+    import_parser = commands.add_parser("import-orders", help="Load orders from a CSV or JSON Lines file in chunked transactions.")
+    commands.add_parser("rebuild-customers", help="Link orders to customers and recompute every customer's running totals.")
+    stats_parser = commands.add_parser("query-stats", help="Show the slowest statements from a saved query stats dump.")
+    stats_parser.add_argument("path", nargs="?", default=QUERY_STATS_CONFIG['dump_path'], help="Dump to read (default: %(default)s).")
+    stats_parser.add_argument("--limit", type=int, default=20, help="Statements to show (default: %(default)s).")
+    parser.add_argument("--query-stats", action="store_true", help="Print per-statement timings when the command finishes.")
+    for command_parser in (rebuild_parser, check_parser, totals_parser, export_parser):
+        command_parser.add_argument("--from", dest="start", type=datetime.date.fromisoformat, help="First day (YYYY-MM-DD).")
+        command_parser.add_argument("--to", dest="end", type=datetime.date.fromisoformat, help="Last day (YYYY-MM-DD).")
+    for command_parser in (export_parser, import_parser):
+        command_parser.add_argument("path", help="File to write or read (.csv or .jsonl).")
+        command_parser.add_argument("--format", choices=("csv", "jsonl"), help="File format, if not clear from the extension.")
+        command_parser.add_argument("--restart", action="store_true", help="Ignore any checkpoint and start from the beginning.")
+    args = parser.parse_args()
+
+    if args.command == "query-stats":
+        try:
+            with open(args.path, encoding="utf-8") as dump_file:
+                print(QueryStats.format_report(json.load(dump_file), args.limit))
+        except (OSError, ValueError) as e:
+            print(f"Error reading query stats: {e}")
+            sys.exit(1)
+        return
+
+    system = CafeBillingSystem()
+    try:
+        if args.command == "rebuild-daily-sales":
+            rows = system.rebuild_daily_sales(args.start, args.end)
+            print(f"Rebuilt daily_sales: {rows} rows written.")
+        elif args.command == "rebuild-customers":
+            customers = system.rebuild_customers()
+            print(f"Rebuilt customer totals: {customers} customers.")
+        elif args.command == "check-daily-sales":
+            mismatches = system.check_daily_sales(args.start, args.end)
+            for mismatch in mismatches:
+                print(f"{mismatch['date']} [{mismatch['payment_method'] or '-'}] orders={mismatch['orders']} daily_sales={mismatch['daily_sales']}")
+            print(f"{len(mismatches)} mismatched day(s) found.")
+            if mismatches:
+                sys.exit(1)
+        elif args.command == "check-order-totals":
+            mismatches = system.check_order_totals(args.start, args.end)
+            for mismatch in mismatches:
+                print(f"order {mismatch['order_id']}: stored={mismatch['stored']} expected={mismatch['expected']}")
+            print(f"{len(mismatches)} order(s) with drifted totals found.")
+            if mismatches:
+                sys.exit(1)
+        elif args.command == "export-orders":
+            orders = system.export_orders(args.path, args.format, args.start, args.end, resume=not args.restart)
+            print(f"Exported {orders} order(s) to {args.path}.")
+        elif args.command == "import-orders":
+            orders = system.import_orders(args.path, args.format, resume=not args.restart)
+            print(f"Imported {orders} new order(s) from {args.path}.")
+        if args.query_stats:
+            print(system.db.query_stats.report())
+    finally:
+        system.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,61 @@
 import datetime
+import queue
 import tkinter as tk
+from concurrent.futures import Future, ThreadPoolExecutor
 from tkinter import ttk, messagebox
 from tkinter.font import Font
-from typing import List
-from cafe import CafeBillingSystem, OrderItem, Order, MenuItem # Import necessary classes from cafe.py
+from typing import Callable, Dict, List, Optional
+from decimal import Decimal
+from cafe import SERVER_CONFIG, ZERO_RUPEES, BillTotals, CafeBillingSystem, MoneyEngine, OrderItem, Order, MenuItem, to_money # Import necessary classes from cafe.py
+from cafe_server import CafeClient
+
+class OrderDraft:
+    """The order being entered: one line per menu item, kept in the order items were first added.
+
+    Adding, changing and removing a line are O(1), and the running subtotal means the
+    bill totals never have to be summed again from every line.
+    """
+
+    def __init__(self, money: MoneyEngine):
+        self.money = money
+        self.lines: Dict[int, OrderItem] = {}  # Keyed by item id
+        self.subtotal: Decimal = ZERO_RUPEES
+
+    def __len__(self) -> int:
+        return len(self.lines)
+
+    def add(self, menu_item: MenuItem, quantity: int) -> OrderItem:
+        """Adds quantity of the item, to its existing line if it has one; returns the line."""
+        line = self.lines.get(menu_item.id)
+        if line is None:
+            line = self.lines[menu_item.id] = OrderItem(item_id=menu_item.id, quantity=0, price=menu_item.price, name=menu_item.name)
+        line.quantity += quantity
+        self.subtotal += self.money.line_total(line.price, quantity)
+        return line
+
+    def remove(self, item_id: int) -> Optional[OrderItem]:
+        line = self.lines.pop(item_id, None)
+        if line is not None:
+            self.subtotal -= self.money.line_total(line.price, line.quantity)
+        return line
+
+    def clear(self) -> None:
+        self.lines.clear()
+        self.subtotal = ZERO_RUPEES
+
+    def totals(self) -> BillTotals:
+        return self.money.bill_totals((self.subtotal,))
+
+    def items(self) -> List[OrderItem]:
+        """Copies of the lines, so edits to the draft cannot change an order already handed off."""
+        return [OrderItem(item_id=line.item_id, quantity=line.quantity, price=line.price, name=line.name)
+                for line in self.lines.values()]
 
 class CafeBillingGUI:
+    HISTORY_PAGE_SIZE = 20  # Orders fetched per page in the Customer History view
+    BACKGROUND_WORKERS = 4  # Threads running database calls off the Tk event loop
+    POLL_INTERVAL_MS = 50   # How often finished background calls are handed back to the UI
+
     def __init__(self, root: tk.Tk):
         self.root = root
         self.root.title("Cafe Billing System")
@@ -13,9 +63,12 @@ class CafeBillingGUI:
         self.root.configure(bg="#f5f7fa")
         self.root.minsize(900, 650)
 
-        # Initialize billing system logic (now connected to MySQL)
+        # Initialize billing system logic: MySQL directly, or through a shared cafe_server.py
         try:
-            self.system = CafeBillingSystem()
+            if SERVER_CONFIG['use_server']:
+                self.system = CafeClient(SERVER_CONFIG['host'], SERVER_CONFIG['port'], SERVER_CONFIG['timeout'])
+            else:
+                self.system = CafeBillingSystem()
         except ConnectionError as e:
             messagebox.showerror("Database Connection Error", str(e))
             self.root.quit() # Use quit to properly close the window
@@ -56,13 +109,24 @@ class CafeBillingGUI:
         self.section_font = Font(family="Poppins", size=18, weight="bold")
         self.normal_font = Font(family="Poppins", size=13)
 
+        # Database calls run on worker threads; results come back through this queue
+        self.executor = ThreadPoolExecutor(max_workers=self.BACKGROUND_WORKERS, thread_name_prefix="cafe-gui-db")
+        self.background_results = queue.Queue()
+        self.pending_requests: Dict[str, Future] = {}
+        self.request_generations: Dict[str, int] = {}
+        self.current_view = None
+
         # Create UI components
         self.create_header()
         self.create_navbar()
         self.create_main_area()
+        self.root.after(self.POLL_INTERVAL_MS, self.poll_background_results)
 
-        # Internal state for place order
-        self.current_order_items: List[OrderItem] = []
+        # Internal state for place order; its frame is built on first use and kept, not rebuilt
+        self.order_draft = OrderDraft(self.system.money)
+        self.new_order_frame: Optional[ttk.Frame] = None
+        self.menu_items: List[MenuItem] = []
+        self.menu_item_strs: List[str] = []
 
         # Show default view
         self.show_new_order_view()
@@ -73,6 +137,14 @@ class CafeBillingGUI:
         header_label = ttk.Label(header_frame, text="Chaicoffee Cafe Billing System", style="Header.TLabel")
         header_label.pack(side="left", anchor="w")
 
+        # Busy indicator, shown only while background requests are in flight
+        self.busy_frame = ttk.Frame(header_frame, style="TFrame")
+        self.busy_progress = ttk.Progressbar(self.busy_frame, mode="indeterminate", length=120)
+        self.busy_progress.pack(side="left", padx=(0,8))
+        ttk.Label(self.busy_frame, text="Working...", font=("Poppins", 12)).pack(side="left", padx=(0,8))
+        ttk.Button(self.busy_frame, text="Cancel", style="Danger.TButton",
+                   command=lambda: self.cancel_background_requests(keep=("submit_order",))).pack(side="left")
+
     def create_navbar(self):
         nav_frame = ttk.Frame(self.root, style="TFrame")
         nav_frame.pack(fill="x", padx=30, pady=(0,20))
@@ -82,6 +154,7 @@ class CafeBillingGUI:
             ("View Order", self.show_view_order_view),
             ("Daily Sales Report", self.show_daily_sales_report_view),
             ("Customer History", self.show_customer_history_view),
+            ("Analytics", self.show_analytics_view),
             ("Exit", self.root.quit),
         ]
 
@@ -94,20 +167,103 @@ class CafeBillingGUI:
         self.main_frame.pack(fill="both", expand=True, padx=30, pady=10)
 
     def clear_main_area(self):
+        # Results for the view being torn down have nowhere to go; an in-flight order still completes
+        self.cancel_background_requests(keep=("submit_order",))
         for widget in self.main_frame.winfo_children():
-            widget.destroy()
+            if widget is self.new_order_frame:
+                widget.pack_forget() # Kept for the next visit to Place New Order
+            else:
+                widget.destroy()
+
+    ##############################################################################
+    # ------------------------ BACKGROUND REQUESTS ------------------------------
+    ##############################################################################
+    def run_in_background(self, key: str, func: Callable, *args, on_done: Callable,
+                          on_error: Optional[Callable] = None):
+        """Runs func(*args) on a worker thread and passes its result to on_done on the Tk thread.
+
+        Starting another request with the same key, or cancelling it, makes the older
+        result stale; stale results are dropped instead of being delivered.
+        """
+        generation = self.request_generations.get(key, 0) + 1
+        self.request_generations[key] = generation
+        previous = self.pending_requests.get(key)
+        if previous:
+            previous.cancel()
+        future = self.executor.submit(func, *args)
+        self.pending_requests[key] = future
+        future.add_done_callback(
+            lambda done: self.background_results.put((key, generation, done, on_done, on_error))
+        )
+        self.update_busy_indicator()
+
+    def cancel_background_requests(self, keep=()):
+        for key in list(self.pending_requests):
+            if key in keep:
+                continue
+            self.pending_requests.pop(key).cancel()
+            self.request_generations[key] = self.request_generations.get(key, 0) + 1
+        self.update_busy_indicator()
+
+    def poll_background_results(self):
+        try:
+            while True:
+                key, generation, future, on_done, on_error = self.background_results.get_nowait()
+                if self.request_generations.get(key) != generation or future.cancelled():
+                    continue # Superseded or cancelled
+                self.pending_requests.pop(key, None)
+                try:
+                    error = future.exception()
+                    if error is not None:
+                        (on_error or self.show_background_error)(error)
+                    else:
+                        on_done(future.result())
+                except Exception as e:
+                    self.show_background_error(e)
+        except queue.Empty:
+            pass
+        self.update_busy_indicator()
+        self.root.after(self.POLL_INTERVAL_MS, self.poll_background_results)
+
+    def update_busy_indicator(self):
+        if self.pending_requests and not self.busy_frame.winfo_ismapped():
+            self.busy_frame.pack(side="right")
+            self.busy_progress.start(12)
+        elif not self.pending_requests and self.busy_frame.winfo_ismapped():
+            self.busy_progress.stop()
+            self.busy_frame.pack_forget()
+
+    def show_background_error(self, error: Exception):
+        messagebox.showerror("Database Error", f"The request failed: {error}")
 
     ##############################################################################
     # ------------------------ PLACE NEW ORDER VIEW -----------------------------
     ##############################################################################
     def show_new_order_view(self):
         self.clear_main_area()
-        self.current_order_items.clear()
-
-        title = ttk.Label(self.main_frame, text="Place New Order", style="Section.TLabel")
+        self.current_view = "new_order"
+        if self.new_order_frame is None:
+            self.build_new_order_frame()
+        else:
+            self.reset_new_order_form()
+            self.save_status_var.set("")
+        self.new_order_frame.pack(fill="both", expand=True)
+        if "submit_order" in self.pending_requests:
+            self.place_order_btn.state(["disabled"]) # Still waiting on the previous order
+        else:
+            self.place_order_btn.state(["!disabled"])
+        # The menu may have changed since the last visit; the cache makes this cheap when it has not
+        self.run_in_background("menu", self.system.get_menu_items, on_done=self.on_menu_loaded)
+        self.customer_entry.focus_set()
+
+    def build_new_order_frame(self):
+        """Builds the Place New Order widgets once; later visits reset and re-show them."""
+        self.new_order_frame = ttk.Frame(self.main_frame, style="TFrame")
+
+        title = ttk.Label(self.new_order_frame, text="Place New Order", style="Section.TLabel")
         title.pack(anchor="w", pady=(0,20))
 
-        container = ttk.Frame(self.main_frame, style="TFrame")
+        container = ttk.Frame(self.new_order_frame, style="TFrame")
         container.pack(fill="both", expand=True)
 
         # Left side frame: Customer info & add item
@@ -120,8 +276,8 @@ class CafeBillingGUI:
 
         ttk.Label(left_frame, text="Customer Name:", font=self.normal_font, background="#ffffff").pack(anchor="w", pady=(8,4))
         self.customer_name_var = tk.StringVar()
-        customer_entry = ttk.Entry(left_frame, textvariable=self.customer_name_var, font=self.normal_font, width=30)
-        customer_entry.pack(anchor="w")
+        self.customer_entry = ttk.Entry(left_frame, textvariable=self.customer_name_var, font=self.normal_font, width=30)
+        self.customer_entry.pack(anchor="w")
 
         ttk.Label(left_frame, text="Table Number:", font=self.normal_font, background="#ffffff").pack(anchor="w", pady=(12,4))
         self.table_number_var = tk.StringVar()
@@ -136,17 +292,12 @@ class CafeBillingGUI:
         add_item_lbl.pack(anchor="w", pady=(0,12))
 
         ttk.Label(left_frame, text="Select Item:", font=self.normal_font, background="#ffffff").pack(anchor="w", pady=2)
-        # Fetch menu items from the MySQL database
-        self.menu_items = self.system.get_menu_items()
-        self.menu_item_strs = [f"{item.id} - {item.name} - ₹{item.price:.2f}" for item in self.menu_items]
-
-        self.selected_item_var = tk.StringVar()
+        # Menu items are fetched in the background and filled in when they arrive
+        self.selected_item_var = tk.StringVar(value="Loading menu...")
         self.selected_item_combo = ttk.Combobox(left_frame, textvariable=self.selected_item_var,
                                                 values=self.menu_item_strs, font=self.normal_font, width=30,
-                                                state="readonly")
+                                                state="disabled")
         self.selected_item_combo.pack(anchor="w")
-        if self.menu_item_strs:
-            self.selected_item_combo.current(0) # Select the first item by default
 
         ttk.Label(left_frame, text="Quantity:", font=self.normal_font, background="#ffffff").pack(anchor="w", pady=6)
         self.quantity_var = tk.IntVar(value=1)
@@ -210,22 +361,29 @@ class CafeBillingGUI:
 
         
         # Submit order button
-        place_order_btn = ttk.Button(right_frame, text="Submit Order", command=self.submit_order)
-        place_order_btn.pack(pady=15, anchor="center", ipadx=30)
+        self.place_order_btn = ttk.Button(right_frame, text="Submit Order", command=self.submit_order)
+        self.place_order_btn.pack(pady=15, anchor="center", ipadx=30)
 
         # Info label for data save status
         self.save_status_var = tk.StringVar()
         save_status_label = ttk.Label(right_frame, textvariable=self.save_status_var, font=("Poppins", 12), foreground="#16a34a", background="#ffffff")
         save_status_label.pack(anchor="center")
 
-        # Focus on customer name entry
-        customer_entry.focus_set()
-
         self.update_order_summary_labels()
 
+    def on_menu_loaded(self, menu_items: List[MenuItem]):
+        if menu_items == self.menu_items and self.menu_item_strs:
+            return # Unchanged; keep the current selection
+        self.menu_items = menu_items
+        self.menu_item_strs = [f"{item.id} - {item.name} - ₹{item.price:.2f}" for item in self.menu_items]
+        self.selected_item_combo.configure(values=self.menu_item_strs, state="readonly")
+        self.selected_item_var.set("")
+        if self.menu_item_strs:
+            self.selected_item_combo.current(0) # Select the first item by default
+
     def add_item_to_order(self):
-        sel = self.selected_item_var.get()
-        if not sel:
+        index = self.selected_item_combo.current() # Position in menu_items, so no search is needed
+        if index < 0 or index >= len(self.menu_items):
             messagebox.showwarning("Input Error", "Please select an item to add.")
             return
         try:
@@ -236,63 +394,37 @@ class CafeBillingGUI:
             messagebox.showwarning("Input Error", "Quantity must be at least 1.")
             return
 
-        # Extract item_id from "id - name - price"
-        try:
-            item_id = int(sel.split(" - ")[0])
-        except Exception:
-            messagebox.showerror("Error", "Invalid menu item selection.")
-            return
-
-        menu_item = next((i for i in self.menu_items if i.id == item_id), None)
-        if not menu_item:
-            messagebox.showerror("Error", "Selected menu item not found.")
-            return
-
-        # Check if item already in order, update qty if so
-        found_existing = False
-        for oi in self.current_order_items:
-            if oi.item_id == item_id:
-                oi.quantity += quantity
-                found_existing = True
-                break
-        
-        if not found_existing:
-            # Use the actual price and name from the fetched menu_item
-            new_order_item = OrderItem(item_id=item_id, quantity=quantity, price=menu_item.price, name=menu_item.name)
-            self.current_order_items.append(new_order_item)
-
-        self.refresh_order_tree()
+        # Adds to the item's line if it is already in the order, using the price and name from the menu
+        line = self.order_draft.add(self.menu_items[index], quantity)
+        self.show_order_line(line)
         self.update_order_summary_labels()
 
-    def refresh_order_tree(self):
-        for row in self.order_tree.get_children():
-            self.order_tree.delete(row)
-
-        for idx, item in enumerate(self.current_order_items):
-            total_price = item.price * item.quantity
-            self.order_tree.insert("", "end", iid=str(idx),
-                                   values=(item.name, item.quantity, f"₹{item.price:.2f}", f"₹{total_price:.2f}"))
+    def show_order_line(self, line: OrderItem):
+        """Inserts or updates the one Treeview row for this line; rows are keyed by item id."""
+        iid = str(line.item_id)
+        total_price = self.system.money.line_total(line.price, line.quantity)
+        values = (line.name, line.quantity, f"₹{line.price:.2f}", f"₹{total_price:.2f}")
+        if self.order_tree.exists(iid):
+            self.order_tree.item(iid, values=values)
+        else:
+            self.order_tree.insert("", "end", iid=iid, values=values)
 
     def update_order_summary_labels(self):
-        subtotal = sum(item.price * item.quantity for item in self.current_order_items)
-        cgst = subtotal * (self.system.CGST_RATE / 100)
-        sgst = subtotal * (self.system.SGST_RATE / 100)
-        total = subtotal + cgst + sgst
+        totals = self.order_draft.totals()
 
-        self.subtotal_label.config(text=f"Subtotal: ₹{subtotal:.2f}")
-        self.cgst_label.config(text=f"CGST @ {self.system.CGST_RATE}%: ₹{cgst:.2f}")
-        self.sgst_label.config(text=f"SGST @ {self.system.SGST_RATE}%: ₹{sgst:.2f}")
-        self.total_label.config(text=f"Total Amount: ₹{total:.2f}")
+        self.subtotal_label.config(text=f"Subtotal: ₹{totals.subtotal:.2f}")
+        self.cgst_label.config(text=f"CGST @ {self.system.CGST_RATE}%: ₹{totals.cgst:.2f}")
+        self.sgst_label.config(text=f"SGST @ {self.system.SGST_RATE}%: ₹{totals.sgst:.2f}")
+        self.total_label.config(text=f"Total Amount: ₹{totals.total:.2f}")
 
     def remove_selected_order_item(self):
         selected = self.order_tree.selection()
         if not selected:
             messagebox.showwarning("Selection Error", "Select an item to remove from order.")
             return
-        idx = int(selected[0]) # Get the iid which is the index
-        if 0 <= idx < len(self.current_order_items):
-            del self.current_order_items[idx]
-            self.refresh_order_tree()
+        iid = selected[0] # The iid is the item id
+        if self.order_draft.remove(int(iid)) is not None:
+            self.order_tree.delete(iid)
             self.update_order_summary_labels()
 
     def submit_order(self):
@@ -312,44 +444,74 @@ class CafeBillingGUI:
             messagebox.showwarning("Input Error", "Table number must be a positive integer.")
             return
 
-        if not self.current_order_items:
+        if not self.order_draft:
             messagebox.showwarning("Input Error", "The order must have at least one item.")
             return
 
+        if "submit_order" in self.pending_requests:
+            return # An order is already being saved; ignore the double click
+
+        # The worker gets its own copy so further edits to the form cannot change it
         order = Order(
             customer_name=customer_name,
             table_number=table_number,
-            items=self.current_order_items,
+            items=self.order_draft.items(),
             payment_method=payment_method
         )
 
-        order_id = self.system.create_order(order)
-        if order_id == -1:
-            messagebox.showerror("Error", "Failed to create order. Please try again. Check console for details.")
-            self.save_status_var.set("Order creation failed.")
-            return
+        self.place_order_btn.state(["disabled"])
+        self.save_status_var.set("Saving order...")
+        # create_order returns the saved order, so verification and the bill need no extra reads
+        self.run_in_background("submit_order", self.system.create_order, order, True,
+                               on_done=self.on_order_submitted, on_error=self.on_order_submit_failed)
 
-        # Verification of data saved will now involve querying MySQL
-        try:
-            # Attempt to retrieve the order just created
-            verified_order = self.system.get_order(order_id)
-            if verified_order and len(verified_order.items) == len(self.current_order_items):
-                self.save_status_var.set(f"Order #{order_id} saved successfully with {len(self.current_order_items)} items.")
-            else:
-                self.save_status_var.set(f"Order saved, but verification failed. Order ID: {order_id}")
-        except Exception as e:
-            self.save_status_var.set(f"Could not verify saved data: {e}")
+    def on_order_submitted(self, saved_order: Optional[Order]):
+        on_order_view = self.current_view == "new_order"
+        if on_order_view:
+            self.place_order_btn.state(["!disabled"])
 
+        if saved_order is None:
+            messagebox.showerror("Error", "Failed to create order. Please try again. Check console for details.")
+            if on_order_view:
+                self.save_status_var.set("Order creation failed.")
+            return
 
-        created_order = self.system.get_order(order_id)
-        bill_text = self.system.generate_bill(created_order) if created_order else "Error fetching order details."
-        # Show detailed bill in messagebox
-        messagebox.showinfo("Order Created",
-                            f"Order #{order_id} created successfully!\n\nPayment Status: completed\nPayment Method: {payment_method}\n\n"
-                            f"{bill_text}")
+        bill_text = self.system.generate_bill(saved_order)
+        if saved_order.id is None:
+            # The database is unreachable; the order is safe in the offline queue and is billed as priced locally
+            messagebox.showinfo("Order Queued",
+                                f"Database unavailable. Order saved offline as {saved_order.provisional_id} and will be "
+                                f"synced automatically.\n\nPayment Method: {saved_order.payment_method}\n\n"
+                                f"{bill_text}")
+        else:
+            if on_order_view:
+                self.save_status_var.set(f"Order #{saved_order.id} saved successfully with {len(saved_order.items)} items.")
+            # Show detailed bill in messagebox
+            messagebox.showinfo("Order Created",
+                                f"Order #{saved_order.id} created successfully!\n\nPayment Status: {saved_order.status}\n"
+                                f"Payment Method: {saved_order.payment_method}\n\n{bill_text}")
 
         # Reset form after order
-        self.show_new_order_view()
+        if on_order_view:
+            self.reset_new_order_form()
+
+    def reset_new_order_form(self):
+        """Clears the order form for the next customer without rebuilding it or re-reading the menu."""
+        self.order_draft.clear()
+        self.customer_name_var.set("")
+        self.table_number_var.set("")
+        self.quantity_var.set(1)
+        self.payment_method_var.set("cash")
+        if self.menu_item_strs:
+            self.selected_item_combo.current(0)
+        self.order_tree.delete(*self.order_tree.get_children())
+        self.update_order_summary_labels()
+
+    def on_order_submit_failed(self, error: Exception):
+        if self.current_view == "new_order":
+            self.place_order_btn.state(["!disabled"])
+            self.save_status_var.set("Order creation failed.")
+        messagebox.showerror("Error", f"Failed to create order: {error}")
 
 
     ##############################################################################
@@ -357,6 +519,7 @@ class CafeBillingGUI:
     ##############################################################################
     def show_view_order_view(self):
         self.clear_main_area()
+        self.current_view = "view_order"
 
         title = ttk.Label(self.main_frame, text="View Order By ID", style="Section.TLabel")
         title.pack(anchor="w", pady=(0,20))
@@ -391,7 +554,12 @@ class CafeBillingGUI:
             self.order_text.delete("1.0", tk.END)
             return
         order_id = int(order_id_str)
-        order = self.system.get_order(order_id)
+        self.order_text.delete("1.0", tk.END)
+        self.order_text.insert(tk.END, "Loading...")
+        self.run_in_background("view_order", self.system.get_order, order_id,
+                               on_done=lambda order: self.render_order_bill(order_id, order))
+
+    def render_order_bill(self, order_id: int, order: Optional[Order]):
         if not order:
             messagebox.showinfo("Not Found", f"No order found with ID {order_id}.")
             self.order_text.delete("1.0", tk.END)
@@ -407,6 +575,7 @@ class CafeBillingGUI:
     ##############################################################################
     def show_daily_sales_report_view(self):
         self.clear_main_area()
+        self.current_view = "daily_report"
 
         title = ttk.Label(self.main_frame, text="Daily Sales Report", style="Section.TLabel")
         title.pack(anchor="w", pady=(0,20))
@@ -438,7 +607,13 @@ class CafeBillingGUI:
             messagebox.showwarning("Input Error", "Date must be in YYYY-MM-DD format.")
             return
 
-        report = self.system.get_daily_sales_report(date)
+        for widget in self.report_frame.winfo_children():
+            widget.destroy()
+        ttk.Label(self.report_frame, text="Loading report...", font=("Poppins", 14), background="#ffffff").pack(anchor="center")
+        self.run_in_background("daily_report", self.system.get_daily_sales_report, date,
+                               on_done=self.render_daily_sales_report)
+
+    def render_daily_sales_report(self, report: Dict):
         for widget in self.report_frame.winfo_children():
             widget.destroy()
 
@@ -452,6 +627,8 @@ class CafeBillingGUI:
             (f"Total GST ({self.system.CGST_RATE + self.system.SGST_RATE}%)", f"₹{report['total_gst']:.2f}"),
             ("Net Sales (Including GST)", f"₹{report['net_sales']:.2f}")
         ]
+        for method, method_total in sorted(report['payment_methods'].items()):
+            stats.append((f"{(method or 'Other').title()} Sales (Including GST)", f"₹{method_total:.2f}"))
 
         for label, value in stats:
             frame = ttk.Frame(self.report_frame, style="TFrame")
@@ -465,6 +642,7 @@ class CafeBillingGUI:
     ##############################################################################
     def show_customer_history_view(self):
         self.clear_main_area()
+        self.current_view = "customer_history"
 
         title = ttk.Label(self.main_frame, text="Customer Order History", style="Section.TLabel")
         title.pack(anchor="w", pady=(0,20))
@@ -476,20 +654,80 @@ class CafeBillingGUI:
         self.customer_history_var = tk.StringVar()
         customer_entry = ttk.Entry(form_frame, textvariable=self.customer_history_var, font=self.normal_font, width=30)
         customer_entry.grid(row=0, column=1, sticky="w", padx=5, pady=6)
+        customer_entry.bind("<KeyRelease>", self.on_customer_search_typed)
+        customer_entry.bind("<Return>", lambda event: self.view_customer_history())
+        customer_entry.bind("<Down>", lambda event: self.focus_customer_suggestions())
 
         view_btn = ttk.Button(form_frame, text="View History", command=self.view_customer_history)
         view_btn.grid(row=0, column=2, sticky="w", padx=10, pady=6)
 
+        # Type-ahead suggestions, shown under the entry while there are any
+        self.customer_suggestions = tk.Listbox(form_frame, height=6, width=30, font=self.normal_font, bg="#ffffff",
+                                               fg="#1e293b", activestyle="none", exportselection=False)
+        self.customer_suggestions.grid(row=1, column=1, sticky="w", padx=5)
+        self.customer_suggestions.grid_remove()
+        self.customer_suggestions.bind("<Return>", lambda event: self.choose_customer_suggestion())
+        self.customer_suggestions.bind("<Double-Button-1>", lambda event: self.choose_customer_suggestion())
+        self.customer_suggestions.bind("<Escape>", lambda event: self.hide_customer_suggestions(customer_entry))
+
+        # One line of running totals for the customer, above their orders
+        self.customer_summary_var = tk.StringVar()
+        ttk.Label(self.main_frame, textvariable=self.customer_summary_var, font=("Poppins", 13, "bold"),
+                  foreground="#334155", background="#f5f7fa").pack(anchor="w")
+
         # Scrollable text box for results
         self.customer_history_text = tk.Text(self.main_frame, wrap="word", height=28, width=105, font=("Poppins", 12),
                                              bg="#ffffff", fg="#1e293b", bd=1, relief="solid")
         self.customer_history_text.pack(pady=10, fill="both", expand=True)
 
-        # Scrollbar
-        scrollbar = ttk.Scrollbar(self.customer_history_text, command=self.customer_history_text.yview)
-        self.customer_history_text.config(yscrollcommand=scrollbar.set)
-        scrollbar.pack(side="right", fill="y")
+        # Scrollbar; scrolling near the bottom loads the next page of history
+        self.customer_history_scrollbar = ttk.Scrollbar(self.customer_history_text, command=self.customer_history_text.yview)
+        self.customer_history_text.config(yscrollcommand=self.on_customer_history_scroll)
+        self.customer_history_scrollbar.pack(side="right", fill="y")
+
+        # Pagination state for the customer being shown
+        self.history_customer_name = None
+        self.history_cursor = None
+        self.history_loading = False
+        self.history_load_scheduled = False
+
+        customer_entry.focus_set()
+        # Loads the search index now, so the first suggestions come back as fast as the rest
+        self.run_in_background("customer_search", self.system.search_customers, "",
+                               on_done=self.show_customer_suggestions)
+
+    def on_customer_search_typed(self, event):
+        if event.keysym in ("Return", "Down", "Up", "Escape", "Tab"):
+            return
+        self.run_in_background("customer_search", self.system.search_customers, self.customer_history_var.get(),
+                               on_done=self.show_customer_suggestions)
+
+    def show_customer_suggestions(self, names: List[str]):
+        self.customer_suggestions.delete(0, tk.END)
+        if not names:
+            self.customer_suggestions.grid_remove()
+            return
+        self.customer_suggestions.insert(tk.END, *names)
+        self.customer_suggestions.config(height=min(len(names), 6))
+        self.customer_suggestions.grid()
+
+    def focus_customer_suggestions(self):
+        if self.customer_suggestions.size():
+            self.customer_suggestions.focus_set()
+            self.customer_suggestions.selection_clear(0, tk.END)
+            self.customer_suggestions.selection_set(0)
+            self.customer_suggestions.activate(0)
+
+    def choose_customer_suggestion(self):
+        selection = self.customer_suggestions.curselection()
+        if not selection:
+            return
+        self.customer_history_var.set(self.customer_suggestions.get(selection[0]))
+        self.customer_suggestions.grid_remove()
+        self.view_customer_history()
 
+    def hide_customer_suggestions(self, customer_entry):
+        self.customer_suggestions.grid_remove()
         customer_entry.focus_set()
 
     def view_customer_history(self):
@@ -498,16 +736,50 @@ class CafeBillingGUI:
             messagebox.showwarning("Input Error", "Customer name cannot be empty.")
             return
 
-        orders = self.system.get_customer_orders(customer_name)
+        # A search still running would show its suggestions over the history
+        self.cancel_background_requests(keep=("submit_order", "customer_history"))
+        self.customer_suggestions.grid_remove()
         self.customer_history_text.delete("1.0", tk.END)
-
+        self.customer_summary_var.set("")
+        self.history_customer_name = customer_name
+        self.history_cursor = None
+        self.history_loading = False
+        self.run_in_background("customer_summary", self.system.get_customer_summary, customer_name,
+                               on_done=self.show_customer_summary)
+        self.load_more_customer_history()
+
+    def show_customer_summary(self, summary: Optional[Dict]):
+        if summary is None:
+            return
+        text = (f"{summary['name']}: {summary['visits']} visit(s), ₹{summary['lifetime_spend']:.2f} spent "
+                f"(₹{summary['average_spend']:.2f} per visit), last visit {summary['last_visit']:%Y-%m-%d}")
+        if summary['favourite_item']:
+            text += f", favourite {summary['favourite_item']} (x{summary['favourite_item_quantity']})"
+        self.customer_summary_var.set(text)
+
+    def load_more_customer_history(self):
+        """Fetches the next page of the current customer's history in the background."""
+        if self.history_loading or self.history_customer_name is None:
+            return
+        self.history_loading = True
+        self.run_in_background("customer_history", self.system.get_customer_orders, self.history_customer_name,
+                               self.HISTORY_PAGE_SIZE, self.history_cursor,
+                               on_done=self.append_customer_history, on_error=self.on_customer_history_failed)
+
+    def append_customer_history(self, orders: List[Dict]):
+        self.history_loading = False
+        first_page = self.history_cursor is None
+        if len(orders) < self.HISTORY_PAGE_SIZE:
+            self.history_customer_name = None # Last page reached
         if not orders:
-            self.customer_history_text.insert(tk.END, "No orders found for this customer.")
+            if first_page:
+                self.customer_history_text.insert(tk.END, "No orders found for this customer.")
             return
 
+        self.history_cursor = (orders[-1]['order_time'], orders[-1]['order_id'])
         for order in orders:
             self.customer_history_text.insert(tk.END, f"Order #{order['order_id']} - Date: {order['date']}\n")
-            self.customer_history_text.insert(tk.END, f"Table: {order['table']}\n\nItems:\n")
+            self.customer_history_text.insert(tk.END, f"Table: {order['table'] if order['table'] is not None else '-'}\n\nItems:\n")
             for item in order['items']:
                 line = f"- {item['name']} x{item['quantity']} @ ₹{item['price']:.2f} = ₹{item['total']:.2f}\n"
                 self.customer_history_text.insert(tk.END, line)
@@ -517,18 +789,145 @@ class CafeBillingGUI:
             self.customer_history_text.insert(tk.END, f"Total Amount (including GST): ₹{order['total_with_gst']:.2f}\n")
             self.customer_history_text.insert(tk.END, "-"*72 + "\n\n")
 
+    def on_customer_history_failed(self, error: Exception):
+        self.history_loading = False
+        self.show_background_error(error)
+
+    def on_customer_history_scroll(self, first, last):
+        self.customer_history_scrollbar.set(first, last)
+        # Fetch the next page once the user scrolls close to the end of what is loaded
+        if float(last) >= 0.95 and self.history_customer_name is not None and not self.history_load_scheduled:
+            self.history_load_scheduled = True
+            self.root.after_idle(self.load_more_customer_history_from_scroll)
+
+    def load_more_customer_history_from_scroll(self):
+        self.history_load_scheduled = False
+        self.load_more_customer_history()
+
+
+    ##############################################################################
+    # ------------------------ SALES ANALYTICS ----------------------------------
+    ##############################################################################
+    def show_analytics_view(self):
+        self.clear_main_area()
+        self.current_view = "analytics"
+
+        title = ttk.Label(self.main_frame, text="Sales Analytics", style="Section.TLabel")
+        title.pack(anchor="w", pady=(0,20))
+
+        form_frame = ttk.Frame(self.main_frame, style="TFrame")
+        form_frame.pack(pady=10, fill="x")
+
+        today = datetime.date.today()
+        ttk.Label(form_frame, text="From:", font=self.normal_font, background="#f5f7fa").grid(row=0, column=0, sticky="w", pady=6)
+        self.analytics_start_var = tk.StringVar(value=(today - datetime.timedelta(days=6)).isoformat())
+        ttk.Entry(form_frame, textvariable=self.analytics_start_var, font=self.normal_font, width=12).grid(row=0, column=1, sticky="w", padx=5, pady=6)
+
+        ttk.Label(form_frame, text="To:", font=self.normal_font, background="#f5f7fa").grid(row=0, column=2, sticky="w", padx=(10,0), pady=6)
+        self.analytics_end_var = tk.StringVar(value=today.isoformat())
+        ttk.Entry(form_frame, textvariable=self.analytics_end_var, font=self.normal_font, width=12).grid(row=0, column=3, sticky="w", padx=5, pady=6)
+
+        ttk.Label(form_frame, text="Group By:", font=self.normal_font, background="#f5f7fa").grid(row=0, column=4, sticky="w", padx=(10,0), pady=6)
+        self.analytics_group_var = tk.StringVar(value="day")
+        ttk.Combobox(form_frame, textvariable=self.analytics_group_var, values=list(self.system.ANALYTICS_DIMENSIONS),
+                     font=self.normal_font, width=14, state="readonly").grid(row=0, column=5, sticky="w", padx=5, pady=6)
+
+        view_btn = ttk.Button(form_frame, text="View Analytics", command=self.view_analytics)
+        view_btn.grid(row=0, column=6, sticky="w", padx=10, pady=6)
+
+        # Quick span presets
+        presets_frame = ttk.Frame(self.main_frame, style="TFrame")
+        presets_frame.pack(fill="x")
+        presets = [
+            ("Last 7 Days", today - datetime.timedelta(days=6), today),
+            ("This Month", today.replace(day=1), today),
+            ("Last 30 Days", today - datetime.timedelta(days=29), today),
+            ("Last 12 Months", today - datetime.timedelta(days=364), today),
+        ]
+        for text, start, end in presets:
+            ttk.Button(presets_frame, text=text, command=lambda s=start, e=end: self.set_analytics_span(s, e)).pack(side="left", padx=(0,12))
+
+        # Results table
+        table_frame = ttk.Frame(self.main_frame, style="Card.TFrame", padding=10)
+        table_frame.pack(fill="both", expand=True, pady=15)
+        self.analytics_tree = ttk.Treeview(table_frame, show="headings", selectmode="browse")
+        scrollbar = ttk.Scrollbar(table_frame, orient="vertical", command=self.analytics_tree.yview)
+        self.analytics_tree.configure(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side="right", fill="y")
+        self.analytics_tree.pack(fill="both", expand=True)
+
+        self.analytics_status_var = tk.StringVar()
+        ttk.Label(self.main_frame, textvariable=self.analytics_status_var, font=("Poppins", 12), background="#f5f7fa").pack(anchor="w")
+
+    def set_analytics_span(self, start: datetime.date, end: datetime.date):
+        self.analytics_start_var.set(start.isoformat())
+        self.analytics_end_var.set(end.isoformat())
+        self.view_analytics()
+
+    def view_analytics(self):
+        try:
+            start = datetime.date.fromisoformat(self.analytics_start_var.get().strip())
+            end = datetime.date.fromisoformat(self.analytics_end_var.get().strip())
+        except ValueError:
+            messagebox.showwarning("Input Error", "Dates must be in YYYY-MM-DD format.")
+            return
+        if start > end:
+            messagebox.showwarning("Input Error", "The start date must not be after the end date.")
+            return
+
+        self.analytics_status_var.set("Loading...")
+        self.run_in_background("analytics", self.fetch_analytics, start, end, self.analytics_group_var.get(),
+                               on_done=lambda result: self.render_analytics(start, end, result))
+
+    def fetch_analytics(self, start: datetime.date, end: datetime.date, group_by: str):
+        """Runs on a worker thread: drains the aggregated rows so the Tk thread only renders them."""
+        columns, rows = self.system.get_sales_analytics(start, end, group_by)
+        return columns, list(rows)
+
+    def render_analytics(self, start: datetime.date, end: datetime.date, result):
+        columns, rows = result
+        self.analytics_tree.delete(*self.analytics_tree.get_children())
+        self.analytics_tree.configure(columns=columns)
+        for index, col in enumerate(columns):
+            self.analytics_tree.heading(col, text=col.replace("_", " ").title())
+            self.analytics_tree.column(col, width=220 if index == 0 else 140, anchor="w" if index == 0 else "e")
+
+        row_count = 0
+        for row in rows:
+            self.analytics_tree.insert("", "end", values=[self.format_analytics_value(col, value) for col, value in zip(columns, row)])
+            row_count += 1
+        self.analytics_status_var.set(f"{row_count} group(s) from {start.isoformat()} to {end.isoformat()}.")
+
+    @staticmethod
+    def format_analytics_value(column: str, value) -> str:
+        if value is None:
+            return "-"
+        if column in ("sales_before_tax", "gst", "net_sales"):
+            return f"₹{to_money(value):.2f}"  # SQLite sums the DECIMAL columns as floats; MySQL returns Decimal
+        if column == "hour":
+            return f"{int(value):02d}:00"
+        if isinstance(value, datetime.date):
+            return value.isoformat()
+        return str(value)
+
 
 def main():
     root = tk.Tk()
     app = CafeBillingGUI(root)
     # Ensure the database connection is closed when the Tkinter app exits
-    root.protocol("WM_DELETE_WINDOW", lambda: on_closing(root, app.system))
+    root.protocol("WM_DELETE_WINDOW", lambda: on_closing(root, app))
     root.mainloop()
 
-def on_closing(root, system):
+def on_closing(root, app):
     """Function to call when the Tkinter window is closed."""
-    if system and system.db:
-        system.db.close_connection()
+    system = getattr(app, "system", None)
+    executor = getattr(app, "executor", None)
+    if executor:
+        executor.shutdown(wait=False, cancel_futures=True)
+    if isinstance(system, CafeBillingSystem):
+        system.db.query_stats.dump()
+    if system:
+        system.close()
     root.destroy()
 
 
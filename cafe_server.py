@@ -0,0 +1,428 @@
+"""Local order-taking server: several counters share one CafeBillingSystem over a small JSON-lines protocol.
+
+Each counter connects over TCP and sends one JSON object per line,
+    {"id": 1, "method": "create_order", "params": {"order": {...}}}
+and gets back {"id": 1, "result": ...} or {"id": 1, "error": "..."} on one line.
+Requests on one connection may be pipelined; replies carry the request's id.
+
+The server holds the only database pool and menu cache, runs database calls on a
+thread pool, and gathers orders that arrive together into a single commit
+(CafeBillingSystem.create_orders). CafeClient is the matching thin client, with
+the CafeBillingSystem methods the GUI uses.
+
+Usage: python cafe_server.py [serve] [--host HOST] [--port PORT]
+       python cafe_server.py call METHOD [PARAMS_JSON]
+"""
+import argparse
+import asyncio
+import datetime
+import functools
+import itertools
+import json
+import socket
+import sys
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, is_dataclass, replace
+from decimal import Decimal
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from cafe import SERVER_CONFIG, CafeBillingSystem, MenuItem, Order, OrderItem, to_money
+
+REPORT_MONEY_FIELDS = ("total_sales_before_tax", "total_cgst", "total_sgst", "total_gst", "net_sales")
+HISTORY_MONEY_FIELDS = ("subtotal", "cgst_amount", "sgst_amount", "total_with_gst")
+ANALYTICS_MONEY_COLUMNS = ("sales_before_tax", "gst", "net_sales")
+MAX_REQUEST_BYTES = 1 << 20
+
+def to_json(value):
+    """json.dumps default for the values CafeBillingSystem returns."""
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    if is_dataclass(value):
+        return asdict(value)
+    raise TypeError(f"Cannot send {type(value).__name__} to a client.")
+
+def optional_datetime(value: Optional[str]) -> Optional[datetime.datetime]:
+    return datetime.datetime.fromisoformat(value) if value else None
+
+def order_from_json(data: Optional[Dict]) -> Optional[Order]:
+    if data is None:
+        return None
+    items = [OrderItem(**{**item, 'price': to_money(item['price'])}) for item in data['items']]
+    return Order(**{**data, 'items': items, 'order_time': optional_datetime(data.get('order_time'))})
+
+def menu_from_json(data: List[Dict]) -> List[MenuItem]:
+    return [MenuItem(**{**item, 'price': to_money(item['price'])}) for item in data]
+
+def report_from_json(data: Dict) -> Dict:
+    report = {**data, **{field: to_money(data[field]) for field in REPORT_MONEY_FIELDS}}
+    report['payment_methods'] = {method: to_money(total) for method, total in data['payment_methods'].items()}
+    return report
+
+def history_from_json(data: List[Dict]) -> List[Dict]:
+    return [
+        {
+            **order,
+            'order_time': optional_datetime(order['order_time']),
+            **{field: to_money(order[field]) for field in HISTORY_MONEY_FIELDS},
+            'items': [{**item, 'price': to_money(item['price']), 'total': to_money(item['total'])} for item in order['items']]
+        }
+        for order in data
+    ]
+
+def customer_summary_from_json(data: Optional[Dict]) -> Optional[Dict]:
+    if data is None:
+        return None
+    return {
+        **data,
+        'lifetime_spend': to_money(data['lifetime_spend']),
+        'average_spend': to_money(data['average_spend']),
+        'first_visit': optional_datetime(data['first_visit']),
+        'last_visit': optional_datetime(data['last_visit'])
+    }
+
+def analytics_from_json(data: List) -> Tuple[Tuple[str, ...], List[tuple]]:
+    columns, rows = tuple(data[0]), data[1]
+    converters = [
+        datetime.date.fromisoformat if column == "day" else to_money if column in ANALYTICS_MONEY_COLUMNS else None
+        for column in columns
+    ]
+    return columns, [
+        tuple(value if convert is None or value is None else convert(value) for convert, value in zip(converters, row))
+        for row in rows
+    ]
+
+class CafeServer:
+    """Answers counters' requests from one CafeBillingSystem, committing concurrent orders in batches."""
+
+    def __init__(self, system: CafeBillingSystem, host: str = '127.0.0.1', port: int = 8765,
+                 batch_window: float = 0.0, max_batch_size: int = 32, workers: int = 8):
+        self.system = system
+        self.host = host
+        self.port = port
+        self.batch_window = batch_window  # Seconds to wait for more orders once one has arrived
+        self.max_batch_size = max_batch_size
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="cafe-server")
+        self.batches = 0
+        self.batched_orders = 0
+        self._orders: Optional[asyncio.Queue] = None
+        self._stopping = False
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._calls = {
+            "get_menu_items": self._get_menu_items,
+            "get_order": self._get_order,
+            "get_daily_sales_report": self._get_daily_sales_report,
+            "get_customer_orders": self._get_customer_orders,
+            "search_customers": self._search_customers,
+            "get_customer_summary": self._get_customer_summary,
+            "get_sales_analytics": self._get_sales_analytics,
+            "invalidate_menu_cache": self._invalidate_menu_cache,
+            "server_stats": self._server_stats
+        }
+
+    async def start(self) -> None:
+        """Starts listening and committing orders; returns once the server accepts connections."""
+        self._orders = asyncio.Queue()
+        self._batcher = asyncio.create_task(self._commit_orders())
+        self._server = await asyncio.start_server(self._serve_connection, self.host, self.port, limit=MAX_REQUEST_BYTES)
+        self.port = self._server.sockets[0].getsockname()[1]  # The port actually bound, if 0 was asked for
+        print(f"Cafe server listening on {self.host}:{self.port}.")
+
+    async def serve_forever(self) -> None:
+        await self.start()
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.stop()
+
+    async def stop(self) -> None:
+        """Stops accepting connections and commits the orders already received."""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        # The batcher commits everything queued ahead of the sentinel, including a batch in flight, then exits
+        self._stopping = True
+        await self._orders.put(None)
+        await self._batcher
+        self.executor.shutdown(wait=True)
+
+    async def _serve_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        write_lock = asyncio.Lock()
+        pending = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                task = asyncio.create_task(self._answer(line, writer, write_lock))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+        except (ConnectionError, asyncio.LimitOverrunError, ValueError) as e:
+            print(f"Dropping client connection: {e}")
+        finally:
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+            writer.close()
+
+    async def _answer(self, line: bytes, writer: asyncio.StreamWriter, write_lock: asyncio.Lock) -> None:
+        request_id = None
+        try:
+            request = json.loads(line)
+            request_id = request.get("id")
+            result = await self._dispatch(request["method"], request.get("params") or {})
+            response = {"id": request_id, "result": result}
+        except Exception as e:
+            response = {"id": request_id, "error": f"{type(e).__name__}: {e}"}
+        data = (json.dumps(response, default=to_json) + "\n").encode()
+        async with write_lock:
+            writer.write(data)
+            try:
+                await writer.drain()
+            except ConnectionError:
+                pass  # The client went away; nothing left to tell it
+
+    async def _dispatch(self, method: str, params: Dict):
+        if method == "create_order":
+            return await self._submit_order(order_from_json(params["order"]))
+        call = self._calls.get(method)
+        if call is None:
+            raise ValueError(f"Unknown method '{method}'.")
+        return await asyncio.get_running_loop().run_in_executor(self.executor, functools.partial(call, **params))
+
+    async def _submit_order(self, order: Order) -> Optional[Order]:
+        if self._stopping:
+            raise RuntimeError("The server is stopping.")
+        future = asyncio.get_running_loop().create_future()
+        await self._orders.put((order, future))
+        return await future
+
+    async def _commit_orders(self) -> None:
+        """Writes queued orders in batches: every order that arrived while the last batch was being committed,
+        plus any arriving within batch_window of the first, up to max_batch_size. Returns after committing
+        the orders queued ahead of the None that stop() puts."""
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            entry = await self._orders.get()
+            if entry is None:
+                break
+            batch = [entry]
+            deadline = loop.time() + self.batch_window
+            while len(batch) < self.max_batch_size:
+                if not self._orders.empty():
+                    entry = self._orders.get_nowait()
+                else:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        entry = await asyncio.wait_for(self._orders.get(), remaining)
+                    except asyncio.TimeoutError:
+                        break
+                if entry is None:
+                    stopping = True
+                    break
+                batch.append(entry)
+
+            orders = [order for order, _ in batch]
+            try:
+                saved = await loop.run_in_executor(self.executor, self.system.create_orders, orders)
+            except Exception as e:
+                saved = [e] * len(batch)
+            self.batches += 1
+            self.batched_orders += len(batch)
+            for (_, future), result in zip(batch, saved):
+                if future.done():
+                    continue  # The client's request was cancelled
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+    def _get_menu_items(self) -> List[MenuItem]:
+        return self.system.get_menu_items()
+
+    def _get_order(self, order_id: int) -> Optional[Order]:
+        return self.system.get_order(order_id)
+
+    def _get_daily_sales_report(self, date: str) -> Dict:
+        return self.system.get_daily_sales_report(datetime.date.fromisoformat(date))
+
+    def _get_customer_orders(self, customer_name: str, limit: Optional[int] = None,
+                             before: Optional[List] = None) -> List[Dict]:
+        if before is not None:
+            before = (datetime.datetime.fromisoformat(before[0]), before[1])
+        return self.system.get_customer_orders(customer_name, limit, before)
+
+    def _search_customers(self, text: str, limit: Optional[int] = None) -> List[str]:
+        return self.system.search_customers(text, limit)
+
+    def _get_customer_summary(self, customer_name: str) -> Optional[Dict]:
+        return self.system.get_customer_summary(customer_name)
+
+    def _get_sales_analytics(self, start: str, end: str, group_by: str) -> List:
+        columns, rows = self.system.get_sales_analytics(
+            datetime.date.fromisoformat(start), datetime.date.fromisoformat(end), group_by
+        )
+        return [columns, list(rows)]
+
+    def _invalidate_menu_cache(self) -> None:
+        self.system.invalidate_menu_cache()
+
+    def _server_stats(self) -> Dict:
+        return {
+            "batches": self.batches,
+            "batched_orders": self.batched_orders,
+            "menu_cache": self.system.menu_cache_stats(),
+            "order_cache": self.system.order_cache_stats(),
+            "queries": self.system.db.query_stats.snapshot()
+        }
+
+class CafeClient:
+    """Thin client offering the CafeBillingSystem calls the GUI makes, answered by a cafe_server.py.
+
+    Each thread uses its own connection, so background calls do not queue behind each other.
+    """
+    CGST_RATE = CafeBillingSystem.CGST_RATE
+    SGST_RATE = CafeBillingSystem.SGST_RATE
+    ANALYTICS_DIMENSIONS = CafeBillingSystem.ANALYTICS_DIMENSIONS
+    money = CafeBillingSystem.money
+    generate_bill = CafeBillingSystem.generate_bill  # Needs only the rates and the money engine
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 8765, timeout: float = 10.0):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self._ids = itertools.count(1)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = []
+        try:
+            self._connection()
+        except OSError as e:
+            raise ConnectionError(f"Cannot reach the cafe server at {host}:{port}: {e}")
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            connection = (sock, sock.makefile("rwb"))
+            self._local.connection = connection
+            with self._lock:
+                self._connections.append(connection)
+        return connection
+
+    def _drop_connection(self) -> None:
+        connection = getattr(self._local, "connection", None)
+        self._local.connection = None
+        if connection is not None:
+            with self._lock:
+                if connection in self._connections:
+                    self._connections.remove(connection)
+            connection[0].close()
+
+    def call(self, method: str, **params):
+        """Sends one request and returns its result; raises RuntimeError with the server's error message."""
+        request = (json.dumps({"id": next(self._ids), "method": method, "params": params}, default=to_json) + "\n").encode()
+        for attempt in range(2):
+            try:
+                _, stream = self._connection()
+                stream.write(request)
+                stream.flush()
+                line = stream.readline()
+                if not line:
+                    raise ConnectionError("the server closed the connection")
+                break
+            except OSError as e:
+                # Retried once on a fresh connection; orders carry idempotency keys, so a resend is safe
+                self._drop_connection()
+                if attempt:
+                    raise ConnectionError(f"Cannot reach the cafe server at {self.host}:{self.port}: {e}")
+        response = json.loads(line)
+        if "error" in response:
+            raise RuntimeError(response["error"])
+        return response["result"]
+
+    def get_menu_items(self) -> List[MenuItem]:
+        return menu_from_json(self.call("get_menu_items"))
+
+    def create_order(self, order: Order, verify: bool = False) -> Optional[Order]:
+        """Has the server create the order; returns it as saved, or None if it could not be created."""
+        if not order.idempotency_key:
+            order = replace(order, idempotency_key=uuid.uuid4().hex)  # Makes a resend after a dropped reply safe
+        try:
+            return order_from_json(self.call("create_order", order=order))
+        except (ConnectionError, RuntimeError) as e:
+            print(f"Error creating order: {e}")
+            return None
+
+    def get_order(self, order_id: int) -> Optional[Order]:
+        return order_from_json(self.call("get_order", order_id=order_id))
+
+    def get_daily_sales_report(self, date: datetime.date) -> Dict:
+        return report_from_json(self.call("get_daily_sales_report", date=date))
+
+    def get_customer_orders(self, customer_name: str, limit: Optional[int] = None,
+                            before: Optional[Tuple[datetime.datetime, int]] = None) -> List[Dict]:
+        return history_from_json(self.call("get_customer_orders", customer_name=customer_name, limit=limit, before=before))
+
+    def search_customers(self, text: str, limit: Optional[int] = None) -> List[str]:
+        return self.call("search_customers", text=text, limit=limit)
+
+    def get_customer_summary(self, customer_name: str) -> Optional[Dict]:
+        return customer_summary_from_json(self.call("get_customer_summary", customer_name=customer_name))
+
+    def get_sales_analytics(self, start: datetime.date, end: datetime.date,
+                            group_by: str) -> Tuple[Tuple[str, ...], Iterator[tuple]]:
+        columns, rows = analytics_from_json(self.call("get_sales_analytics", start=start, end=end, group_by=group_by))
+        return columns, iter(rows)
+
+    def invalidate_menu_cache(self) -> None:
+        self.call("invalidate_menu_cache")
+
+    def close(self) -> None:
+        with self._lock:
+            connections = self._connections
+            self._connections = []
+        for sock, _ in connections:
+            sock.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Chaicoffee Cafe order-taking server and client.")
+    commands = parser.add_subparsers(dest="command")
+    commands.add_parser("serve", help="Run the server (the default).")
+    call_parser = commands.add_parser("call", help="Send one request to a running server and print the reply.")
+    call_parser.add_argument("method", help="Method name, such as get_menu_items or get_daily_sales_report.")
+    call_parser.add_argument("params", nargs="?", default="{}", help="Parameters as a JSON object.")
+    parser.add_argument("--host", default=SERVER_CONFIG['host'], help="Address to listen on or connect to (default: %(default)s).")
+    parser.add_argument("--port", type=int, default=SERVER_CONFIG['port'], help="Port (default: %(default)s).")
+    args = parser.parse_args()
+
+    if args.command == "call":
+        try:
+            client = CafeClient(args.host, args.port, SERVER_CONFIG['timeout'])
+            print(json.dumps(client.call(args.method, **json.loads(args.params)), indent=2, ensure_ascii=False))
+            client.close()
+        except (ConnectionError, RuntimeError, ValueError) as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+        return
+
+    system = CafeBillingSystem()
+    server = CafeServer(system, args.host, args.port, SERVER_CONFIG['batch_window'],
+                        SERVER_CONFIG['max_batch_size'], SERVER_CONFIG['workers'])
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        print("Cafe server stopped.")
+    finally:
+        system.close()
+
+
+if __name__ == "__main__":
+    main()